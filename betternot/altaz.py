@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import numpy as np
+
+BACKENDS = ("astropy", "analytic")
+
+JD_J2000 = 2451545.0
+
+# TT - UTC in days (32.184 s + 37 leap seconds since 2017), only enters the slowly varying precession angles
+TT_MINUS_UTC = 69.184 / 86400
+
+
+def precess(
+    ra: np.ndarray, dec: np.ndarray, jd: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Precess J2000 coordinates (radians) to the mean equator and equinox of date (IAU 1976)
+    """
+    t = (jd + TT_MINUS_UTC - JD_J2000) / 36525
+    arcsec = np.pi / (180 * 3600)
+
+    zeta = (2306.2181 * t + 0.30188 * t**2 + 0.017998 * t**3) * arcsec
+    z = (2306.2181 * t + 1.09468 * t**2 + 0.018203 * t**3) * arcsec
+    theta = (2004.3109 * t - 0.42665 * t**2 - 0.041833 * t**3) * arcsec
+
+    a = np.cos(dec) * np.sin(ra + zeta)
+    b = np.cos(theta) * np.cos(dec) * np.cos(ra + zeta) - np.sin(theta) * np.sin(dec)
+    c = np.sin(theta) * np.cos(dec) * np.cos(ra + zeta) + np.cos(theta) * np.sin(dec)
+
+    return np.arctan2(a, b) + z, np.arcsin(np.clip(c, -1, 1))
+
+
+def local_sidereal_time(jd: np.ndarray, lon: float) -> np.ndarray:
+    """
+    Local mean sidereal time (radians) for UTC Julian dates and an east longitude in degrees (IAU 1982 GMST, UT1 is approximated by UTC)
+    """
+    d = jd - JD_J2000
+    t = d / 36525
+    gmst = 280.46061837 + 360.98564736629 * d + 0.000387933 * t**2 - t**3 / 38710000
+
+    return np.radians(np.mod(gmst + lon, 360))
+
+
+def analytic_altitude(
+    ra: np.ndarray,
+    dec: np.ndarray,
+    jd: np.ndarray,
+    lat: float,
+    lon: float,
+    dtype=np.float32,
+) -> np.ndarray:
+    """
+    Altitude (deg) of targets at J2000 positions `ra`, `dec` (deg) for UTC Julian dates `jd`, seen from geodetic latitude `lat` and east longitude `lon` (deg). Returns shape (n_targets, n_times)
+
+    This uses precession, the mean sidereal time and the hour angle only (no nutation, aberration, polar motion or refraction), which is accurate to ~0.01 deg and thus plenty for planning. The target x time grid is computed in single precision by default, as that halves the runtime
+    """
+    jd = np.atleast_1d(jd)
+    ra_date, dec_date = precess(
+        np.radians(np.atleast_1d(ra)),
+        np.radians(np.atleast_1d(dec)),
+        jd=float(np.mean(jd)),
+    )
+    lst = local_sidereal_time(jd=jd, lon=lon)
+    phi = np.radians(lat)
+
+    # sin(alt) = sin(phi) sin(dec) + cos(phi) cos(dec) cos(lst - ra), expanded so that only products, sums and the final arcsin run (in place) over the full target x time grid
+    cos_term = np.cos(phi) * np.cos(dec_date)
+    a = (cos_term * np.cos(ra_date)).astype(dtype)[:, np.newaxis]
+    b = (cos_term * np.sin(ra_date)).astype(dtype)[:, np.newaxis]
+    c = (np.sin(phi) * np.sin(dec_date)).astype(dtype)[:, np.newaxis]
+
+    alt = a * np.cos(lst).astype(dtype)[np.newaxis, :]
+    alt += b * np.sin(lst).astype(dtype)[np.newaxis, :]
+    alt += c
+    np.clip(alt, -1, 1, out=alt)
+    np.arcsin(alt, out=alt)
+    np.degrees(alt, out=alt)
+
+    return alt
+
+
+def analytic_altitude_at(
+    ra: np.ndarray, dec: np.ndarray, jd: np.ndarray, lat: float, lon: float
+) -> np.ndarray:
+    """
+    Like `analytic_altitude`, but element-wise: the altitude (deg) of target i at Julian date jd[i]
+    """
+    ra, dec, jd = np.broadcast_arrays(
+        np.atleast_1d(ra), np.atleast_1d(dec), np.atleast_1d(jd)
+    )
+    ra_date, dec_date = precess(np.radians(ra), np.radians(dec), jd=float(np.mean(jd)))
+    hour_angle = local_sidereal_time(jd=jd, lon=lon) - ra_date
+    phi = np.radians(lat)
+
+    sin_alt = np.sin(phi) * np.sin(dec_date) + np.cos(phi) * np.cos(dec_date) * np.cos(
+        hour_angle
+    )
+
+    return np.degrees(np.arcsin(np.clip(sin_alt, -1, 1)))
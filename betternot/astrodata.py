@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import datetime
+import logging
+import shutil
+import time
+
+from betternot.io import get_cache_dir, load_config
+
+logger = logging.getLogger(__name__)
+
+IERS_A_FILENAME = "finals2000A.all"
+LEAP_SECONDS_FILENAME = "Leap_Second.dat"
+
+# after this many days, remind the user to refresh the IERS data
+MAX_AGE = 30
+
+_local_data_loaded = False
+
+
+def get_site(site: str):
+    """
+    Get the location of a site from the config. Only sites without coordinates in the config are looked up in the astropy site registry (which may need a download)
+    """
+    from astropy import units as u  # type: ignore
+    from astropy.coordinates import EarthLocation  # type: ignore
+
+    site_config = load_config()["sites"][site]
+
+    if "lat" in site_config:
+        return EarthLocation.from_geodetic(
+            lon=site_config["lon"] * u.deg,
+            lat=site_config["lat"] * u.deg,
+            height=site_config.get("height", 0) * u.m,
+        )
+
+    return EarthLocation.of_site(site_config["short"])
+
+
+def use_local_data():
+    """
+    Make astropy use the IERS and leap second files from the betternot cache (see `warm_cache`) and never download them. Without cached files, the IERS-B table bundled with astropy is used
+    """
+    global _local_data_loaded
+    if _local_data_loaded:
+        return
+
+    from astropy.utils import iers  # type: ignore
+
+    iers.conf.auto_download = False
+    # planning does not need UT1 to the millisecond, so do not fail for dates beyond the tables
+    iers.conf.iers_degraded_accuracy = "warn"
+
+    leap_seconds_path = get_cache_dir() / LEAP_SECONDS_FILENAME
+    if leap_seconds_path.is_file():
+        iers.conf.system_leap_second_file = str(leap_seconds_path)
+
+    iers_a_path = get_cache_dir() / IERS_A_FILENAME
+    if iers_a_path.is_file():
+        iers.earth_orientation_table.set(iers.IERS_A.open(str(iers_a_path)))
+
+        age = (time.time() - iers_a_path.stat().st_mtime) / 86400
+        if age > MAX_AGE:
+            logger.info(
+                f"The cached IERS data is {age:.0f} days old, consider running `not warm-cache`"
+            )
+    else:
+        logger.debug("No cached IERS-A data, using the bundled IERS-B table")
+
+    _local_data_loaded = True
+
+
+def warm_cache(date: str | None = None, n_nights: int = 7) -> None:
+    """
+    Download the IERS-A and leap second files to the betternot cache and precompute the sun/moon ephemeris of `n_nights` nights (from `date` on) for all configured sites, so later runs need no network for astronomy data
+    """
+    global _local_data_loaded
+
+    from astropy.utils import iers  # type: ignore
+    from astropy.utils.data import download_file  # type: ignore
+
+    for filename, urls in [
+        (IERS_A_FILENAME, [iers.IERS_A_URL, iers.IERS_A_URL_MIRROR]),
+        (LEAP_SECONDS_FILENAME, [iers.IERS_LEAP_SECOND_URL]),
+    ]:
+        for url in urls:
+            try:
+                tmp_path = download_file(url, cache=False, timeout=30)
+            except Exception as e:
+                logger.warning(f"Download of {url} failed: {e}")
+                continue
+            shutil.move(tmp_path, get_cache_dir() / filename)
+            _local_data_loaded = False
+            logger.info(f"Saved {url} to {get_cache_dir() / filename}")
+            break
+
+    from betternot.observability import Observability
+
+    if date is None:
+        date = datetime.date.today().strftime("%Y-%m-%d")
+    start = datetime.date.fromisoformat(date)
+
+    for site in load_config()["sites"]:
+        for i in range(n_nights):
+            night = (start + datetime.timedelta(days=i)).strftime("%Y-%m-%d")
+            Observability(ztf_ids=[], date=night, site=site).ephemeris
+
+    logger.info(f"Cached the ephemeris for {n_nights} nights from {date} on")
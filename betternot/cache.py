@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Size-bounded on-disk cache for API responses (SQLite). Entries expire after a per-request TTL, and the least recently used entries are evicted once the cache grows beyond `max_size` bytes
+    """
+
+    def __init__(self, path: Path | str, max_size: int = 256 * 1024**2):
+        self.path = Path(path)
+        self.max_size = max_size
+        self.refresh = False
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, status INTEGER, content BLOB, created REAL, accessed REAL, size INTEGER)"
+        )
+        self.connection.commit()
+
+    def get(self, key: str, ttl: float | None = None) -> tuple[int, bytes] | None:
+        """
+        Return (status code, content) of a cached response, or None if the key is not cached, expired or the cache is bypassed with `refresh`. A TTL of None never expires
+        """
+        if self.refresh:
+            self.misses += 1
+            return None
+
+        now = time.time()
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT status, content, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or (ttl is not None and now - row[2] > ttl):
+                self.misses += 1
+                return None
+
+            self.connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self.connection.commit()
+            self.hits += 1
+
+        return row[0], row[1]
+
+    def set(self, key: str, status: int, content: bytes):
+        """
+        Store a response, then evict the least recently used entries if the cache is too large
+        """
+        now = time.time()
+
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, status, content, now, now, len(content)),
+            )
+            self.evict()
+            self.connection.commit()
+
+    def evict(self):
+        """
+        Drop least recently used entries until the cache fits into `max_size` (the caller holds the lock)
+        """
+        total = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+        if total <= self.max_size:
+            return
+
+        rows = self.connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed ASC"
+        ).fetchall()
+
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            evicted.append((key,))
+            total -= size
+
+        self.connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        logger.debug(f"Evicted {len(evicted)} entries from {self.path}")
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM responses")
+            self.connection.commit()
+
+    def stats(self) -> dict:
+        with self.lock:
+            entries, size = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "size": size,
+        }
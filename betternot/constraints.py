@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import numpy as np
+from astropy import units as u  # type: ignore
+from astropy.coordinates import SkyCoord  # type: ignore
+
+from betternot.observability import Observability
+
+
+def unit_vectors(ra: np.ndarray, dec: np.ndarray) -> np.ndarray:
+    """
+    Cartesian unit vectors for RA/Dec (deg), shape (n, 3)
+    """
+    ra, dec = np.radians(ra), np.radians(dec)
+
+    return np.stack(
+        [np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)], axis=-1
+    )
+
+
+def runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find the runs of True in each row of a 2D boolean array. Returns row index, first index and end index (exclusive) of every run
+    """
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+
+    return rows, starts, ends
+
+
+class Constraints:
+    """
+    Observability constraints, evaluated for all targets at once on the time grid of an Observability
+
+    max_airmass: highest acceptable airmass
+    min_moon_separation: minimum distance to the moon (deg), enforced while the moon is above the horizon
+    sun_altitude: the sun has to be below this altitude (deg), e.g. -18 for astronomical twilight
+    min_window: shortest usable window (hours), shorter windows are discarded
+    """
+
+    def __init__(
+        self,
+        max_airmass: float = 2.0,
+        min_moon_separation: float = 30.0,
+        sun_altitude: float = -18.0,
+        min_window: float = 0.5,
+    ):
+        self.max_airmass = max_airmass
+        self.min_moon_separation = min_moon_separation
+        self.sun_altitude = sun_altitude
+        self.min_window = min_window
+
+    def mask(self, obs: Observability, coords: SkyCoord) -> np.ndarray:
+        """
+        Boolean mask of shape (n_targets, n_times), True where all constraints are met (before applying the minimum window length)
+        """
+        eph = obs.ephemeris
+        _, airmass = obs.altaz_grid(coords=coords)
+
+        return self.apply(
+            airmass=airmass,
+            sun_alt=eph.sun_alt,
+            moon_alt=eph.moon_alt,
+            moon_ra=eph.moon_ra,
+            moon_dec=eph.moon_dec,
+            ra=coords.icrs.ra.deg.reshape(-1),
+            dec=coords.icrs.dec.deg.reshape(-1),
+        )
+
+    def apply(
+        self,
+        airmass: np.ndarray,
+        sun_alt: np.ndarray,
+        moon_alt: np.ndarray,
+        moon_ra: np.ndarray,
+        moon_dec: np.ndarray,
+        ra: np.ndarray,
+        dec: np.ndarray,
+    ) -> np.ndarray:
+        """
+        The constraints on plain arrays: airmass has shape (n_targets, ...), the sun and moon tracks have the trailing shape (...), e.g. (n_times,) for one night or (n_sites, n_nights, n_times) for a sweep
+        """
+        with np.errstate(invalid="ignore"):
+            mask = airmass <= self.max_airmass
+
+        mask &= (sun_alt < self.sun_altitude)[np.newaxis]
+
+        if self.min_moon_separation > 0:
+            # the angular distance follows from the dot product of unit vectors, which is one matrix multiplication for all targets and times
+            target_vec = unit_vectors(ra, dec)
+            moon_vec = unit_vectors(moon_ra, moon_dec)
+            cos_sep = np.tensordot(target_vec, moon_vec, axes=([1], [-1]))
+            too_close = cos_sep > np.cos(np.radians(self.min_moon_separation))
+            mask &= ~(too_close & (moon_alt > 0)[np.newaxis])
+
+        return mask
+
+    def evaluate(self, obs: Observability, coords: SkyCoord) -> dict:
+        """
+        Evaluate the constraints for all targets. Returns a dict with
+
+        mask: (n_targets, n_times) boolean array of usable samples
+        intervals: for each target an array of shape (n_windows, 2) with start and end of the usable windows (hours relative to obs.midnight_utc)
+        hours: total usable time per target (hours)
+        observable: True for targets with at least one usable window
+        """
+        mask = self.mask(obs=obs, coords=coords)
+        grid = obs.delta_midnight.to_value(u.hour)
+        dt = grid[1] - grid[0]
+
+        rows, starts, ends = runs(mask)
+        lengths = (ends - starts) * dt
+        keep = lengths >= self.min_window
+
+        # rebuild the mask from the windows that are long enough
+        edges = np.zeros((mask.shape[0], mask.shape[1] + 1), dtype=np.int32)
+        np.add.at(edges, (rows[keep], starts[keep]), 1)
+        np.add.at(edges, (rows[keep], ends[keep]), -1)
+        mask = np.cumsum(edges, axis=1)[:, :-1] > 0
+
+        hours = np.bincount(rows[keep], weights=lengths[keep], minlength=len(mask))
+
+        window_edges = np.stack(
+            [grid[starts[keep]], grid[ends[keep] - 1] + dt], axis=-1
+        )
+        split = np.searchsorted(rows[keep], np.arange(1, len(mask)))
+        intervals = np.split(window_edges, split)
+
+        return {
+            "mask": mask,
+            "intervals": intervals,
+            "hours": hours,
+            "observable": hours > 0,
+        }
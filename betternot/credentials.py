@@ -5,28 +5,36 @@
 import getpass
 import logging
 import os
+import threading
 import warnings
 from os import environ
 
-import keyring
-from ztfquery import io  # type: ignore
-
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-try:
-    keyring.get_password("dummy", f"dummyfi_user")
-    # get_credentials("dummy", f"dummyfi_user")
-    keyring_available = True
-except keyring.errors.NoKeyringError:
-    keyring_available = False
-
+# The keyring is disabled for now
 keyring_available = False
 
+_tokens: dict = {}
+_tokens_lock = threading.Lock()
+
+
+def get_token(service: str) -> str:
+    """
+    Get the token for a service on first use and remember it (so it is not resolved at import time and only asked for once)
+    """
+    with _tokens_lock:
+        if service not in _tokens:
+            _tokens[service] = get_credentials(service=service, token=True)["token"]
+
+        return _tokens[service]
+
 
 def get_credentials(service, token=False):
     credentials = {}
     if keyring_available is True:
+        import keyring
+
         if token is False:
             username = keyring.get_password(service, f"{service}_user")
             password = keyring.get_password(service, f"{service}_password")
@@ -53,6 +61,8 @@ def get_credentials(service, token=False):
             credentials.update({"token": token})
 
     if keyring_available is False:
+        from ztfquery import io  # type: ignore
+
         if token is False:
             username = os.environ.get(f"{service}_user")
             password = os.environ.get(f"{service}_password")
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import hashlib
+import logging
+import threading
+
+import numpy as np
+from astroplan import moon as apmoon  # type: ignore
+from astropy import units as u  # type: ignore
+from astropy.coordinates import AltAz, EarthLocation, SkyCoord, get_body  # type: ignore
+from astropy.time import Time  # type: ignore
+
+from betternot.altaz import analytic_altitude_at
+from betternot.io import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+_ephemerides: dict = {}
+_lock = threading.Lock()
+
+
+class Ephemeris:
+    """
+    Sun and moon tracks for one night, site and time grid. Computed once, then kept in memory and on disk
+    """
+
+    fields = (
+        "sun_alt",
+        "moon_alt",
+        "moon_ra",
+        "moon_dec",
+        "moon_ra_midnight",
+        "moon_dec_midnight",
+        "illum",
+    )
+
+    sun_alt: np.ndarray
+    moon_alt: np.ndarray
+    moon_ra: np.ndarray
+    moon_dec: np.ndarray
+    moon_ra_midnight: float
+    moon_dec_midnight: float
+    illum: np.ndarray
+
+    def __init__(
+        self,
+        site: EarthLocation,
+        midnight_utc: Time,
+        delta_midnight: u.Quantity,
+        data: dict | None = None,
+        step: int = 1,
+    ):
+        self.site = site
+        self.midnight_utc = midnight_utc
+        self.delta_midnight = delta_midnight
+        self.step = step
+        self.key = ephemeris_key(
+            site=site,
+            midnight_utc=midnight_utc,
+            delta_midnight=delta_midnight,
+            step=step,
+        )
+        self.path = get_cache_dir() / f"ephemeris_{self.key}.npz"
+
+        if data is not None:
+            # computed in a batch with other nights, see `get_ephemerides`
+            self.set_fields(data)
+            self.save()
+        elif self.path.is_file():
+            self.load()
+        else:
+            self.compute()
+            self.save()
+
+    def compute(self):
+        """
+        Compute the sun and moon alt-az tracks as well as the moon illumination
+        """
+        logger.debug(f"Computing ephemeris {self.key}")
+        (data,) = compute_tracks(
+            site=self.site,
+            midnights=Time([self.midnight_utc]),
+            delta_midnight=self.delta_midnight,
+            step=self.step,
+        )
+        self.set_fields(data)
+
+    def set_fields(self, data):
+        """
+        Take the tracks from a dict (or npz file) with the ephemeris fields
+        """
+        self.sun_alt = np.asarray(data["sun_alt"])
+        self.moon_alt = np.asarray(data["moon_alt"])
+        self.moon_ra = np.asarray(data["moon_ra"])
+        self.moon_dec = np.asarray(data["moon_dec"])
+        self.moon_ra_midnight = float(data["moon_ra_midnight"])
+        self.moon_dec_midnight = float(data["moon_dec_midnight"])
+        self.illum = np.asarray(data["illum"])
+
+    def save(self):
+        """
+        Persist the arrays as a compressed npz file
+        """
+        np.savez_compressed(
+            self.path, **{field: getattr(self, field) for field in self.fields}
+        )
+
+    def load(self):
+        logger.debug(f"Loading ephemeris {self.key} from {self.path}")
+        with np.load(self.path) as data:
+            self.set_fields(data)
+
+    @property
+    def waxing(self) -> bool:
+        return bool(self.illum[2] - self.illum[1] > 0)
+
+    def moon_separation(
+        self, coords: SkyCoord, track: bool = False
+    ) -> np.ndarray | float:
+        """
+        Angular distance (deg) of the targets to the moon at midnight. With `track=True` the distance is given for every time sample, with shape (n_targets, n_times)
+        """
+        ra = np.radians(coords.icrs.ra.deg)
+        dec = np.radians(coords.icrs.dec.deg)
+
+        if track:
+            ra = np.reshape(ra, (-1, 1))
+            dec = np.reshape(dec, (-1, 1))
+            moon_ra = np.radians(self.moon_ra)
+            moon_dec = np.radians(self.moon_dec)
+        else:
+            moon_ra = np.radians(self.moon_ra_midnight)
+            moon_dec = np.radians(self.moon_dec_midnight)
+
+        return angular_separation(ra, dec, moon_ra, moon_dec)
+
+
+def compute_tracks(
+    site: EarthLocation, midnights: Time, delta_midnight: u.Quantity, step: int = 1
+) -> list[dict]:
+    """
+    Sun and moon tracks for several nights in one batched astropy call. Returns the ephemeris fields for each night
+
+    With `step` > 1 the sun and moon positions are only computed for every `step`-th time sample and interpolated in between, and the altitudes follow from the analytic backend. This is accurate to a few hundredths of a degree and much faster for long date ranges
+    """
+    n_times = len(delta_midnight)
+    times = (midnights[:, np.newaxis] + delta_midnight[np.newaxis, :]).reshape(-1)
+
+    if step > 1:
+        sun_alt, moon_alt, moon_ra, moon_dec = interpolated_tracks(
+            site=site, midnights=midnights, delta_midnight=delta_midnight, step=step
+        )
+    else:
+        frame_time = AltAz(obstime=times, location=site)
+
+        sun_alt = get_body("sun", times).transform_to(frame_time).alt.deg
+
+        moon = get_body("moon", times, site)
+        moon_alt = moon.transform_to(frame_time).alt.deg
+        moon_ra = moon.ra.deg
+        moon_dec = moon.dec.deg
+
+    moon_midnight = get_body("moon", midnights, site)
+
+    # illumination at midnight, two days earlier and two days later
+    illum = apmoon.moon_illumination(
+        midnights[:, np.newaxis] + [0, -2, 2] * u.day
+    ).astype(float)
+
+    return [
+        {
+            "sun_alt": sun_alt[i * n_times : (i + 1) * n_times],
+            "moon_alt": moon_alt[i * n_times : (i + 1) * n_times],
+            "moon_ra": moon_ra[i * n_times : (i + 1) * n_times],
+            "moon_dec": moon_dec[i * n_times : (i + 1) * n_times],
+            "moon_ra_midnight": moon_midnight.ra.deg[i],
+            "moon_dec_midnight": moon_midnight.dec.deg[i],
+            "illum": illum[i],
+        }
+        for i in range(len(midnights))
+    ]
+
+
+def interpolated_tracks(
+    site: EarthLocation, midnights: Time, delta_midnight: u.Quantity, step: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sun altitude, moon altitude, moon RA and moon Dec (deg) for all nights, from sun and moon positions at every `step`-th sample
+    """
+    n_times = len(delta_midnight)
+    sub = np.unique(np.r_[np.arange(0, n_times, step), n_times - 1])
+    sub_times = (midnights[:, np.newaxis] + delta_midnight[sub][np.newaxis, :]).reshape(
+        -1
+    )
+
+    # linear interpolation weights, the same for every night
+    idx = np.clip(
+        np.searchsorted(sub, np.arange(n_times), side="right") - 1, 0, len(sub) - 2
+    )
+    weight = (np.arange(n_times) - sub[idx]) / (sub[idx + 1] - sub[idx])
+
+    def interpolate(values: np.ndarray) -> np.ndarray:
+        values = values.reshape(len(midnights), len(sub))
+        return (values[:, idx] * (1 - weight) + values[:, idx + 1] * weight).reshape(-1)
+
+    jd = (
+        midnights.utc.jd[:, np.newaxis] + delta_midnight.to_value(u.day)[np.newaxis, :]
+    ).reshape(-1)
+
+    tracks = []
+    for body in [get_body("sun", sub_times), get_body("moon", sub_times, site)]:
+        ra = np.unwrap(body.ra.deg.reshape(len(midnights), -1), period=360, axis=1)
+        ra = np.mod(interpolate(ra), 360)
+        dec = interpolate(body.dec.deg)
+        alt = analytic_altitude_at(
+            ra=ra, dec=dec, jd=jd, lat=site.lat.deg, lon=site.lon.deg
+        )
+        tracks.append((alt, ra, dec))
+
+    (sun_alt, _, _), (moon_alt, moon_ra, moon_dec) = tracks
+
+    return sun_alt, moon_alt, moon_ra, moon_dec
+
+
+def angular_separation(ra1, dec1, ra2, dec2):
+    """
+    Vectorized great circle distance (Vincenty formula), input in radians, output in degrees
+    """
+    delta_ra = ra2 - ra1
+    sin_dra = np.sin(delta_ra)
+    cos_dra = np.cos(delta_ra)
+    sin_dec1, cos_dec1 = np.sin(dec1), np.cos(dec1)
+    sin_dec2, cos_dec2 = np.sin(dec2), np.cos(dec2)
+
+    num1 = cos_dec2 * sin_dra
+    num2 = cos_dec1 * sin_dec2 - sin_dec1 * cos_dec2 * cos_dra
+    denominator = sin_dec1 * sin_dec2 + cos_dec1 * cos_dec2 * cos_dra
+
+    return np.degrees(np.arctan2(np.hypot(num1, num2), denominator))
+
+
+def ephemeris_key(
+    site: EarthLocation, midnight_utc: Time, delta_midnight: u.Quantity, step: int = 1
+) -> str:
+    """
+    Key of an ephemeris: date, site position, time grid and interpolation step
+    """
+    grid = delta_midnight.to_value(u.hour)
+    site_xyz = [round(float(c.to_value(u.m)), 1) for c in site.to_geocentric()]
+    fingerprint = f"{midnight_utc.isot}_{site_xyz}_{grid[0]}_{grid[-1]}_{len(grid)}"
+    if step > 1:
+        fingerprint += f"_{step}"
+    digest = hashlib.sha1(fingerprint.encode()).hexdigest()[:12]
+
+    return f"{midnight_utc.isot.split('T')[0]}_{digest}"
+
+
+def get_ephemeris(
+    site: EarthLocation, midnight_utc: Time, delta_midnight: u.Quantity
+) -> Ephemeris:
+    """
+    Get the ephemeris for a night, reusing one that has already been computed
+    """
+    key = ephemeris_key(
+        site=site, midnight_utc=midnight_utc, delta_midnight=delta_midnight
+    )
+    with _lock:
+        if key not in _ephemerides:
+            _ephemerides[key] = Ephemeris(
+                site=site, midnight_utc=midnight_utc, delta_midnight=delta_midnight
+            )
+
+        return _ephemerides[key]
+
+
+def get_ephemerides(
+    site: EarthLocation, midnights: Time, delta_midnight: u.Quantity, step: int = 1
+) -> list[Ephemeris]:
+    """
+    Get the ephemerides for many nights. Nights that are neither in memory nor on disk are computed together in one batch, which is much faster than one night at a time. See `compute_tracks` for `step`
+    """
+    keys = [
+        ephemeris_key(
+            site=site, midnight_utc=m, delta_midnight=delta_midnight, step=step
+        )
+        for m in midnights
+    ]
+    with _lock:
+        missing = [
+            i
+            for i, key in enumerate(keys)
+            if key not in _ephemerides
+            and not (get_cache_dir() / f"ephemeris_{key}.npz").is_file()
+        ]
+        if missing:
+            logger.debug(f"Computing {len(missing)} ephemerides in one batch")
+            tracks = compute_tracks(
+                site=site,
+                midnights=midnights[missing],
+                delta_midnight=delta_midnight,
+                step=step,
+            )
+            for i, data in zip(missing, tracks):
+                _ephemerides[keys[i]] = Ephemeris(
+                    site=site,
+                    midnight_utc=midnights[i],
+                    delta_midnight=delta_midnight,
+                    data=data,
+                    step=step,
+                )
+
+        for key, midnight in zip(keys, midnights):
+            if key not in _ephemerides:
+                _ephemerides[key] = Ephemeris(
+                    site=site,
+                    midnight_utc=midnight,
+                    delta_midnight=delta_midnight,
+                    step=step,
+                )
+
+        return [_ephemerides[key] for key in keys]
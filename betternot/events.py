@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+from typing import Callable
+
+import numpy as np
+from astropy.coordinates import AltAz, SkyCoord, get_body  # type: ignore
+from astropy.time import Time  # type: ignore
+
+from betternot.altaz import local_sidereal_time, precess
+
+# sidereal rotation of the Earth (deg per day)
+SIDEREAL_RATE = 360.98564736629
+
+MJD_TO_JD = 2400000.5
+
+TWILIGHT_LEVELS = (0, -12, -18)
+
+
+def find_roots(
+    func: Callable[[np.ndarray], np.ndarray],
+    t_lo: np.ndarray,
+    t_hi: np.ndarray,
+    tol: float = 1 / 86400,
+    max_iter: int = 30,
+) -> np.ndarray:
+    """
+    Refine many brackets [t_lo, t_hi] (MJD) at once, each containing one sign change of func. `func` maps an array of times to the function values of the corresponding brackets, so every iteration costs a single vectorized evaluation. Uses regula falsi with the Illinois modification and stops once all roots are known to `tol` days
+    """
+    a = np.asarray(t_lo, dtype=float).copy()
+    b = np.asarray(t_hi, dtype=float).copy()
+    if len(a) == 0:
+        return a
+
+    fa = func(a)
+    fb = func(b)
+    side = np.zeros(len(a), dtype=int)
+    c = b.copy()
+
+    for _ in range(max_iter):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            c = np.where(fb != fa, (a * fb - b * fa) / (fb - fa), (a + b) / 2)
+        fc = func(c)
+
+        replace_b = np.sign(fc) == np.sign(fb)
+        replace_a = ~replace_b & (fc != 0)
+
+        fa = np.where(replace_b & (side == -1), fa / 2, fa)
+        fb = np.where(replace_a & (side == 1), fb / 2, fb)
+
+        b = np.where(replace_b, c, b)
+        fb = np.where(replace_b, fc, fb)
+        a = np.where(replace_a, c, a)
+        fa = np.where(replace_a, fc, fa)
+        side = np.where(replace_b, -1, np.where(replace_a, 1, 0))
+
+        converged = (np.abs(b - a) < tol) | (fc == 0)
+        if np.all(converged):
+            break
+
+    return c
+
+
+def twilight_times(obs, levels: tuple = TWILIGHT_LEVELS) -> dict:
+    """
+    Times (MJD) when the sun crosses the given altitudes (deg) in the evening and in the morning. The crossings are bracketed on the cached ephemeris track and then refined. Returns {level: (evening, morning)}, with NaN if the sun does not cross that level
+    """
+    grid = (obs.midnight_utc + obs.delta_midnight).mjd
+    sun_alt = obs.ephemeris.sun_alt
+
+    brackets = []
+    for level in levels:
+        diff = sun_alt - level
+        for sign in (-1, 1):
+            idx = np.nonzero(np.sign(diff[:-1]) * np.sign(diff[1:]) < 0)[0]
+            idx = idx[np.sign(diff[idx + 1] - diff[idx]) == sign]
+            brackets.append((level, idx[0] if len(idx) else None))
+
+    valid = [(level, i) for level, i in brackets if i is not None]
+    level_arr = np.array([level for level, _ in valid], dtype=float)
+    idx_arr = np.array([i for _, i in valid], dtype=int)
+
+    def sun_altitude(mjd: np.ndarray) -> np.ndarray:
+        times = Time(mjd, format="mjd", scale="utc")
+        frame = AltAz(obstime=times, location=obs.site)
+        return get_body("sun", times).transform_to(frame).alt.deg - level_arr
+
+    roots = iter(find_roots(sun_altitude, grid[idx_arr], grid[idx_arr + 1]))
+
+    result: dict = {}
+    for level, i in brackets:
+        root = next(roots) if i is not None else np.nan
+        result.setdefault(level, []).append(root)
+
+    return {level: tuple(times) for level, times in result.items()}
+
+
+def transit_times(obs, coords: SkyCoord) -> np.ndarray:
+    """
+    Time (MJD) of the upper transit closest to midnight for each target
+    """
+    jd_mid = obs.midnight_utc.utc.jd
+    ra_date, _ = precess(
+        np.radians(coords.icrs.ra.deg.reshape(-1)),
+        np.radians(coords.icrs.dec.deg.reshape(-1)),
+        jd=jd_mid,
+    )
+    lst_mid = np.degrees(local_sidereal_time(jd=jd_mid, lon=obs.site.lon.deg))
+    hour_angle = np.mod(lst_mid - np.degrees(ra_date) + 180, 360) - 180
+
+    return jd_mid - MJD_TO_JD - hour_angle / SIDEREAL_RATE
+
+
+def target_events(obs, coords: SkyCoord, max_airmass: float = 2.0) -> dict:
+    """
+    Transit, and rise/set times (MJD) at an airmass limit for each target. Rise and set are the crossings before and after the transit closest to midnight; the altitude rises monotonically from the lower culmination to the transit, so transit and lower culmination bracket them. Rise and set are NaN for targets that never reach the limit ("never") or never drop below it ("always")
+    """
+    ra = coords.icrs.ra.deg.reshape(-1)
+    dec = coords.icrs.dec.deg.reshape(-1)
+    n_targets = len(ra)
+    alt_limit = float(obs.airmass_to_altitude(max_airmass))
+
+    transit = transit_times(obs=obs, coords=coords)
+    half_day = 180 / SIDEREAL_RATE
+
+    transit_alt = obs.altitude_at(ra=ra, dec=dec, mjd=transit)
+    lower_alt = obs.altitude_at(ra=ra, dec=dec, mjd=transit - half_day)
+
+    crossing = (transit_alt > alt_limit) & (lower_alt < alt_limit)
+    idx = np.nonzero(crossing)[0]
+
+    # solve rising and setting in one go
+    ra_both = np.concatenate([ra[idx], ra[idx]])
+    dec_both = np.concatenate([dec[idx], dec[idx]])
+    t_lo = np.concatenate([transit[idx] - half_day, transit[idx]])
+    t_hi = np.concatenate([transit[idx], transit[idx] + half_day])
+
+    roots = find_roots(
+        lambda mjd: obs.altitude_at(ra=ra_both, dec=dec_both, mjd=mjd) - alt_limit,
+        t_lo,
+        t_hi,
+    )
+
+    rise = np.full(n_targets, np.nan)
+    set_ = np.full(n_targets, np.nan)
+    rise[idx] = roots[: len(idx)]
+    set_[idx] = roots[len(idx) :]
+
+    status = np.where(
+        crossing, "crossing", np.where(lower_alt >= alt_limit, "always", "never")
+    )
+
+    return {
+        "transit": transit,
+        "transit_alt": transit_alt,
+        "rise": rise,
+        "set": set_,
+        "status": status,
+        "max_airmass": max_airmass,
+    }
+
+
+def format_time(mjd: float) -> str:
+    """
+    HH:MM (UT) of an MJD
+    """
+    if np.isnan(mjd):
+        return "--:--"
+    return Time(mjd, format="mjd", scale="utc").isot[11:16]
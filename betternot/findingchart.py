@@ -2,12 +2,13 @@
 # Author: Simeon Reusch (simeon.reusch@desy.de)
 # License: BSD-3-Clause
 
-import getpass
 import logging
+import os
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import keyring
 import requests
 
 from betternot import fritz, io
@@ -15,23 +16,93 @@ from betternot import fritz, io
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_END = b"IEND\xaeB`\x82"
 
-def get_finding_chart(ztf_id: str, date: str):
+
+def chart_path(ztf_id: str, date: str) -> Path:
+    """
+    Path of the finding chart for a source and date
     """
-    Download a finding chart from Fritz
+    return io.get_date_dir(date) / f"{ztf_id}_{date.replace('-','_')}.png"
+
+
+def is_valid_png(path: Path) -> bool:
     """
+    Check that a file is a complete PNG (signature at the start, IEND chunk at the end)
+    """
+    if not path.is_file() or path.stat().st_size < len(PNG_SIGNATURE + PNG_END):
+        return False
+
+    with open(path, "rb") as f:
+        start = f.read(len(PNG_SIGNATURE))
+        f.seek(-len(PNG_END), os.SEEK_END)
+        end = f.read()
+
+    return start == PNG_SIGNATURE and end == PNG_END
+
+
+def get_finding_chart(ztf_id: str, date: str, overwrite: bool = False) -> Path | None:
+    """
+    Download a finding chart from Fritz. A valid chart that is already present is kept unless `overwrite` is set, which also bypasses the Fritz response cache
+    """
+    outpath = chart_path(ztf_id=ztf_id, date=date)
+
+    if not overwrite and is_valid_png(outpath):
+        logger.info(f"Finding chart for {ztf_id} is already present at {outpath}")
+        return outpath
 
     date_full = date + "T12:00:00"
     url = f"/sources/{ztf_id}/finder?imsize=5&type=png&num_offset_stars=0&obstime={date_full}"
 
     logger.info(f"Issuing finding chart request for {ztf_id} and date {date}")
-    response = fritz.api(method="get", url=url, stream=True)
+    response = fritz.api(method="get", url=url, stream=True, refresh=overwrite)
 
     if response.status_code in (200, 400):
-        outpath = io.get_date_dir(date)
-
-        with open(outpath / f"{ztf_id}_{date.replace('-','_')}.png", "wb") as f:
+        # write to a temporary file first, so an interrupted download never leaves a truncated chart behind
+        tmp_path = outpath.with_suffix(".part")
+        with open(tmp_path, "wb") as f:
             shutil.copyfileobj(response.raw, f)
-        logger.info(
-            f"Downloaded finding chart for {ztf_id} to {outpath / f'{ztf_id}_{date}.png'}"
-        )
+        os.replace(tmp_path, outpath)
+
+        logger.info(f"Downloaded finding chart for {ztf_id} to {outpath}")
+        return outpath
+
+    return None
+
+
+def get_finding_charts(
+    ztf_ids: list[str], date: str, max_workers: int = 4, overwrite: bool = False
+) -> dict:
+    """
+    Download the finding charts for several sources in parallel. Returns the download time in seconds for each source (0 for charts that were already present, None for failed downloads)
+    """
+
+    def download(ztf_id: str) -> float | None:
+        if not overwrite and is_valid_png(chart_path(ztf_id=ztf_id, date=date)):
+            return 0.0
+
+        t_start = time.perf_counter()
+        try:
+            outpath = get_finding_chart(ztf_id=ztf_id, date=date, overwrite=overwrite)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Finding chart for {ztf_id} failed: {e}")
+            return None
+        latency = time.perf_counter() - t_start
+
+        if outpath is None:
+            return None
+
+        logger.info(f"Finding chart for {ztf_id} took {latency:.1f} s")
+        return latency
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        latencies = dict(zip(ztf_ids, executor.map(download, ztf_ids)))
+
+    n_skipped = sum(1 for latency in latencies.values() if latency == 0)
+    n_failed = sum(1 for latency in latencies.values() if latency is None)
+    logger.info(
+        f"Finding charts: {len(ztf_ids) - n_skipped - n_failed} downloaded, {n_skipped} already present, {n_failed} failed"
+    )
+
+    return latencies
@@ -2,13 +2,87 @@
 # Author: Simeon Reusch (simeon.reusch@desy.de)
 # License: BSD-3-Clause
 
+import datetime
+import json
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
 import backoff  # type: ignore
 import requests
+from requests.adapters import HTTPAdapter
 
 from betternot import credentials
+from betternot.cache import ResponseCache
+from betternot.io import get_cache_dir
+from betternot.lightcurve import Lightcurve, LightcurveStore
+
+logger = logging.getLogger(__name__)
 
-FRITZ_TOKEN = credentials.get_credentials(service="FRITZ", token=True)["token"]
 BASE_URL = "https://fritz.science/api"
+MAX_WORKERS = 8
+
+# sources per page of the group listing
+GROUP_PAGE_SIZE = 100
+
+MJD_EPOCH = datetime.datetime(1858, 11, 17)
+
+# One pooled session, so repeated calls reuse their TCP/TLS connections. The pool has room for the source queries and the finding chart downloads that prepare_night runs side by side, and grows with reserve_connections when more workers are configured
+session = requests.Session()
+pool_size = 2 * MAX_WORKERS
+session.mount("https://", HTTPAdapter(pool_maxsize=pool_size))
+_pool_lock = threading.Lock()
+
+# Time-to-live (in seconds) of cached GET responses per endpoint, None never expires. Finding charts are requested for a given date, so they are cached per date. Photometry goes to the light curve store instead
+CACHE_TTLS = [
+    (re.compile(r"^/sources/[^/?]+$"), None),
+    (re.compile(r"^/sources/[^/]+/finder"), None),
+]
+PHOTOMETRY_TTL = 3 * 3600
+
+cache = ResponseCache(get_cache_dir() / "fritz.sqlite")
+lightcurves = LightcurveStore(get_cache_dir() / "lightcurves")
+
+
+def reserve_connections(n_connections: int):
+    """
+    Grow the connection pool of the session to at least `n_connections`, so that many requests at once do not discard connections
+    """
+    global pool_size
+
+    with _pool_lock:
+        if n_connections > pool_size:
+            session.mount("https://", HTTPAdapter(pool_maxsize=n_connections))
+            pool_size = n_connections
+
+
+def cache_ttl(method: str, url: str) -> tuple[bool, float | None]:
+    """
+    Check if a request is cacheable and get its TTL
+    """
+    if method.lower() != "get":
+        return False, None
+
+    for pattern, ttl in CACHE_TTLS:
+        if pattern.match(url):
+            return True, ttl
+
+    return False, None
+
+
+def cached_response(url: str, status: int, content: bytes) -> requests.Response:
+    """
+    Build a response from cached content (also readable as a stream)
+    """
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response._content = content
+    response.raw = BytesIO(content)
+
+    return response
 
 
 @backoff.on_exception(
@@ -17,21 +91,40 @@ BASE_URL = "https://fritz.science/api"
     max_time=600,
 )
 def api(
-    method: str, url: str, data: dict | None = None, stream: bool = False
+    method: str,
+    url: str,
+    data: dict | None = None,
+    stream: bool = False,
+    refresh: bool = False,
 ) -> requests.Response:
     """
-    Basic API request method
+    Basic API request method. GET requests to the endpoints in CACHE_TTLS are served from the local cache when possible, `refresh=True` forces a new request
     """
-    headers = {"Authorization": f"token {FRITZ_TOKEN}"}
-
     endpoint = BASE_URL + url
-    response = requests.request(
+
+    cacheable, ttl = cache_ttl(method=method, url=url)
+    if cacheable:
+        key = (
+            endpoint
+            if data is None
+            else f"{endpoint} {json.dumps(data, sort_keys=True)}"
+        )
+        if not refresh and (cached := cache.get(key, ttl=ttl)) is not None:
+            return cached_response(endpoint, *cached)
+
+    headers = {"Authorization": f"token {credentials.get_token('FRITZ')}"}
+
+    response = session.request(
         method=method, url=endpoint, json=data, headers=headers, stream=stream
     )
 
     if response.status_code != 200:
         raise requests.exceptions.RequestException
 
+    if cacheable:
+        cache.set(key, status=response.status_code, content=response.content)
+        response.raw = BytesIO(response.content)
+
     return response
 
 
@@ -48,23 +141,110 @@ def radec(ztf_id: str):
     return (ra, dec)
 
 
+def lightcurve(ztf_id: str, refresh: bool = False) -> Lightcurve:
+    """
+    Get the light curve of a source from the local store, updated from Fritz if it is older than PHOTOMETRY_TTL
+    """
+    if refresh or cache.refresh or not lightcurves.is_fresh(ztf_id, PHOTOMETRY_TTL):
+        response = api(method="get", url=f"/sources/{ztf_id}/photometry")
+        res = response.json()
+        photometry = res.get("data")
+        if not photometry:
+            logger.warning(
+                f"No photometry for {ztf_id} from Fritz ({res.get('message')}), using the stored light curve"
+            )
+            return lightcurves.get(ztf_id)
+        return lightcurves.update(ztf_id, photometry)
+
+    return lightcurves.get(ztf_id)
+
+
 def latest_photometry(ztf_id: str):
     """
-    Retrieve the photometry of a source, specified by its ZTF-ID
+    Retrieve the latest detection of a source, specified by its ZTF-ID
+    """
+    return lightcurve(ztf_id).latest
+
+
+def source_info(ztf_id: str):
+    """
+    Get position and latest detection of a source, specified by its ZTF-ID
+    """
+    ra, dec = radec(ztf_id)
+
+    if ra is None:
+        return (None, None, None, None, None)
+
+    mag, mjd, band = latest_photometry(ztf_id)
+
+    return (ra, dec, mag, mjd, band)
+
+
+def get_source_info(ztf_ids: list[str], max_workers: int = MAX_WORKERS) -> list:
+    """
+    Query several sources in parallel. The results are in the order of the ZTF-IDs
     """
-    response = api(method="get", url=f"/sources/{ztf_id}/photometry")
+    reserve_connections(max_workers)
 
-    phot_all = response.json().get("data")
-    # latest = photdata[-1]
-    # mag = latest[""]
-    phot_dets = []
-    for entry in phot_all:
-        if entry["mag"] != None:
-            phot_dets.append(entry)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(source_info, ztf_ids))
 
-    latest = phot_dets[-1]
-    mag = latest["mag"]
-    mjd = latest["mjd"]
-    band = latest["filter"]
 
-    return (mag, mjd, band)
+def detection_mjd(timestamp: str | None) -> float | None:
+    """
+    MJD of a Fritz timestamp (ISO format, UTC)
+    """
+    if timestamp is None:
+        return None
+
+    dt = datetime.datetime.fromisoformat(timestamp.rstrip("Z")).replace(tzinfo=None)
+    return (dt - MJD_EPOCH).total_seconds() / 86400
+
+
+def group_sources(
+    group_ids: list[int],
+    page_size: int = GROUP_PAGE_SIZE,
+    max_sources: int | None = None,
+):
+    """
+    Stream the sources saved to one or more Fritz groups, one page at a time. Each page is a list of (ztf_id, ra, dec, mag, mjd, band) tuples, with the latest detection taken from the detection stats of the listing, so no request per source is needed. The band is not part of the listing and is None
+    """
+    ids = ",".join(str(group_id) for group_id in group_ids)
+    n_sources = 0
+    page_number = 1
+
+    while True:
+        response = api(
+            method="get",
+            url=f"/sources?group_ids={ids}&numPerPage={page_size}&pageNumber={page_number}&includeDetectionStats=true",
+        )
+        data = response.json()["data"]
+        sources = data.get("sources", [])
+
+        if max_sources is not None:
+            sources = sources[: max_sources - n_sources]
+
+        if sources:
+            yield [
+                (
+                    source["id"],
+                    source.get("ra"),
+                    source.get("dec"),
+                    source.get("last_detected_mag"),
+                    detection_mjd(source.get("last_detected_at")),
+                    None,
+                )
+                for source in sources
+                if source.get("ra") is not None
+            ]
+
+        n_sources += len(sources)
+        total = data.get("totalMatches")
+        if (
+            len(sources) < page_size
+            or (total is not None and n_sources >= total)
+            or (max_sources is not None and n_sources >= max_sources)
+        ):
+            return
+
+        page_number += 1
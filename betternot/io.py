@@ -23,6 +23,13 @@ def get_date_dir(date: str) -> Path:
     return directory
 
 
+def get_cache_dir() -> Path:
+    directory = basedir / "cache"
+    directory.mkdir(parents=True, exist_ok=True)
+
+    return directory
+
+
 def load_config() -> dict:
     """
     Load the config (contains e.g. standard stars)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DTYPE = np.dtype(
+    [
+        ("mjd", "f8"),
+        ("mag", "f8"),
+        ("magerr", "f8"),
+        ("limiting_mag", "f8"),
+        ("filter", "U16"),
+        ("instrument", "U32"),
+        ("id", "i8"),
+    ]
+)
+
+
+class Lightcurve:
+    """
+    Columnar light curve of one source (NumPy structured array sorted by MJD). Latest detection, latest detection per band and the recent colour are computed when points are added, so looking them up is O(1)
+    """
+
+    def __init__(self, ztf_id: str, data: np.ndarray | None = None):
+        self.ztf_id = ztf_id
+        self.data = np.zeros(0, dtype=DTYPE) if data is None else data
+        self.summarize()
+
+    @staticmethod
+    def key(row: tuple) -> tuple:
+        """
+        Stable key of a photometry point: its Fritz ID, or (mjd, filter, instrument) if it has none
+        """
+        mjd, _, _, _, band, instrument, point_id = row
+        if point_id >= 0:
+            return ("id", int(point_id))
+
+        return (float(mjd), str(band), str(instrument))
+
+    @staticmethod
+    def comparable(row: tuple) -> tuple:
+        return tuple(
+            None if isinstance(value, float) and np.isnan(value) else value
+            for value in row
+        )
+
+    def merge(self, entries: list[dict]) -> int:
+        """
+        Merge Fritz photometry points into the light curve. Points are matched by their key, so late points with an older MJD and several points at the same MJD are kept, and corrected points replace the stored ones. Returns the number of new or changed points
+        """
+        rows = {self.key(row): row for row in self.data.tolist()}
+
+        n_changed = 0
+        for entry in entries:
+            row = (
+                float(entry["mjd"]),
+                np.nan if entry.get("mag") is None else entry["mag"],
+                np.nan if entry.get("magerr") is None else entry["magerr"],
+                np.nan if entry.get("limiting_mag") is None else entry["limiting_mag"],
+                entry["filter"],
+                entry.get("instrument_name") or "",
+                -1 if entry.get("id") is None else int(entry["id"]),
+            )
+            key = self.key(row)
+            if key not in rows or self.comparable(rows[key]) != self.comparable(row):
+                rows[key] = row
+                n_changed += 1
+
+        if n_changed:
+            data = np.array(list(rows.values()), dtype=DTYPE)
+            self.data = data[np.argsort(data["mjd"], kind="stable")]
+            self.summarize()
+
+        return n_changed
+
+    def summarize(self):
+        """
+        Precompute the latest detection overall and per band
+        """
+        detections = self.data[~np.isnan(self.data["mag"])]
+
+        self.latest_per_band: dict = {}
+        for band in np.unique(detections["filter"]):
+            row = detections[detections["filter"] == band][-1]
+            self.latest_per_band[str(band)] = (
+                float(row["mag"]),
+                float(row["mjd"]),
+                str(band),
+            )
+
+        if len(detections):
+            row = detections[-1]
+            self.latest = (float(row["mag"]), float(row["mjd"]), str(row["filter"]))
+        else:
+            self.latest = (None, None, None)
+
+    def colour(
+        self, band_1: str = "ztfg", band_2: str = "ztfr", max_dt: float = 3.0
+    ) -> float | None:
+        """
+        Colour (band_1 - band_2) from the latest detections in both bands, if they are at most `max_dt` days apart
+        """
+        if band_1 not in self.latest_per_band or band_2 not in self.latest_per_band:
+            return None
+
+        mag_1, mjd_1, _ = self.latest_per_band[band_1]
+        mag_2, mjd_2, _ = self.latest_per_band[band_2]
+
+        if abs(mjd_1 - mjd_2) > max_dt:
+            return None
+
+        return mag_1 - mag_2
+
+
+class LightcurveStore:
+    """
+    Local store of light curves, one .npy file per source
+    """
+
+    def __init__(self, directory: Path | str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.lightcurves: dict[str, Lightcurve] = {}
+        self.lock = threading.Lock()
+
+    def path(self, ztf_id: str) -> Path:
+        return self.directory / f"{ztf_id}.npy"
+
+    def get(self, ztf_id: str) -> Lightcurve:
+        """
+        Get a light curve from memory or disk (empty if the source is unknown)
+        """
+        with self.lock:
+            if ztf_id not in self.lightcurves:
+                path = self.path(ztf_id)
+                data = np.load(path) if path.is_file() else None
+                if data is not None and data.dtype != DTYPE:
+                    # written by an older version, fetch the light curve again
+                    path.unlink()
+                    data = None
+                self.lightcurves[ztf_id] = Lightcurve(ztf_id=ztf_id, data=data)
+
+            return self.lightcurves[ztf_id]
+
+    def is_fresh(self, ztf_id: str, ttl: float) -> bool:
+        """
+        Check if the light curve was updated less than `ttl` seconds ago
+        """
+        path = self.path(ztf_id)
+
+        return path.is_file() and time.time() - path.stat().st_mtime < ttl
+
+    def update(self, ztf_id: str, entries: list[dict]) -> Lightcurve:
+        """
+        Merge new photometry into a light curve and write it to disk
+        """
+        lightcurve = self.get(ztf_id)
+        n_new = lightcurve.merge(entries)
+        logger.debug(f"{ztf_id}: {n_new} new photometry points")
+
+        path = self.path(ztf_id)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, lightcurve.data)
+        os.replace(tmp_path, path)
+
+        return lightcurve
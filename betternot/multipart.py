@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import logging
+import mimetypes
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO
+
+logger = logging.getLogger(__name__)
+
+# size of the blocks read from disk, this bounds the memory used by an upload
+BLOCK_SIZE = 64 * 1024
+
+# progress is logged every PROGRESS_STEP of the body
+PROGRESS_STEP = 0.1
+
+CONTENT_TYPES = {
+    ".ascii": "text/plain",
+    ".txt": "text/plain",
+    ".dat": "text/plain",
+    ".fits": "application/fits",
+    ".fit": "application/fits",
+    ".fz": "application/fits",
+}
+
+
+def content_type(path: Path) -> str:
+    suffix = path.suffix.lower()
+    if suffix in CONTENT_TYPES:
+        return CONTENT_TYPES[suffix]
+
+    guessed, _ = mimetypes.guess_type(path.name)
+    return guessed or "application/octet-stream"
+
+
+class MultipartStream:
+    """
+    A multipart/form-data body that is read from disk while it is sent. Pass it as `data` to requests.post together with `headers={"Content-Type": stream.content_type}`; its length is known up front, so requests sends a Content-Length instead of building the body in memory. Files are opened in binary mode one at a time and closed as soon as they are read (or when the stream is closed), so at most BLOCK_SIZE bytes of a file are held in memory
+
+    fields: form fields ({name: value})
+    files: {field name: path}
+    """
+
+    def __init__(self, fields: dict, files: dict, block_size: int = BLOCK_SIZE):
+        self.boundary = uuid.uuid4().hex
+        self.block_size = block_size
+
+        # the body as a sequence of byte strings and files
+        self.parts: list = []
+        for name, value in fields.items():
+            self.parts.append(self.header(name=name) + str(value).encode() + b"\r\n")
+        for name, path in files.items():
+            path = Path(path)
+            self.parts.append(self.header(name=name, filename=path.name, path=path))
+            self.parts.append(path)
+            self.parts.append(b"\r\n")
+        self.parts.append(f"--{self.boundary}--\r\n".encode())
+
+        self.length = sum(
+            part.stat().st_size if isinstance(part, Path) else len(part)
+            for part in self.parts
+        )
+
+        self.position = 0
+        self.part_index = 0
+        self.part_offset = 0
+        self.handle: BinaryIO | None = None
+        self.t_start: float | None = None
+        self.next_progress = PROGRESS_STEP
+
+    def header(
+        self, name: str, filename: str | None = None, path: Path | None = None
+    ) -> bytes:
+        disposition = f'form-data; name="{name}"'
+        lines = [f"--{self.boundary}"]
+        if filename is not None and path is not None:
+            disposition += f'; filename="{filename}"'
+            lines.append(f"Content-Disposition: {disposition}")
+            lines.append(f"Content-Type: {content_type(path)}")
+        else:
+            lines.append(f"Content-Disposition: {disposition}")
+
+        return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self.length
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read the next bytes of the body, at most `size` (and never more than the block size of a file at once)
+        """
+        if self.t_start is None:
+            self.t_start = time.perf_counter()
+
+        if size is None or size < 0:
+            size = self.block_size
+
+        chunks = []
+        remaining = size
+        while remaining > 0 and self.part_index < len(self.parts):
+            part = self.parts[self.part_index]
+
+            if isinstance(part, Path):
+                handle = self.handle
+                if handle is None:
+                    handle = self.handle = open(part, "rb")
+                chunk = handle.read(min(remaining, self.block_size))
+                if not chunk:
+                    self.close_file()
+                    self.next_part()
+                    continue
+            else:
+                chunk = part[self.part_offset : self.part_offset + remaining]
+                self.part_offset += len(chunk)
+                if self.part_offset >= len(part):
+                    self.next_part()
+
+            chunks.append(chunk)
+            remaining -= len(chunk)
+
+        data = b"".join(chunks)
+        self.position += len(data)
+        self.log_progress()
+
+        return data
+
+    def next_part(self):
+        self.part_index += 1
+        self.part_offset = 0
+
+    def log_progress(self):
+        if self.length == 0 or self.position / self.length < self.next_progress:
+            return
+
+        elapsed = max(time.perf_counter() - self.t_start, 1e-6)
+        logger.debug(
+            f"Uploaded {self.position / 1024**2:.1f} of {self.length / 1024**2:.1f} MB ({self.position / self.length:.0%}, {self.position / 1024**2 / elapsed:.1f} MB/s)"
+        )
+        while self.next_progress <= self.position / self.length:
+            self.next_progress += PROGRESS_STEP
+
+    @property
+    def throughput(self) -> float:
+        """
+        Average upload speed so far in MB/s
+        """
+        if self.t_start is None:
+            return 0.0
+        return self.position / 1024**2 / max(time.perf_counter() - self.t_start, 1e-6)
+
+    def close_file(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    def close(self):
+        self.close_file()
+        self.part_index = len(self.parts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
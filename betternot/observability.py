@@ -4,27 +4,60 @@
 
 import datetime
 import logging
+import os
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
 import astroplan as ap  # type: ignore
 import astropy  # type: ignore
-import matplotlib.pyplot as plt  # type: ignore
 import numpy as np
-from astroplan import moon as apmoon  # type: ignore
 from astroplan.plots import plot_airmass, plot_altitude  # type: ignore
 from astropy import units as u  # type: ignore
-from astropy.coordinates import AltAz, EarthLocation, SkyCoord, get_body  # type: ignore
+from astropy.coordinates import (  # type: ignore
+    AltAz,
+    SkyCoord,
+)
 from astropy.time import Time  # type: ignore
-
-from betternot.io import get_date_dir, load_config
+from numpy.typing import ArrayLike
+
+from betternot.altaz import BACKENDS, analytic_altitude, analytic_altitude_at
+from betternot.astrodata import get_site, use_local_data
+from betternot.ephemeris import Ephemeris, ephemeris_key, get_ephemeris
+from betternot.io import get_cache_dir, get_date_dir, load_config
+from betternot.render import (
+    FORMATS,
+    RenderCache,
+    TrackCache,
+    fingerprint,
+    output_suffix,
+    render_altitude_plot,
+    render_context,
+)
+from betternot.targets import FLAG_STANDARD, TargetTable
 
 
 class Observability:
-    def __init__(self, ztf_ids, date: str | None = None, site: str = "not"):
+    def __init__(
+        self,
+        ztf_ids,
+        date: str | None = None,
+        site: str = "not",
+        max_workers: int = 8,
+        backend: str = "astropy",
+        plot_format: str | None = None,
+    ):
         self.logger = logging.getLogger()
         self.logger.setLevel(logging.INFO)
 
         self.ztf_ids = ztf_ids
+        self.max_workers = max_workers
+
+        if backend not in BACKENDS:
+            raise ValueError(
+                f"Unknown coordinate backend {backend}, choose from {', '.join(BACKENDS)}"
+            )
+        self.backend = backend
 
         if date is None:
             self.date = datetime.date.today().strftime("%Y-%m-%d")
@@ -32,51 +65,142 @@ class Observability:
             self.date = date
 
         self.config = load_config()
-        self.site = EarthLocation.of_site(self.config["sites"][site]["short"])
-        self.target_dict: dict = {}
+        use_local_data()
+
+        plot_config = self.config.get("plots") or {}
+        self.plot_format = plot_format or plot_config.get("format", "pdf")
+        if self.plot_format not in FORMATS:
+            raise ValueError(
+                f"Unknown plot format {self.plot_format}, choose from {', '.join(FORMATS)}"
+            )
+        self.targets_per_page = plot_config.get("targets_per_page")
+
+        self.site = get_site(site)
+        self.targets = TargetTable()
+        self._standards: TargetTable | None = None
+
+        self.midnight_utc = Time(self.date, format="isot", scale="utc") + (1 * u.hour)
+        self.delta_midnight = np.linspace(-12, 12, 1000) * u.hour
+        self.frame_time = AltAz(
+            obstime=self.midnight_utc + self.delta_midnight, location=self.site
+        )
+
+        self._ephemeris: Ephemeris | None = None
+        self._tracks: TrackCache | None = None
+        self.night_key = ephemeris_key(
+            site=self.site,
+            midnight_utc=self.midnight_utc,
+            delta_midnight=self.delta_midnight,
+        )
+
         self.logger.info(
             f"Getting observation data for {', '.join(ztf_ids)} for the {self.config['sites'][site]['pretty']}. Chosen date: {self.date}"
         )
 
+    @property
+    def ephemeris(self) -> Ephemeris:
+        """
+        Sun and moon tracks for the night, shared by all plots and moon checks
+        """
+        if self._ephemeris is None:
+            self._ephemeris = get_ephemeris(
+                site=self.site,
+                midnight_utc=self.midnight_utc,
+                delta_midnight=self.delta_midnight,
+            )
+        return self._ephemeris
+
+    @property
+    def tracks(self) -> TrackCache:
+        """
+        Altitude tracks of all targets seen so far on this night's time grid, see `altaz_grid`
+        """
+        if self._tracks is None:
+            self._tracks = TrackCache(
+                get_cache_dir() / f"tracks_{self.night_key}_{self.backend}.npz"
+            )
+        return self._tracks
+
     def get_info(self):
-        from betternot.fritz import radec, latest_photometry
-
-        for ztf_id in self.ztf_ids:
-            if ztf_id not in self.target_dict.keys():
-                ra, dec = radec(ztf_id)
-                mag, mjd, band = latest_photometry(ztf_id)
-
-                if ra is None:
-                    self.logger.info(f"Source {ztf_id} not found on Fritz, skipping.")
-                else:
-                    self.target_dict.update(
-                        {
-                            ztf_id: {
-                                "ra": ra,
-                                "dec": dec,
-                                "mag": mag,
-                                "mjd": mjd,
-                                "band": band,
-                            }
-                        }
-                    )
+        from betternot.fritz import get_source_info
+
+        new_ids = [i for i in self.ztf_ids if i not in self.targets]
+        results = get_source_info(new_ids, max_workers=self.max_workers)
+
+        found = []
+        for ztf_id, result in zip(new_ids, results):
+            if result[0] is None:
+                self.logger.info(f"Source {ztf_id} not found on Fritz, skipping.")
+            else:
+                found.append((ztf_id, *result))
+
+        if found:
+            names, ra, dec, mag, mjd, band = zip(*found)
+            self.targets.add(
+                names=names, ra=ra, dec=dec, mag=mag, mjd=mjd, band=list(band)
+            )
+
+    def add_sources(self, pages) -> int:
+        """
+        Add sources that come with their position and latest detection, e.g. the pages streamed by fritz.group_sources, to the ZTF-ID list and the targets. Each page is added to the target table at once, so only one page is held at a time. Returns the number of sources that were not in the table yet
+        """
+        n_new = 0
+        for page in pages:
+            known = set(self.ztf_ids)
+            self.ztf_ids = self.ztf_ids + [
+                source[0] for source in page if source[0] not in known
+            ]
+
+            new = [source for source in page if source[0] not in self.targets]
+            if new:
+                names, ra, dec, mag, mjd, band = zip(*new)
+                self.targets.add(
+                    names=names, ra=ra, dec=dec, mag=mag, mjd=mjd, band=list(band)
+                )
+                n_new += len(new)
+
+        return n_new
+
+    @property
+    def current_targets(self) -> TargetTable:
+        """
+        The retrieved targets that are part of the current ZTF-ID list (the target table keeps targets that have been dropped)
+        """
+        return self.targets.select(self.ztf_ids)
+
+    @property
+    def standards(self) -> TargetTable:
+        """
+        The standards from the config, parsed once
+        """
+        if self._standards is None:
+            self._standards = TargetTable.from_dict(
+                self.config["standards"], flags=FLAG_STANDARD
+            )
+        return self._standards
 
     def print_info(self):
         """
         Print the most importan information to enter when preparing an OB
         """
-        str_to_print = ""
-
-        for ztf_id, info in self.target_dict.items():
-            now = Time.now().mjd
-            days_ago = now - info["mjd"]
-            coords = SkyCoord(
-                info["ra"],
-                info["dec"],
-                unit=(u.deg, u.deg),
+        from betternot.events import format_time, target_events, twilight_times
+
+        targets = self.current_targets
+        if len(targets):
+            events = target_events(obs=self, coords=targets.coords)
+            coords_strings = targets.coords.to_string(style="hmsdms")
+
+        str_to_print = "-------------------------------------------\n"
+        for level, (evening, morning) in twilight_times(obs=self).items():
+            str_to_print += (
+                f"Sun at {level}°: {format_time(evening)} - {format_time(morning)} UT\n"
             )
-            coords_str = coords.to_string(style="hmsdms")
-            ra, dec = coords_str.split(" ")
+
+        now = Time.now().mjd
+
+        for i, ztf_id in enumerate(targets.names):
+            days_ago = now - targets.mjd[i]
+            ra, dec = coords_strings[i].split(" ")
             ra = ra.replace("h", ":").replace("m", ":").replace("s", "")
             dec = dec.replace("d", ":").replace("m", ":").replace("s", "")
             str_to_print += "-------------------------------------------\n"
@@ -84,169 +208,230 @@ class Observability:
             str_to_print += f"ztf{ztf_id[3:]}\n"
             str_to_print += f"RA: {ra}\n"
             str_to_print += f"Dec: {dec}\n"
-            str_to_print += f"{info['mag']:.2f} mag {days_ago:.0f} days ago in the {info['band']} filter\n"
+            # the group listing has no band for the latest detection
+            band = targets.band[i]
+            str_to_print += f"{targets.mag[i]:.2f} mag {days_ago:.0f} days ago"
+            str_to_print += f" in the {band} filter\n" if band else "\n"
+            str_to_print += f"Transit: {format_time(events['transit'][i])} UT at {events['transit_alt'][i]:.0f}° altitude\n"
+            if events["status"][i] == "crossing":
+                str_to_print += f"Airmass < {events['max_airmass']}: {format_time(events['rise'][i])} - {format_time(events['set'][i])} UT\n"
+            else:
+                str_to_print += (
+                    f"Airmass < {events['max_airmass']}: {events['status'][i]}\n"
+                )
             str_to_print += "-------------------------------------------\n"
 
         print(str_to_print)
 
         self.info = str_to_print
 
-    def plot_standards(self):
-        std_dict = self.config["standards"]
-        self.create_plot(target_dict=std_dict, savename="standards")
+    def plot_standards(self, standards: TargetTable | None = None):
+        """
+        Plot the given standards (e.g. from `betternot.standards.recommend_standards`), or the ones listed in the config
+        """
+        if standards is None or len(standards) == 0:
+            standards = self.standards
+        self.create_plot(targets=standards, savename="standards")
 
     def plot_targets(self):
         self.get_info()
 
         self.create_plot(
-            target_dict=self.target_dict, savename="targets", plot_moon=True
+            targets=self.current_targets, savename="targets", plot_moon=True
         )
 
-    def create_plot(self, target_dict: dict, savename: str, plot_moon: bool = False):
-        target_list = list(target_dict)
-        label_size = 14
-
-        plt.figure(figsize=(width := 9, width / 1.61))
-        ax = plt.subplot(111)
+    def create_plot(self, targets: TargetTable, savename: str, plot_moon: bool = False):
+        """
+        Plot the altitude of the targets during the night, in the configured format. Long target lists are split into pages of `targets_per_page` targets (savename_1, savename_2, ...), which are rendered in parallel processes. A page is only rendered if its inputs (targets, date, site, time grid, format and plot style) changed since it was last saved
+        """
+        outdir = get_date_dir(self.date)
+        render_cache = RenderCache(outdir)
+        suffix = output_suffix(self.plot_format)
 
-        self.midnight_utc = Time(self.date, format="isot", scale="utc") + (1 * u.hour)
-        delta_midnight = np.linspace(-12, 12, 1000) * u.hour
+        n_targets = len(targets)
+        per_page = self.targets_per_page or max(n_targets, 1)
+        n_pages = max(1, int(np.ceil(n_targets / per_page)))
 
-        frame_time = AltAz(
-            obstime=self.midnight_utc + delta_midnight, location=self.site
+        self.remove_stale_pages(
+            outdir=outdir, savename=savename, suffix=suffix, n_pages=n_pages
         )
 
-        for target in target_list:
-            if isinstance(target_dict[target]["ra"], str):
-                coords = SkyCoord(
-                    target_dict[target]["ra"],
-                    target_dict[target]["dec"],
-                    unit=(u.hour, u.deg),
-                )
-            else:
-                coords = SkyCoord(
-                    target_dict[target]["ra"],
-                    target_dict[target]["dec"],
-                    unit=(u.deg, u.deg),
-                )
-
-            obj_altazs = coords.transform_to(frame_time)
-
-            if plot_moon:
-                moon_info = self.check_moon(coords=coords)
-                label = f"{target} (moon dist: {moon_info['sep']:.0f}°)"
-                # illumsymbol = self.get_moon_emoticon(moon_info=moon_info)
-            else:
-                label = target
-
-            ax.plot(
-                delta_midnight,
-                obj_altazs.alt,
-                label=label,
-                lw=2,
+        pages = []
+        for page in range(n_pages):
+            rows = np.arange(page * per_page, min((page + 1) * per_page, n_targets))
+            name = savename if n_pages == 1 else f"{savename}_{page + 1}"
+            outpath = outdir / f"{name}.{suffix}"
+            # the page number is part of the title, so a page is redrawn when the page count changes
+            key = fingerprint(
+                self.night_key,
+                self.backend,
+                self.plot_format,
+                plot_moon,
+                page + 1,
+                n_pages,
+                list(targets.names[rows]),
+                targets.ra[rows],
+                targets.dec[rows],
             )
+            if not render_cache.is_current(outpath, key):
+                pages.append((page, rows, outpath, key))
 
-        sunaltazs = get_body("sun", self.midnight_utc + delta_midnight).transform_to(
-            frame_time
-        )
+        if not pages:
+            return
+
+        alt, _ = self.altaz_grid(coords=targets.coords)
 
         if plot_moon:
-            moonaltazs = get_body(
-                "moon", self.midnight_utc + delta_midnight
-            ).transform_to(frame_time)
-            ax.plot(delta_midnight, moonaltazs.alt, lw=2, color="white")
-
-        for sunheight, alpha in [(-0, 0.2), (-18, 1)]:
-            ax.fill_between(
-                x=delta_midnight.value,
-                y1=(0 * u.deg).value,
-                y2=(90 * u.deg).value,
-                where=sunaltazs.alt.value < (sunheight * u.deg).value,
-                color="navy",
-                zorder=0,
-                alpha=alpha,
+            moon_info = self.check_moon(targets=targets)
+            labels = [
+                f"{target} (moon dist: {sep:.0f}°)"
+                for target, sep in zip(targets.names, moon_info["sep"])
+            ]
+            # illumsymbol = self.get_moon_emoticon(moon_info=moon_info)
+            title = (
+                f"{self.date} → {(Time(self.date) + (1 * u.day)).isot.split('T')[0]}"
+            )
+            # title += f" {illumsymbol} ({moon_info['illum']:.0f} %)"
+            title += f"{moon_info['illum']:.0f} %"
+        else:
+            labels = list(targets.names)
+            title = ""
+
+        jobs = []
+        for page, rows, outpath, _ in pages:
+            page_title = title
+            if n_pages > 1:
+                page_title = f"{title} [{page + 1}/{n_pages}]".strip()
+            jobs.append(
+                dict(
+                    outpath=outpath,
+                    fmt=self.plot_format,
+                    hours=self.delta_midnight.to_value(u.hour),
+                    alt=alt[rows],
+                    labels=[labels[row] for row in rows],
+                    sun_alt=self.ephemeris.sun_alt,
+                    moon_alt=self.ephemeris.moon_alt if plot_moon else None,
+                    title=page_title or None,
+                )
             )
 
-        # Plot an airmass scale
-        ax2 = ax.secondary_yaxis(
-            "right", functions=(self.altitude_to_airmass, self.airmass_to_altitude)
+        n_workers = min(len(jobs), os.cpu_count() or 1)
+        if n_workers == 1:
+            for job in jobs:
+                render_altitude_plot(**job)
+        else:
+            # the plots are rendered while other steps of the pipeline still run threads, and forking a threaded process can deadlock the child
+            with ProcessPoolExecutor(
+                max_workers=n_workers, mp_context=render_context()
+            ) as executor:
+                for future in [
+                    executor.submit(render_altitude_plot, **job) for job in jobs
+                ]:
+                    future.result()
+
+        for _, _, outpath, key in pages:
+            render_cache.update(outpath, key)
+
+    def remove_stale_pages(
+        self, outdir: Path, savename: str, suffix: str, n_pages: int
+    ):
+        """
+        Delete the plots of an earlier run that are not part of the current pages, e.g. savename_3 when the targets now fit on two pages, or savename when they no longer fit on one
+        """
+        current = (
+            {f"{savename}.{suffix}"}
+            if n_pages == 1
+            else {f"{savename}_{page + 1}.{suffix}" for page in range(n_pages)}
         )
-        altitude_ticks = np.linspace(10, 90, 9)
-        airmass_ticks = np.round(self.altitude_to_airmass(altitude_ticks), 2)
-        ax2.set_yticks(airmass_ticks)
-        ax2.set_ylabel("Airmass", fontsize=label_size)
-
-        ax.axvline(x=0, color="white", lw=1)
-        ax.axhline(90 - np.arccos(1 / 2.0) * 180 / np.pi, color="#C02F1D")
-        ax.axhline(90 - np.arccos(1 / 3.0) * 180 / np.pi, color="#C02F1D", ls="--")
-
-        xmin, xmax = -6, 8
-
-        ax.set_xlim((xmin * u.hour).value, (xmax * u.hour).value)
-
-        labels = [
-            "{:.0f} h".format(x + 24) if x < 0 else "{:.0f} h".format(x)
-            for x in (np.arange(xmax - xmin) + xmin)
+        candidates = [outdir / f"{savename}.{suffix}"] + [
+            path
+            for path in outdir.glob(f"{savename}_*.{suffix}")
+            if path.stem[len(savename) + 1 :].isdigit()
         ]
+        for path in candidates:
+            if path.name not in current and path.is_file():
+                self.logger.debug(f"Removing {path.name} from an earlier run")
+                path.unlink()
 
-        ax.set_xticks(
-            ((np.arange(xmax - xmin) + xmin) * u.hour).value, labels=labels, rotation=45
-        )
+    def altaz_grid(self, coords: SkyCoord) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Transform all targets onto the time grid in one go. Returns the altitude (deg) and airmass as arrays of shape (n_targets, n_times); the airmass is NaN for targets below the horizon
 
-        ax.set_ylim((10 * u.deg).value, (90 * u.deg).value)
+        With the "analytic" backend the altitude is computed from the hour angle in pure NumPy, which is much faster and accurate to ~0.01 deg. Tracks are cached by position (see `tracks`), so only targets that were not seen before are transformed
+        """
+        ra = coords.icrs.ra.deg.reshape(-1)
+        dec = coords.icrs.dec.deg.reshape(-1)
 
-        ax.set_xlabel("Universal time", fontsize=label_size)
-        ax.set_ylabel("Altitude", fontsize=label_size)
+        if len(ra):
+            alt = self.tracks.get(ra=ra, dec=dec, compute=self.compute_altitudes)
+        else:
+            alt = np.empty((0, len(self.delta_midnight)))
 
-        title = f"{self.date} → {(Time(self.date) + (1 * u.day)).isot.split('T')[0]}"
+        airmass = self.altitude_to_airmass(alt)
+        airmass[alt <= 0] = np.nan
 
-        if plot_moon:
-            # title += f" {illumsymbol} ({moon_info['illum']:.0f} %)"
-            title += f"{moon_info['illum']:.0f} %"
+        return alt, airmass
 
-            ax.set_title(
-                title,
-                fontsize=label_size,
+    def compute_altitudes(self, ra: np.ndarray, dec: np.ndarray) -> np.ndarray:
+        """
+        Altitude (deg) of the positions on the time grid with the configured backend, shape (n_targets, n_times)
+        """
+        if self.backend == "analytic":
+            return analytic_altitude(
+                ra=ra,
+                dec=dec,
+                jd=self.frame_time.obstime.utc.jd,
+                lat=self.site.lat.deg,
+                lon=self.site.lon.deg,
             )
 
-        plt.grid(True, color="gray", linestyle="dotted", which="both", alpha=0.5)
-        plt.legend()
+        coords = SkyCoord(ra, dec, unit=(u.deg, u.deg))
+        return coords[:, np.newaxis].transform_to(self.frame_time).alt.deg
 
-        outdir = get_date_dir(self.date)
-        outpath = outdir / f"{savename}.pdf"
+    def altitude_at(
+        self, ra: np.ndarray, dec: np.ndarray, mjd: np.ndarray
+    ) -> np.ndarray:
+        """
+        Altitude (deg) of target i at time mjd[i], with the configured backend. This is what the event solver evaluates in each iteration
+        """
+        if self.backend == "analytic":
+            return analytic_altitude_at(
+                ra=ra,
+                dec=dec,
+                jd=np.asarray(mjd) + 2400000.5,
+                lat=self.site.lat.deg,
+                lon=self.site.lon.deg,
+            )
 
-        plt.savefig(outpath, bbox_inches="tight")
-        plt.close()
+        frame = AltAz(obstime=Time(mjd, format="mjd", scale="utc"), location=self.site)
+        return SkyCoord(ra, dec, unit=(u.deg, u.deg)).transform_to(frame).alt.deg
 
-    def check_moon(self, coords):
+    def check_moon(self, targets: TargetTable):
         """
         Check proximity to the moon and moon illuminated fraction
         """
-        moon = get_body("moon", self.midnight_utc, self.site)
-        moon_sep = moon.separation(coords)
-        illumination = apmoon.moon_illumination(self.midnight_utc)
-        illumination_earlier = apmoon.moon_illumination(self.midnight_utc - (2 * u.day))
-        illumination_later = apmoon.moon_illumination(self.midnight_utc + (2 * u.day))
+        illumination, illumination_earlier, illumination_later = self.ephemeris.illum
 
         return {
-            "sep": moon_sep.to(u.degree).value,
+            "sep": self.ephemeris.moon_separation(targets.coords),
             "illum": illumination * 100,
             "illum-2": illumination_earlier,
             "illum+2": illumination_later,
+            "waxing": self.ephemeris.waxing,
         }
 
     @staticmethod
-    def altitude_to_airmass(airmass: float | np.ndarray):
+    def altitude_to_airmass(airmass: ArrayLike) -> np.ndarray:
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            altitude = 1.0 / np.cos(np.radians(90 - airmass))
+            altitude = 1.0 / np.cos(np.radians(90 - np.asarray(airmass)))
         return altitude
 
     @staticmethod
-    def airmass_to_altitude(altitude: float | np.ndarray):
+    def airmass_to_altitude(altitude: ArrayLike) -> np.ndarray:
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            airmass = 90 - np.degrees(np.arccos(1 / altitude))
+            airmass = 90 - np.degrees(np.arccos(1 / np.asarray(altitude)))
         return airmass
 
     @staticmethod
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from betternot import fritz
+from betternot.findingchart import get_finding_charts
+from betternot.observability import Observability
+from betternot.scheduler import schedule_night
+from betternot.standards import recommend_standards
+from betternot.targets import FLAG_STANDARD, TargetTable
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_night(
+    obs: Observability, max_workers: int = 8, plot_standards: bool = True
+) -> dict:
+    """
+    Run all steps of the observation preparation, overlapping the ones that do not depend on each other:
+
+                      ┌─> standard selection and plot ────────────────────┐
+    Fritz source info ┴─> target plot ──> print info ──> schedule ────────├─> done
+    finding charts (network only) ────────────────────────────────────────┘
+
+    The standards are chosen to match the targets, their selection and plot can be skipped with `plot_standards=False`. Returns the wall-clock time of each step in seconds
+    """
+    timings: dict = {}
+
+    def timed(name, func, *args, **kwargs):
+        t_start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings[name] = time.perf_counter() - t_start
+        return result
+
+    t_start = time.perf_counter()
+
+    def standards_step():
+        standards = recommend_standards(obs=obs)
+        obs.plot_standards(
+            standards=TargetTable.from_dict(standards, flags=FLAG_STANDARD)
+        )
+
+    # the finding charts and the source queries share the Fritz connections
+    fritz.reserve_connections(max_workers + obs.max_workers)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        charts = executor.submit(
+            timed,
+            "finding charts",
+            get_finding_charts,
+            ztf_ids=obs.ztf_ids,
+            date=obs.date,
+            max_workers=max_workers,
+        )
+        info = executor.submit(timed, "fritz", obs.get_info)
+
+        # the target plot and the standards need the Fritz info, the other steps keep running meanwhile
+        info.result()
+        if plot_standards:
+            standards = executor.submit(timed, "standards", standards_step)
+        timed("targets", obs.plot_targets)
+        obs.print_info()
+        timed("schedule", schedule_night, obs)
+
+        if plot_standards:
+            standards.result()
+        charts.result()
+
+    timings["total"] = time.perf_counter() - t_start
+    logger.debug(
+        "Timings: " + ", ".join(f"{key}: {val:.1f} s" for key, val in timings.items())
+    )
+
+    return timings
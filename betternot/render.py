@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from matplotlib.figure import Figure  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# bump this whenever the look of the observability plots changes, so existing plots are rendered again
+STYLE_VERSION = 1
+
+# output formats of the observability plots. "pdf-raster" embeds the curves and the twilight shading as images in an otherwise vector PDF, "html" is an SVG in a minimal page
+FORMATS = ("pdf", "pdf-raster", "png", "svg", "html")
+RASTER_DPI = 150
+
+# the curves are thinned to every n-th sample for the text based formats
+SVG_THINNING = 4
+
+# positions are rounded to this many decimals (deg) in cache keys, ~0.4 mas
+KEY_DECIMALS = 7
+
+
+def position_keys(ra: np.ndarray, dec: np.ndarray) -> list[tuple[float, float]]:
+    return list(
+        zip(
+            np.round(np.asarray(ra, dtype=float), KEY_DECIMALS).tolist(),
+            np.round(np.asarray(dec, dtype=float), KEY_DECIMALS).tolist(),
+        )
+    )
+
+
+def fingerprint(*parts) -> str:
+    """
+    Digest of the inputs of a plot. Arrays are hashed by value, everything else by its repr
+    """
+    digest = hashlib.sha1(f"style {STYLE_VERSION}".encode())
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(repr(part).encode())
+
+    return digest.hexdigest()
+
+
+# shared by all RenderCache instances, a new one is created for every plot
+_render_lock = threading.Lock()
+
+
+class RenderCache:
+    """
+    Remembers the fingerprint of the inputs of every plot in a directory (in a hidden json file), so plots whose inputs did not change are not rendered again
+    """
+
+    filename = ".render.json"
+
+    def __init__(self, directory: Path):
+        self.path = Path(directory) / self.filename
+
+    def read(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            logger.warning(f"{self.path} is corrupt, all plots will be rendered again")
+            return {}
+
+    def is_current(self, outpath: Path, key: str) -> bool:
+        """
+        True if `outpath` exists and was rendered from inputs with this fingerprint
+        """
+        with _render_lock:
+            current = outpath.is_file() and self.read().get(outpath.name) == key
+
+        if current:
+            logger.debug(f"{outpath.name} is up to date, not rendering it again")
+
+        return current
+
+    def update(self, outpath: Path, key: str):
+        with _render_lock:
+            fingerprints = self.read()
+            fingerprints[outpath.name] = key
+
+            # write to a temporary file first, so an interrupted write never leaves a truncated file behind
+            tmp_path = self.path.with_name(f"{self.filename}.{os.getpid()}.part")
+            tmp_path.write_text(json.dumps(fingerprints, indent=1))
+            os.replace(tmp_path, self.path)
+
+
+class TrackCache:
+    """
+    Altitude tracks of targets on the time grid of one night and site, keyed by position. The tracks are kept in memory and in the cache directory, so re-planning with one more target only computes the track of that target
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.rows: dict = {}
+        self.alt: np.ndarray | None = None
+
+        if self.path.is_file():
+            with np.load(self.path) as data:
+                self.alt = data["alt"]
+                self.rows = {
+                    key: row
+                    for row, key in enumerate(position_keys(data["ra"], data["dec"]))
+                }
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def get(self, ra: np.ndarray, dec: np.ndarray, compute) -> np.ndarray:
+        """
+        Tracks of the targets, shape (n_targets, n_times). `compute(ra, dec)` is called for the positions that are not cached yet
+        """
+        ra = np.asarray(ra, dtype=float)
+        dec = np.asarray(dec, dtype=float)
+        keys = position_keys(ra, dec)
+
+        # first occurrence of every position that is not cached
+        missing: dict = {}
+        with self.lock:
+            for i, key in enumerate(keys):
+                if key not in self.rows:
+                    missing.setdefault(key, i)
+
+        if missing:
+            rows = list(missing.values())
+            new = compute(ra[rows], dec[rows])
+
+            with self.lock:
+                self.add(keys=list(missing), alt=new)
+
+        with self.lock:
+            assert self.alt is not None
+            return self.alt[[self.rows[key] for key in keys]]
+
+    def add(self, keys: list, alt: np.ndarray):
+        """
+        Append tracks and persist the cache (the caller holds the lock)
+        """
+        keys_alt = [(key, row) for key, row in zip(keys, alt) if key not in self.rows]
+        if not keys_alt:
+            return
+
+        first = len(self.rows)
+        new = np.array([row for _, row in keys_alt])
+        self.alt = new if self.alt is None else np.concatenate([self.alt, new])
+        for i, (key, _) in enumerate(keys_alt):
+            self.rows[key] = first + i
+
+        ra, dec = np.array(list(self.rows)).T
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.part")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, ra=ra, dec=dec, alt=self.alt)
+        os.replace(tmp_path, self.path)
+
+
+def output_suffix(fmt: str) -> str:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown plot format {fmt}, choose from {', '.join(FORMATS)}")
+
+    return "pdf" if fmt == "pdf-raster" else fmt
+
+
+def render_context():
+    """
+    Start method of the render processes: forkserver where the platform has it, spawn otherwise. Plain fork copies the locks held by other threads, which can deadlock the child
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn"
+    )
+
+
+def render_altitude_plot(
+    outpath: Path,
+    fmt: str,
+    hours: np.ndarray,
+    alt: np.ndarray,
+    labels: list[str],
+    sun_alt: np.ndarray,
+    moon_alt: np.ndarray | None = None,
+    title: str | None = None,
+):
+    """
+    Render an altitude plot from plain arrays (time in hours from midnight, one altitude track per label). This is a module-level function so the pages of a long target list can be rendered in separate processes
+    """
+    from betternot.observability import Observability
+
+    label_size = 14
+    rasterized = fmt == "pdf-raster"
+    thin = SVG_THINNING if fmt in ("svg", "html") else 1
+
+    # no pyplot state machine, so several plots can be rendered from different threads
+    fig = Figure(figsize=(width := 9, width / 1.61))
+    ax = fig.add_subplot(111)
+
+    for label, track in zip(labels, alt):
+        ax.plot(hours[::thin], track[::thin], label=label, lw=2, rasterized=rasterized)
+
+    if moon_alt is not None:
+        ax.plot(
+            hours[::thin], moon_alt[::thin], lw=2, color="white", rasterized=rasterized
+        )
+
+    for sunheight, alpha in [(-0, 0.2), (-18, 1)]:
+        ax.fill_between(
+            x=hours,
+            y1=0,
+            y2=90,
+            where=sun_alt < sunheight,
+            color="navy",
+            zorder=0,
+            alpha=alpha,
+            rasterized=rasterized,
+        )
+
+    # Plot an airmass scale
+    ax2 = ax.secondary_yaxis(
+        "right",
+        functions=(
+            Observability.altitude_to_airmass,
+            Observability.airmass_to_altitude,
+        ),
+    )
+    altitude_ticks = np.linspace(10, 90, 9)
+    airmass_ticks = np.round(Observability.altitude_to_airmass(altitude_ticks), 2)
+    ax2.set_yticks(airmass_ticks)
+    ax2.set_ylabel("Airmass", fontsize=label_size)
+
+    ax.axvline(x=0, color="white", lw=1)
+    ax.axhline(90 - np.arccos(1 / 2.0) * 180 / np.pi, color="#C02F1D")
+    ax.axhline(90 - np.arccos(1 / 3.0) * 180 / np.pi, color="#C02F1D", ls="--")
+
+    xmin, xmax = -6, 8
+    ax.set_xlim(xmin, xmax)
+
+    ticks = np.arange(xmax - xmin) + xmin
+    ax.set_xticks(
+        ticks,
+        labels=[f"{x + 24:.0f} h" if x < 0 else f"{x:.0f} h" for x in ticks],
+        rotation=45,
+    )
+    ax.set_ylim(10, 90)
+
+    ax.set_xlabel("Universal time", fontsize=label_size)
+    ax.set_ylabel("Altitude", fontsize=label_size)
+
+    if title is not None:
+        ax.set_title(title, fontsize=label_size)
+
+    ax.grid(True, color="gray", linestyle="dotted", which="both", alpha=0.5)
+    ax.legend()
+
+    save_figure(fig=fig, outpath=outpath, fmt=fmt, title=title)
+
+
+def save_figure(fig: Figure, outpath: Path, fmt: str, title: str | None = None):
+    """
+    Save a figure in one of the FORMATS
+    """
+    if fmt == "html":
+        buffer = io.StringIO()
+        fig.savefig(buffer, format="svg", bbox_inches="tight")
+        # inline the svg element, without its XML declaration
+        svg = buffer.getvalue()
+        svg = svg[svg.find("<svg") :]
+        Path(outpath).write_text(
+            f'<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>{title or Path(outpath).stem}</title></head>\n<body>\n{svg}</body>\n</html>\n'
+        )
+    else:
+        fig.savefig(
+            outpath,
+            format=output_suffix(fmt),
+            bbox_inches="tight",
+            dpi=RASTER_DPI,
+        )
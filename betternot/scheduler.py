@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import logging
+import time
+
+import numpy as np
+from astropy import units as u  # type: ignore
+from astropy.coordinates import SkyCoord  # type: ignore
+from matplotlib import colormaps  # type: ignore
+from matplotlib.figure import Figure  # type: ignore
+
+from betternot.constraints import Constraints, unit_vectors
+from betternot.events import format_time
+from betternot.io import get_date_dir
+from betternot.observability import Observability
+from betternot.render import output_suffix, save_figure
+
+logger = logging.getLogger(__name__)
+
+MODES = ("greedy", "optimise")
+
+# cost per second of exposure for targets that do not fit into the night, chosen above any reachable airmass so that scheduling more targets always wins
+UNSCHEDULED_COST = 10.0
+
+
+class Scheduler:
+    """
+    Order targets over the night so that the airmass-weighted exposure time is minimal
+
+    exposure_time: exposure time per target (s), a scalar or one value per target
+    overhead: acquisition and readout time per target (s)
+    slew_rate: telescope slew speed (deg/s)
+    settle_time: time to settle after each slew (s)
+    constraints: airmass, sun and moon constraints a target has to meet during the whole exposure
+
+    The night is discretised on the time grid of the Observability. "greedy" always picks the target that is currently closest to its best airmass, "optimise" improves the greedy sequence with a local search (swapping and moving targets) within a time budget
+    """
+
+    def __init__(
+        self,
+        obs: Observability,
+        exposure_time: float | np.ndarray = 1200.0,
+        overhead: float = 300.0,
+        slew_rate: float = 1.5,
+        settle_time: float = 30.0,
+        constraints: Constraints | None = None,
+    ):
+        self.obs = obs
+        self.exposure_time = exposure_time
+        self.overhead = overhead
+        self.slew_rate = slew_rate
+        self.settle_time = settle_time
+        self.constraints = constraints if constraints is not None else Constraints()
+
+        grid = obs.delta_midnight.to_value(u.hour)
+        self.grid = grid
+        self.dt = (grid[1] - grid[0]) * 3600
+
+    def prepare(self, coords: SkyCoord):
+        """
+        Precompute everything the sequence evaluation needs, so that evaluating an order is a cheap lookup per target:
+
+        cost[i, k]: airmass-weighted exposure time when target i starts at slot k
+        next_start[i, k]: first slot >= k at which target i can be exposed without violating a constraint (-1 if there is none)
+        setup[i, j]: slots needed between finishing target i and starting target j (slew, settling and overhead)
+        """
+        n_times = len(self.grid)
+        n_targets = len(coords)
+
+        exposure = np.broadcast_to(
+            np.asarray(self.exposure_time, dtype=float), (n_targets,)
+        )
+        duration = np.maximum(np.ceil(exposure / self.dt).astype(int), 1)
+
+        mask = self.constraints.mask(obs=self.obs, coords=coords)
+        _, airmass = self.obs.altaz_grid(coords=coords)
+
+        # a start at slot k is possible if the whole exposure [k, k + duration) is usable
+        usable = np.zeros((n_targets, n_times + 1), dtype=np.int32)
+        np.cumsum(mask, axis=1, out=usable[:, 1:])
+        starts = np.arange(n_times)[np.newaxis, :]
+        ends = np.minimum(starts + duration[:, np.newaxis], n_times)
+        n_usable = np.take_along_axis(usable, ends, axis=1) - usable[:, :n_times]
+        feasible = (n_usable == duration[:, np.newaxis]) & (
+            starts + duration[:, np.newaxis] <= n_times
+        )
+
+        mid = np.minimum(starts + duration[:, np.newaxis] // 2, n_times - 1)
+        cost = np.take_along_axis(airmass, mid, axis=1) * exposure[:, np.newaxis]
+        cost[~feasible] = np.inf
+
+        # next feasible slot, by propagating backwards from the end of the night
+        next_start = np.where(feasible, starts, n_times)
+        next_start = np.minimum.accumulate(next_start[:, ::-1], axis=1)[:, ::-1]
+        next_start = np.concatenate(
+            [next_start, np.full((n_targets, 1), n_times)], axis=1
+        )
+        next_start[next_start == n_times] = -1
+
+        vec = unit_vectors(
+            coords.icrs.ra.deg.reshape(-1), coords.icrs.dec.deg.reshape(-1)
+        )
+        distance = np.degrees(np.arccos(np.clip(vec @ vec.T, -1, 1)))
+        setup = np.ceil(
+            (distance / self.slew_rate + self.settle_time + self.overhead) / self.dt
+        ).astype(int)
+
+        self.n_times = n_times
+        self.exposure = exposure
+        self.duration = duration
+        self.cost = cost
+        self.next_start = next_start
+        self.setup = setup
+        self.first_setup = int(np.ceil(self.overhead / self.dt))
+        self.airmass = airmass
+
+    def evaluate(self, order: list, states: list | None = None, first: int = 0):
+        """
+        Walk through the targets in the given order and start each one at the first possible slot. Targets that cannot be fitted in anymore are skipped. Returns the total cost and the state (slot, previous target, cost, penalty for skipped targets) after every step, which allows re-evaluating from `first` onwards after changing only the end of the order
+        """
+        if states is None or first == 0:
+            states = [(0, -1, 0.0, 0.0)]
+        else:
+            states = states[: first + 1]
+
+        slot, prev, cost, skipped = states[-1]
+        for i in order[first:]:
+            setup = self.first_setup if prev < 0 else self.setup[prev, i]
+            start = slot + setup
+            if start < self.n_times:
+                start = self.next_start[i, start]
+            else:
+                start = -1
+
+            if start < 0:
+                skipped += UNSCHEDULED_COST * self.exposure[i]
+            else:
+                cost += self.cost[i, start]
+                slot = start + self.duration[i]
+                prev = i
+            states.append((slot, prev, cost, skipped))
+
+        return cost + skipped, states
+
+    def starts(self, order: list) -> np.ndarray:
+        """
+        Start slot for every target of the order (-1 for targets that were skipped)
+        """
+        _, states = self.evaluate(order=order)
+        return np.array(
+            [
+                states[k + 1][0] - self.duration[i] if states[k + 1][1] == i else -1
+                for k, i in enumerate(order)
+            ]
+        )
+
+    def greedy(self) -> list:
+        """
+        Build a sequence by always observing the target whose airmass is closest to the best one it still reaches later in the night, so setting targets are taken before they are lost. Targets that can not be fitted in anymore are appended at the end
+        """
+        n_targets = len(self.exposure)
+        # best cost from each slot on until the end of the night
+        best = np.minimum.accumulate(self.cost[:, ::-1], axis=1)[:, ::-1]
+        remaining = np.ones(n_targets, dtype=bool)
+        order: list = []
+
+        slot, prev = 0, -1
+        while remaining.any() and slot < self.n_times:
+            setup = (
+                np.full(n_targets, self.first_setup) if prev < 0 else self.setup[prev]
+            )
+            start = slot + setup
+            cost = np.full(n_targets, np.inf)
+            valid = remaining & (start < self.n_times)
+            cost[valid] = self.cost[valid, start[valid]]
+
+            if not np.isfinite(cost).any():
+                # nothing can start right now, wait
+                slot += 1
+                continue
+
+            # penalise long slews relative to the time spent exposing
+            with np.errstate(invalid="ignore"):
+                ratio = (
+                    cost
+                    / best[np.arange(n_targets), np.minimum(start, self.n_times - 1)]
+                    * (setup + self.duration)
+                    / self.duration
+                )
+            i = int(np.nanargmin(ratio))
+
+            order.append(i)
+            remaining[i] = False
+            slot = start[i] + self.duration[i]
+            prev = i
+
+        order.extend(np.nonzero(remaining)[0].tolist())
+
+        return order
+
+    def optimise(self, order: list, time_budget: float = 2.0, seed: int = 42):
+        """
+        Improve a sequence with a local search: random swaps and moves of single targets are kept when they lower the total cost. Only the part of the sequence after the first changed position is re-evaluated
+        """
+        rng = np.random.default_rng(seed)
+        n_targets = len(order)
+        if n_targets < 2:
+            return order
+
+        best_cost, states = self.evaluate(order=order)
+        t_end = time.perf_counter() + time_budget
+
+        while time.perf_counter() < t_end:
+            a, b = sorted(rng.choice(n_targets, size=2, replace=False))
+            candidate = order.copy()
+            if rng.random() < 0.5:
+                candidate[a], candidate[b] = candidate[b], candidate[a]
+            else:
+                candidate.insert(a, candidate.pop(b))
+
+            cost, new_states = self.evaluate(
+                order=candidate, states=states.copy(), first=a
+            )
+            if cost < best_cost:
+                order, best_cost, states = candidate, cost, new_states
+
+        return order
+
+    def schedule(
+        self,
+        names: list,
+        coords: SkyCoord,
+        mode: str = "greedy",
+        time_budget: float = 2.0,
+    ) -> dict:
+        """
+        Schedule the targets. Returns a dict with the scheduled targets in observing order ("name", "start" and "end" in hours relative to obs.midnight_utc, "airmass" at mid-exposure), the names of the targets that did not fit ("unscheduled") and the total airmass-weighted cost
+        """
+        if mode not in MODES:
+            raise ValueError(
+                f"Unknown scheduling mode {mode}, choose from {', '.join(MODES)}"
+            )
+
+        t_start = time.perf_counter()
+        self.prepare(coords=coords)
+
+        order = self.greedy()
+        if mode == "optimise":
+            order = self.optimise(order=order, time_budget=time_budget)
+
+        cost, _ = self.evaluate(order=order)
+        starts = self.starts(order=order)
+
+        scheduled = [(i, s) for i, s in zip(order, starts) if s >= 0]
+        dt_hours = self.dt / 3600
+        mid = [min(s + self.duration[i] // 2, self.n_times - 1) for i, s in scheduled]
+
+        logger.debug(
+            f"Scheduled {len(scheduled)} of {len(names)} targets ({mode}) in {time.perf_counter() - t_start:.2f} s"
+        )
+
+        return {
+            "name": [names[i] for i, _ in scheduled],
+            "start": np.array([self.grid[s] for _, s in scheduled]),
+            "end": np.array(
+                [self.grid[s] + self.duration[i] * dt_hours for i, s in scheduled]
+            ),
+            "airmass": np.array(
+                [self.airmass[i, m] for (i, _), m in zip(scheduled, mid)]
+            ),
+            "unscheduled": [names[i] for i, s in zip(order, starts) if s < 0],
+            "cost": cost,
+        }
+
+
+def plot_schedule(obs: Observability, schedule: dict, savename: str = "schedule"):
+    """
+    Timeline of the scheduled targets: one bar per exposure, coloured by its airmass (1 to 2), on top of the night shading used in the observability plots
+    """
+    label_size = 14
+    n_targets = len(schedule["name"])
+
+    fig = Figure(figsize=(width := 9, max(width / 1.61, 0.25 * n_targets + 1)))
+    ax = fig.add_subplot(111)
+
+    sun_alt = obs.ephemeris.sun_alt
+    delta_midnight = obs.delta_midnight.value
+    for sunheight, alpha in [(-0, 0.2), (-18, 1)]:
+        ax.fill_between(
+            x=delta_midnight,
+            y1=-1,
+            y2=n_targets,
+            where=sun_alt < sunheight,
+            color="navy",
+            zorder=0,
+            alpha=alpha,
+        )
+
+    if n_targets:
+        bars = ax.barh(
+            np.arange(n_targets),
+            schedule["end"] - schedule["start"],
+            left=schedule["start"],
+            color=colormaps["viridis"](np.clip(schedule["airmass"] - 1, 0, 1)),
+            edgecolor="white",
+        )
+        for bar, airmass in zip(bars, schedule["airmass"]):
+            ax.text(
+                bar.get_x() + bar.get_width() + 0.05,
+                bar.get_y() + bar.get_height() / 2,
+                f"{airmass:.2f}",
+                va="center",
+                color="white",
+                fontsize=8,
+            )
+
+    ax.set_yticks(np.arange(n_targets), labels=schedule["name"])
+    ax.set_ylim(n_targets - 0.5, -0.5)
+
+    xmin, xmax = -6, 8
+    ax.set_xlim(xmin, xmax)
+    labels = [
+        "{:.0f} h".format(x + 24) if x < 0 else "{:.0f} h".format(x)
+        for x in (np.arange(xmax - xmin) + xmin)
+    ]
+    ax.set_xticks(np.arange(xmax - xmin) + xmin, labels=labels, rotation=45)
+    ax.set_xlabel("Universal time", fontsize=label_size)
+
+    title = f"{obs.date}: {n_targets} targets scheduled"
+    if schedule["unscheduled"]:
+        title += f", {len(schedule['unscheduled'])} do not fit"
+    ax.set_title(title, fontsize=label_size)
+    ax.grid(True, color="gray", linestyle="dotted", which="both", alpha=0.5)
+
+    outpath = get_date_dir(obs.date) / f"{savename}.{output_suffix(obs.plot_format)}"
+    save_figure(fig=fig, outpath=outpath, fmt=obs.plot_format, title=title)
+
+
+def schedule_night(obs: Observability) -> dict | None:
+    """
+    Schedule the current targets of an Observability with the settings from the config and save the timeline next to the target plot
+    """
+    settings = dict(obs.config.get("scheduler", {}))
+    mode = settings.pop("mode", "greedy")
+
+    targets = obs.current_targets
+    if len(targets) == 0:
+        return None
+
+    scheduler = Scheduler(obs=obs, **settings)
+    schedule = scheduler.schedule(
+        names=list(targets.names), coords=targets.coords, mode=mode
+    )
+
+    for name, start in zip(schedule["name"], schedule["start"]):
+        logger.info(f"{format_time(obs.midnight_utc.mjd + start / 24)} UT: {name}")
+    if schedule["unscheduled"]:
+        logger.info(f"Not fitting into the night: {', '.join(schedule['unscheduled'])}")
+
+    plot_schedule(obs=obs, schedule=schedule)
+
+    return schedule
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import inspect
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# types of the fields of a planning request, the optional ones may also be null
+REQUEST_TYPES = {
+    "names": list,
+    "date": str,
+    "site": str,
+    "refresh": bool,
+    "max_workers": int,
+    "group_ids": list,
+    "plot_format": str,
+}
+
+
+class PlanningServer:
+    """
+    Keeps the observability engines (astropy state, ephemerides, Fritz connections and retrieved targets) warm between `not` invocations
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self.max_workers = max_workers
+        self.observabilities: dict = {}
+        self.lock = threading.Lock()
+
+        # import the heavy dependencies once, when the server starts
+        from betternot import fritz
+        from betternot.observability import Observability
+        from betternot.pipeline import prepare_night
+
+        self.fritz = fritz
+        self.Observability = Observability
+        self.prepare_night = prepare_night
+
+    def check_request(self, request: dict):
+        """
+        Check the fields of a planning request against the arguments of `plan`, raising a ValueError for unknown, missing or wrongly typed ones
+        """
+        signature = inspect.signature(self.plan)
+        try:
+            bound = signature.bind(**request)
+        except TypeError as e:
+            raise ValueError(str(e))
+
+        for key, value in bound.arguments.items():
+            if value is None and signature.parameters[key].default is None:
+                continue
+            expected = REQUEST_TYPES[key]
+            if not isinstance(value, expected) or (
+                expected is int and isinstance(value, bool)
+            ):
+                raise ValueError(f"'{key}' must be of type {expected.__name__}")
+
+    def plan(
+        self,
+        names: list[str],
+        date: str,
+        site: str = "not",
+        refresh: bool = False,
+        max_workers: int | None = None,
+        group_ids: list[int] | None = None,
+        plot_format: str | None = None,
+    ) -> dict:
+        """
+        Prepare the night for a list of ZTF-IDs and the sources saved to the given Fritz groups, reusing everything computed in earlier requests for the same date and site
+        """
+        t_start = time.perf_counter()
+
+        with self.lock:
+            # the refresh flag of the Fritz cache is global, it must not stay set for later requests
+            self.fritz.cache.refresh = refresh
+            try:
+                workers = max_workers or self.max_workers
+
+                key = (date, site)
+                new_night = key not in self.observabilities
+
+                if new_night:
+                    self.observabilities[key] = self.Observability(
+                        ztf_ids=names, date=date, site=site, max_workers=workers
+                    )
+
+                obs = self.observabilities[key]
+                obs.ztf_ids = names
+                obs.max_workers = workers
+                if plot_format is not None:
+                    obs.plot_format = plot_format
+
+                if refresh:
+                    obs.targets.clear()
+
+                if group_ids:
+                    obs.add_sources(self.fritz.group_sources(group_ids))
+
+                timings = self.prepare_night(obs=obs, max_workers=workers)
+            finally:
+                self.fritz.cache.refresh = False
+
+        logger.info(
+            f"Planned {len(obs.ztf_ids)} targets for {date} ({site}) in {time.perf_counter() - t_start:.2f} s"
+        )
+
+        return {"info": obs.info, "timings": timings}
+
+
+def make_handler(server: PlanningServer):
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, status: int, content: dict):
+            body = json.dumps(content).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/status":
+                self.send_json(
+                    200,
+                    {"status": "ok", "nights": [*map(list, server.observabilities)]},
+                )
+            else:
+                self.send_json(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/plan":
+                self.send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length))
+                if not isinstance(request, dict):
+                    raise ValueError("The request is not a JSON object")
+                server.check_request(request)
+            except ValueError as e:
+                self.send_json(400, {"error": f"Malformed request: {e}"})
+                return
+
+            try:
+                self.send_json(200, server.plan(**request))
+            except Exception as e:
+                logger.exception("Planning request failed")
+                self.send_json(500, {"error": repr(e)})
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return Handler
+
+
+def serve(port: int = DEFAULT_PORT, max_workers: int = 8):
+    """
+    Run the planning server on localhost until interrupted
+    """
+    server = PlanningServer(max_workers=max_workers)
+    httpd = ThreadingHTTPServer((HOST, port), make_handler(server))
+    logger.info(f"betternot planning server listening on http://{HOST}:{port}")
+
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+def forward(request: dict, port: int = DEFAULT_PORT) -> dict | None:
+    """
+    Send a planning request to a running server. Returns None if no server is running
+    """
+    url = f"http://{HOST}:{port}/plan"
+
+    try:
+        urllib.request.urlopen(f"http://{HOST}:{port}/status", timeout=0.5).close()
+    except (urllib.error.URLError, OSError):
+        return None
+
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(request).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+
+    try:
+        with urllib.request.urlopen(req) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        error = json.loads(e.read()).get("error")
+        raise RuntimeError(f"The planning server failed: {error}")
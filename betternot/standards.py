@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import logging
+from pathlib import Path
+
+import numpy as np
+from astropy import units as u  # type: ignore
+
+from betternot.altaz import analytic_altitude
+from betternot.constraints import Constraints, unit_vectors
+from betternot.io import basedir, get_date_dir
+from betternot.observability import Observability
+from betternot.targets import parse_angles
+
+logger = logging.getLogger(__name__)
+
+# height of the declination zones of the catalog index (deg)
+ZONE_HEIGHT = 1.0
+
+# the sun has to be below this altitude for standard star observations (deg), standards are often taken in nautical twilight
+STANDARD_SUN_ALTITUDE = -12.0
+
+
+class StandardCatalog:
+    """
+    Standard stars with a spatial index: the stars are sorted into declination zones of ZONE_HEIGHT and by RA within each zone, so a cone search only looks at a few RA ranges found by binary search
+    """
+
+    def __init__(
+        self,
+        names: np.ndarray,
+        ra: np.ndarray,
+        dec: np.ndarray,
+        zone_height: float = ZONE_HEIGHT,
+    ):
+        self.zone_height = zone_height
+        self.n_zones = int(np.ceil(180 / zone_height))
+
+        zone = self.zone(np.asarray(dec, dtype=float))
+        order = np.lexsort((ra, zone))
+
+        self.names = np.asarray(names, dtype=str)[order]
+        self.ra = np.asarray(ra, dtype=float)[order]
+        self.dec = np.asarray(dec, dtype=float)[order]
+        self.vectors = unit_vectors(self.ra, self.dec)
+
+        # first index of every zone, plus the end of the last one
+        self.zone_starts = np.searchsorted(zone[order], np.arange(self.n_zones + 1))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def zone(self, dec: np.ndarray) -> np.ndarray:
+        return np.clip(((dec + 90) / self.zone_height).astype(int), 0, self.n_zones - 1)
+
+    @classmethod
+    def from_dict(cls, std_dict: dict):
+        """
+        Catalog from the config format ({name: {"ra": "hh:mm:ss", "dec": "dd:mm:ss"}})
+        """
+        return cls(
+            names=np.array(list(std_dict), dtype=str),
+            ra=parse_angles([info["ra"] for info in std_dict.values()], u.hourangle),
+            dec=parse_angles([info["dec"] for info in std_dict.values()], u.deg),
+        )
+
+    @classmethod
+    def from_file(cls, path: str | Path):
+        """
+        Read a catalog from CSV or ECSV. It needs a name column ("name" or "star") and "ra" and "dec" columns, either in degrees or sexagesimal (RA in hours)
+        """
+        path = Path(path)
+
+        if path.suffix.lower() == ".ecsv":
+            from astropy.table import Table  # type: ignore
+
+            table = Table.read(path, format="ascii.ecsv")
+            columns = {name.lower(): table[name] for name in table.colnames}
+            columns = {
+                key: (
+                    col.quantity.to_value(u.deg)
+                    if col.unit is not None
+                    else np.asarray(col)
+                )
+                for key, col in columns.items()
+            }
+        else:
+            import pandas as pd  # type: ignore
+
+            table = pd.read_csv(path, comment="#", skipinitialspace=True)
+            columns = {name.lower(): table[name].to_numpy() for name in table.columns}
+
+        name_column = "name" if "name" in columns else "star"
+        for column in [name_column, "ra", "dec"]:
+            if column not in columns:
+                raise ValueError(f"{path} has no '{column}' column")
+
+        catalog = cls(
+            names=columns[name_column],
+            ra=parse_angles(columns["ra"], u.hourangle),
+            dec=parse_angles(columns["dec"], u.deg),
+        )
+        logger.debug(f"Loaded {len(catalog)} standards from {path}")
+
+        return catalog
+
+    def cone(self, ra: float, dec: float, radius: float) -> np.ndarray:
+        """
+        Indices of the standards within `radius` (deg) of a position
+        """
+        zones = range(
+            self.zone(np.array(dec - radius)), self.zone(np.array(dec + radius)) + 1
+        )
+        # RA half-width of the cone, all RAs if it contains a pole
+        if abs(dec) + radius >= 90:
+            half_width = 180.0
+        else:
+            half_width = np.degrees(
+                np.arcsin(np.sin(np.radians(radius)) / np.cos(np.radians(dec)))
+            )
+
+        candidates: list[np.ndarray] = []
+        for zone in zones:
+            start, end = self.zone_starts[zone], self.zone_starts[zone + 1]
+            zone_ra = self.ra[start:end]
+            if half_width >= 180:
+                candidates.append(np.arange(start, end))
+                continue
+            # RA ranges, split where they wrap around 0/360
+            lo, hi = (ra - half_width) % 360, (ra + half_width) % 360
+            ranges = [(lo, hi)] if lo <= hi else [(lo, 360), (0, hi)]
+            for ra_lo, ra_hi in ranges:
+                first = np.searchsorted(zone_ra, ra_lo, side="left")
+                last = np.searchsorted(zone_ra, ra_hi, side="right")
+                candidates.append(np.arange(start + first, start + last))
+
+        if not candidates:
+            return np.array([], dtype=int)
+
+        indices = np.concatenate(candidates)
+        cos_sep = self.vectors[indices] @ unit_vectors(np.array(ra), np.array(dec))
+        return indices[cos_sep >= np.cos(np.radians(radius))]
+
+    def near(self, ra: np.ndarray, dec: np.ndarray, radius: float) -> np.ndarray:
+        """
+        Indices of the standards within `radius` (deg) of any of the positions
+        """
+        matches = [self.cone(r, d, radius) for r, d in zip(ra, dec)]
+        if not matches:
+            return np.array([], dtype=int)
+
+        return np.unique(np.concatenate(matches))
+
+
+def load_catalog(config: dict) -> StandardCatalog:
+    """
+    The catalog set as `standard_catalog` in the config (a path relative to the repository), or the standards listed in the config
+    """
+    path = config.get("standard_catalog")
+    if path:
+        return StandardCatalog.from_file(basedir / path)
+
+    return StandardCatalog.from_dict(config["standards"])
+
+
+def select_standards(
+    obs: Observability,
+    catalog: StandardCatalog,
+    n_standards: int = 3,
+    radius: float = 40.0,
+    max_airmass: float = 2.0,
+) -> dict:
+    """
+    Recommend the standards that best match the current science targets. Each science target is taken at the middle of its usable window (see Constraints); a standard scores well if, at those times, its airmass is close to the one of the target. Only standards within `radius` (deg) of a target are considered, as found with the catalog index, the whole catalog is used if none of them is observable. Without targets, the standards that reach the lowest airmass during the night are chosen.
+
+    Returns {name: {"ra": deg, "dec": deg, "score": mean airmass difference}}, best first
+    """
+    targets = obs.current_targets
+    eph = obs.ephemeris
+    dark = eph.sun_alt < STANDARD_SUN_ALTITUDE
+
+    def airmass_grid(ra: np.ndarray, dec: np.ndarray) -> np.ndarray:
+        # the selection does not need astropy accuracy, so the analytic backend is used for targets and standards
+        alt = analytic_altitude(
+            ra=ra,
+            dec=dec,
+            jd=obs.frame_time.obstime.utc.jd,
+            lat=obs.site.lat.deg,
+            lon=obs.site.lon.deg,
+        )
+        airmass = obs.altitude_to_airmass(alt)
+        airmass[alt <= 0] = np.nan
+        return airmass
+
+    science_times = np.array([], dtype=int)
+    science_airmass = np.array([])
+    candidates = np.arange(len(catalog))
+
+    if len(targets):
+        ra, dec = targets.ra, targets.dec
+
+        airmass = airmass_grid(ra=ra, dec=dec)
+        mask = Constraints(max_airmass=max_airmass).apply(
+            airmass=airmass,
+            sun_alt=eph.sun_alt,
+            moon_alt=eph.moon_alt,
+            moon_ra=eph.moon_ra,
+            moon_dec=eph.moon_dec,
+            ra=ra,
+            dec=dec,
+        )
+        rows, times = [], []
+        for row, usable in enumerate(mask):
+            (usable,) = np.nonzero(usable)
+            if len(usable):
+                rows.append(row)
+                times.append(usable[len(usable) // 2])
+        science_times = np.array(times, dtype=int)
+        science_airmass = airmass[rows, times]
+
+        candidates = catalog.near(ra=ra[rows], dec=dec[rows], radius=radius)
+
+    def score_candidates(candidates: np.ndarray) -> np.ndarray:
+        airmass = airmass_grid(ra=catalog.ra[candidates], dec=catalog.dec[candidates])
+        with np.errstate(invalid="ignore"):
+            airmass[np.isnan(airmass) | (airmass > max_airmass)] = np.inf
+        airmass[:, ~dark] = np.inf
+
+        if len(science_times) == 0:
+            return np.min(airmass, axis=1)
+
+        # a standard that is not up at the time of a target counts as the largest possible mismatch for that target, it has to match at least one
+        diff = np.abs(airmass[:, science_times] - science_airmass[np.newaxis, :])
+        score = np.mean(np.minimum(diff, max_airmass - 1), axis=1)
+        score[~np.isfinite(diff).any(axis=1)] = np.inf
+        return score
+
+    score = score_candidates(candidates)
+    if not np.isfinite(score).any() and len(candidates) < len(catalog):
+        candidates = np.arange(len(catalog))
+        score = score_candidates(candidates)
+
+    best = np.argsort(score, kind="stable")[:n_standards]
+    best = best[np.isfinite(score[best])]
+
+    return {
+        str(catalog.names[candidates[i]]): {
+            "ra": float(catalog.ra[candidates[i]]),
+            "dec": float(catalog.dec[candidates[i]]),
+            "score": float(score[i]),
+        }
+        for i in best
+    }
+
+
+def recommend_standards(obs: Observability, n_standards: int = 3) -> dict:
+    """
+    Select the standards for the night and write the best one to DATE/standard.txt, from where reduce.sh picks it up
+    """
+    catalog = load_catalog(obs.config)
+    standards = select_standards(obs=obs, catalog=catalog, n_standards=n_standards)
+
+    if standards:
+        logger.info(
+            "Recommended standards: "
+            + ", ".join(
+                f"{name} (score {info['score']:.2f})"
+                for name, info in standards.items()
+            )
+        )
+        outpath = get_date_dir(obs.date) / "standard.txt"
+        outpath.write_text(next(iter(standards)) + "\n")
+    else:
+        logger.warning("None of the standards is observable tonight")
+
+    return standards
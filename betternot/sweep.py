@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import datetime
+import logging
+import time
+import warnings
+
+import numpy as np
+import pandas as pd  # type: ignore
+from astropy import units as u  # type: ignore
+from astropy.time import Time  # type: ignore
+from matplotlib.figure import Figure  # type: ignore
+
+from betternot.altaz import analytic_altitude
+from betternot.astrodata import get_site, use_local_data
+from betternot.constraints import Constraints, runs
+from betternot.ephemeris import get_ephemerides
+from betternot.io import get_date_dir, load_config
+from betternot.observability import Observability
+from betternot.targets import TargetTable
+
+logger = logging.getLogger(__name__)
+
+# the sun and moon positions are computed every EPHEMERIS_STEP samples (hourly on the default grid) and interpolated in between
+EPHEMERIS_STEP = 4
+
+
+class Sweep:
+    """
+    Observability of many targets over a range of nights and several sites, computed as one targets x sites x nights x times cube
+
+    targets: a TargetTable, or a dict as in the config ({name: {"ra": ..., "dec": ...}})
+    start_date: first night (YYYY-MM-DD)
+    n_nights: number of nights
+    sites: site names from the config (default: all configured sites)
+    constraints: airmass, sun and moon constraints (default: Constraints())
+    n_times: number of samples per night. The sweep only needs a coarse grid, the default is one sample per 15 minutes
+
+    The altitudes come from the analytic backend, the sun and moon tracks from the (cached) ephemerides
+    """
+
+    def __init__(
+        self,
+        targets: TargetTable | dict,
+        start_date: str | None = None,
+        n_nights: int = 30,
+        sites: list | None = None,
+        constraints: Constraints | None = None,
+        n_times: int = 97,
+    ):
+        self.config = load_config()
+        use_local_data()
+
+        if start_date is None:
+            start_date = datetime.date.today().strftime("%Y-%m-%d")
+        self.start_date = start_date
+
+        table = TargetTable.from_dict(targets) if isinstance(targets, dict) else targets
+        self.names = list(table.names)
+        self.coords = table.coords
+        self.sites = list(self.config["sites"]) if sites is None else sites
+        self.constraints = constraints if constraints is not None else Constraints()
+
+        start = datetime.date.fromisoformat(start_date)
+        self.dates = [
+            (start + datetime.timedelta(days=i)).strftime("%Y-%m-%d")
+            for i in range(n_nights)
+        ]
+        # the nights start from the same midnight as in Observability, but on a coarser time grid, so their ephemerides are computed and cached separately from the per-night ones
+        self.midnights = (
+            Time(start_date, format="isot", scale="utc")
+            + (1 * u.hour)
+            + np.arange(n_nights) * u.day
+        )
+        self.delta_midnight = np.linspace(-12, 12, n_times) * u.hour
+
+        self.hours: np.ndarray | None = None
+        self.best_airmass: np.ndarray | None = None
+
+    def compute(self):
+        """
+        Compute the usable hours and the best airmass per target, site and night, both of shape (n_targets, n_sites, n_nights)
+        """
+        t_start = time.perf_counter()
+
+        ra = self.coords.icrs.ra.deg.reshape(-1)
+        dec = self.coords.icrs.dec.deg.reshape(-1)
+        n_targets, n_sites, n_nights = len(ra), len(self.sites), len(self.dates)
+        n_times = len(self.delta_midnight)
+
+        jd = (
+            self.midnights.utc.jd[:, np.newaxis]
+            + self.delta_midnight.to_value(u.day)[np.newaxis, :]
+        ).reshape(-1)
+
+        alt = np.empty((n_targets, n_sites, n_nights, n_times), dtype=np.float32)
+        tracks: dict = {
+            field: np.empty((n_sites, n_nights, n_times))
+            for field in ["sun_alt", "moon_alt", "moon_ra", "moon_dec"]
+        }
+
+        for s, site_name in enumerate(self.sites):
+            site = get_site(site_name)
+            ephemerides = get_ephemerides(
+                site=site,
+                midnights=self.midnights,
+                delta_midnight=self.delta_midnight,
+                step=EPHEMERIS_STEP,
+            )
+            for field, cube in tracks.items():
+                cube[s] = [getattr(eph, field) for eph in ephemerides]
+
+            alt[:, s] = analytic_altitude(
+                ra=ra, dec=dec, jd=jd, lat=site.lat.deg, lon=site.lon.deg
+            ).reshape(n_targets, n_nights, n_times)
+
+        airmass = Observability.altitude_to_airmass(alt)
+        airmass[alt <= 0] = np.nan
+
+        mask = self.constraints.apply(
+            airmass=airmass,
+            sun_alt=tracks["sun_alt"],
+            moon_alt=tracks["moon_alt"],
+            moon_ra=tracks["moon_ra"],
+            moon_dec=tracks["moon_dec"],
+            ra=ra,
+            dec=dec,
+        )
+
+        # drop windows that are shorter than the minimum window length
+        grid = self.delta_midnight.to_value(u.hour)
+        dt = grid[1] - grid[0]
+        flat = mask.reshape(-1, n_times)
+        rows, starts, ends = runs(flat)
+        lengths = (ends - starts) * dt
+        keep = lengths >= self.constraints.min_window
+        hours = np.bincount(rows[keep], weights=lengths[keep], minlength=len(flat))
+
+        with warnings.catch_warnings():
+            # all-NaN slices for targets that are not observable in a night
+            warnings.simplefilter("ignore")
+            best_airmass = np.nanmin(np.where(mask, airmass, np.nan), axis=-1)
+
+        self.hours = hours.reshape(n_targets, n_sites, n_nights)
+        self.best_airmass = np.where(self.hours > 0, best_airmass, np.nan)
+
+        logger.debug(
+            f"Swept {n_targets} targets x {n_sites} sites x {n_nights} nights in {time.perf_counter() - t_start:.2f} s"
+        )
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Best site and night for every target (most usable hours, ties broken by the lower airmass), and the number of usable nights per site
+        """
+        if self.hours is None or self.best_airmass is None:
+            self.compute()
+        assert self.hours is not None and self.best_airmass is not None
+
+        n_targets, n_sites, n_nights = self.hours.shape
+        score = self.hours - 1e-3 * np.nan_to_num(self.best_airmass, nan=0)
+        best = np.argmax(score.reshape(n_targets, -1), axis=1)
+        best_site, best_night = np.unravel_index(best, (n_sites, n_nights))
+        index = np.arange(n_targets)
+        observable = self.hours[index, best_site, best_night] > 0
+
+        # None for targets that are not observable at any site and night
+        best_sites = np.array(self.sites, dtype=object)[best_site]
+        best_sites[~observable] = None
+        best_nights = np.array(self.dates, dtype=object)[best_night]
+        best_nights[~observable] = None
+
+        table = pd.DataFrame(
+            {
+                "best_site": best_sites,
+                "best_night": best_nights,
+                "hours": self.hours[index, best_site, best_night],
+                "airmass": self.best_airmass[index, best_site, best_night],
+            },
+            index=pd.Index(self.names, name="name"),
+        )
+        for s, site in enumerate(self.sites):
+            table[f"nights_{site}"] = np.sum(self.hours[:, s] > 0, axis=1)
+
+        return table
+
+    def plot_heatmap(self, savename: str = "sweep"):
+        """
+        Usable hours per target and night, one panel per site. Saved in the directory of the first night
+        """
+        if self.hours is None or self.best_airmass is None:
+            self.compute()
+        assert self.hours is not None and self.best_airmass is not None
+
+        n_targets, n_sites, n_nights = self.hours.shape
+        label_size = 14
+
+        fig = Figure(figsize=(9, n_sites * max(2.5, 0.15 * n_targets + 1)))
+        axes = fig.subplots(n_sites, 1, squeeze=False)[:, 0]
+
+        tick_step = max(1, n_nights // 15)
+        for s, ax in enumerate(axes):
+            image = ax.imshow(
+                self.hours[:, s],
+                aspect="auto",
+                interpolation="none",
+                cmap="viridis",
+                vmin=0,
+                vmax=max(float(np.max(self.hours)), 1),
+            )
+            ax.set_title(self.config["sites"][self.sites[s]]["pretty"])
+            ax.set_xticks(
+                np.arange(0, n_nights, tick_step),
+                labels=self.dates[::tick_step],
+                rotation=45,
+                ha="right",
+            )
+            if n_targets <= 50:
+                ax.set_yticks(np.arange(n_targets), labels=self.names, fontsize=8)
+            else:
+                ax.set_ylabel("Target", fontsize=label_size)
+            fig.colorbar(image, ax=ax, label="Usable hours")
+
+        fig.tight_layout()
+        outpath = get_date_dir(self.start_date) / f"{savename}.pdf"
+        fig.savefig(outpath, bbox_inches="tight")
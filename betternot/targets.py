@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+from collections.abc import Sequence
+
+import numpy as np
+from astropy import units as u  # type: ignore
+from astropy.coordinates import Angle, SkyCoord  # type: ignore
+
+# bits of the flags column
+FLAG_STANDARD = 1
+FLAG_NO_PHOTOMETRY = 2
+
+
+def parse_angles(values, unit) -> np.ndarray:
+    """
+    Angles in degrees from values that are floats or sexagesimal strings (RA strings are hours), which may be mixed
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in "iuf":
+        return values.astype(float)
+
+    # element-wise, as converting a mixed list to an array would turn the floats into strings
+    return np.array(
+        [
+            (Angle(value, unit=unit).deg if isinstance(value, str) else float(value))
+            for value in values
+        ],
+        dtype=float,
+    )
+
+
+class TargetTable:
+    """
+    Targets as columns: name, ra and dec (deg), mag, mjd and band of the latest detection and flags (FLAG_*). Coordinates are parsed once when targets are added, and all targets share one SkyCoord array, which is built on first use
+
+    Indexing with a name returns the row as a dict, e.g. table["ZTF23aalftvv"]["ra"]
+    """
+
+    def __init__(self):
+        self.names = np.array([], dtype=str)
+        self.ra = np.array([], dtype=float)
+        self.dec = np.array([], dtype=float)
+        self.mag = np.array([], dtype=float)
+        self.mjd = np.array([], dtype=float)
+        self.band = np.array([], dtype=object)
+        self.flags = np.array([], dtype=np.int32)
+
+        self._index: dict = {}
+        self._coords: SkyCoord | None = None
+
+    @classmethod
+    def from_dict(cls, target_dict: dict, flags: int = 0):
+        """
+        Table from {name: {"ra": ..., "dec": ...}} as in the config, with RA/Dec in degrees or sexagesimal strings
+        """
+        table = cls()
+        table.add(
+            names=list(target_dict),
+            ra=parse_angles([info["ra"] for info in target_dict.values()], u.hourangle),
+            dec=parse_angles([info["dec"] for info in target_dict.values()], u.deg),
+            mag=[info.get("mag") for info in target_dict.values()],
+            mjd=[info.get("mjd") for info in target_dict.values()],
+            band=[info.get("band") for info in target_dict.values()],
+            flags=flags,
+        )
+        return table
+
+    def add(
+        self,
+        names: Sequence | np.ndarray,
+        ra: Sequence | np.ndarray,
+        dec: Sequence | np.ndarray,
+        mag: Sequence | np.ndarray | None = None,
+        mjd: Sequence | np.ndarray | None = None,
+        band: Sequence | None = None,
+        flags: int | np.ndarray = 0,
+    ):
+        """
+        Append targets (RA/Dec in degrees), given as lists, tuples or arrays. Missing magnitudes and MJDs are stored as NaN
+        """
+        n_new = len(names)
+        if n_new == 0:
+            return
+
+        def column(values, dtype):
+            if values is None:
+                values = [None] * n_new
+            return np.array([np.nan if v is None else v for v in values], dtype=dtype)
+
+        mag = column(mag, float)
+        flags = np.broadcast_to(np.asarray(flags, dtype=np.int32), (n_new,))
+        flags = flags | np.where(np.isnan(mag), FLAG_NO_PHOTOMETRY, 0).astype(np.int32)
+
+        self.names = np.concatenate([self.names, np.asarray(names, dtype=str)])
+        self.ra = np.concatenate([self.ra, np.asarray(ra, dtype=float)])
+        self.dec = np.concatenate([self.dec, np.asarray(dec, dtype=float)])
+        self.mag = np.concatenate([self.mag, mag])
+        self.mjd = np.concatenate([self.mjd, column(mjd, float)])
+        self.band = np.concatenate(
+            [
+                self.band,
+                np.array(band if band is not None else [None] * n_new, dtype=object),
+            ]
+        )
+        self.flags = np.concatenate([self.flags, flags])
+
+        self._reindex()
+
+    def select(self, names: list):
+        """
+        New table with the given targets, in that order (names that are not in the table are skipped)
+        """
+        rows = [self._index[name] for name in names if name in self._index]
+        return self.take(np.array(rows, dtype=int))
+
+    def take(self, rows: np.ndarray):
+        """
+        New table with the given rows
+        """
+        table = TargetTable()
+        for column in ["names", "ra", "dec", "mag", "mjd", "band", "flags"]:
+            setattr(table, column, getattr(self, column)[rows])
+        table._reindex()
+
+        if self._coords is not None:
+            table._coords = self._coords[rows]
+
+        return table
+
+    def clear(self):
+        self.__init__()
+
+    def _reindex(self):
+        self._index = {name: row for row, name in enumerate(self.names)}
+        self._coords = None
+
+    @property
+    def coords(self) -> SkyCoord:
+        """
+        All targets as one SkyCoord array
+        """
+        if self._coords is None:
+            self._coords = SkyCoord(self.ra, self.dec, unit=(u.deg, u.deg))
+        return self._coords
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self._index
+
+    def __getitem__(self, name: str) -> dict:
+        row = self._index[name]
+        return {
+            "ra": float(self.ra[row]),
+            "dec": float(self.dec[row]),
+            "mag": float(self.mag[row]),
+            "mjd": float(self.mjd[row]),
+            "band": self.band[row],
+            "flags": int(self.flags[row]),
+        }
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import datetime
+import io
+import json
+import logging
+import threading
+import zipfile
+from pathlib import Path
+from typing import IO
+
+import numpy as np
+import requests
+from numpy.typing import ArrayLike
+
+from betternot import credentials
+from betternot.io import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+TNS_BOT_ID = "115364"
+TNS_BOT_NAME = "ZTF_DESY"
+
+SEARCH_URL = "https://www.wis-tns.org/api/get/search"
+# the full public object list, and the daily lists of new and modified objects (_YYYYMMDD)
+DUMP_URL = "https://www.wis-tns.org/system/files/tns_public_objects/tns_public_objects{suffix}.csv.zip"
+
+# height of the declination zones of the catalog index (deg), of the order of the match radius
+ZONE_HEIGHT = 0.05
+
+# default match radius (arcsec)
+MATCH_RADIUS = 3.0
+
+CATALOG_PATH = get_cache_dir() / "tns_catalog.npz"
+
+
+def tns_headers() -> dict:
+    tns_marker = (
+        'tns_marker{"tns_id": "'
+        + str(TNS_BOT_ID)
+        + '", "type": "bot", "name": "'
+        + TNS_BOT_NAME
+        + '"}'
+    )
+    return {"User-Agent": tns_marker}
+
+
+class TNSCatalog:
+    """
+    TNS objects with a spatial index, so that any number of positions can be matched locally. As for the standard star catalog, the objects are sorted into declination zones and by RA within each zone; here the zone and RA are combined into one sorted key, so the RA ranges of all positions are found with a single binary search per neighbouring zone
+
+    The catalog is built from the public CSV list of TNS objects, and kept as an npz file in the cache directory
+    """
+
+    def __init__(
+        self,
+        names: np.ndarray,
+        ra: np.ndarray,
+        dec: np.ndarray,
+        updated: str | None = None,
+        zone_height: float = ZONE_HEIGHT,
+    ):
+        self.zone_height = zone_height
+        self.n_zones = int(np.ceil(180 / zone_height))
+        self.updated = updated
+
+        ra = np.asarray(ra, dtype=float) % 360
+        dec = np.asarray(dec, dtype=float)
+        key = self.key(ra=ra, dec=dec)
+        order = np.argsort(key, kind="stable")
+
+        self.names = np.asarray(names, dtype=str)[order]
+        self.ra = ra[order]
+        self.dec = dec[order]
+        self.sort_key = key[order]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def zone(self, dec: np.ndarray) -> np.ndarray:
+        return np.clip(((dec + 90) / self.zone_height).astype(int), 0, self.n_zones - 1)
+
+    def key(self, ra: np.ndarray, dec: np.ndarray) -> np.ndarray:
+        return self.zone(dec) * 360.0 + ra
+
+    @classmethod
+    def from_csv(cls, path: Path | str | IO[bytes]):
+        """
+        Read the public TNS object list (tns_public_objects.csv, optionally zipped). Its first line is the time of the dump, followed by the header
+        """
+        import pandas as pd  # type: ignore
+
+        if str(path).endswith(".zip"):
+            with zipfile.ZipFile(path) as archive:
+                with archive.open(archive.namelist()[0]) as f:
+                    return cls.from_csv(io.BytesIO(f.read()))
+
+        if isinstance(path, (Path, str)):
+            with open(path, "rb") as f:
+                first_line = f.readline()
+        else:
+            first_line = path.readline()
+            path.seek(0)
+        header_line = first_line.decode()
+
+        has_timestamp = "name" not in header_line
+        table = pd.read_csv(
+            path,
+            skiprows=1 if has_timestamp else 0,
+            usecols=["name", "ra", "declination"],
+        )
+        updated = header_line.strip().strip('"') if has_timestamp else None
+
+        catalog = cls(
+            names=table["name"].to_numpy(),
+            ra=table["ra"].to_numpy(),
+            dec=table["declination"].to_numpy(),
+            updated=updated,
+        )
+        logger.debug(f"Read {len(catalog)} TNS objects (dump of {updated})")
+
+        return catalog
+
+    def save(self, path: Path = CATALOG_PATH):
+        np.savez(
+            path,
+            names=self.names,
+            ra=self.ra,
+            dec=self.dec,
+            updated=np.array(self.updated or ""),
+        )
+
+    @classmethod
+    def load(cls, path: Path = CATALOG_PATH):
+        with np.load(path) as data:
+            return cls(
+                names=data["names"],
+                ra=data["ra"],
+                dec=data["dec"],
+                updated=str(data["updated"]) or None,
+            )
+
+    def merge(self, other):
+        """
+        Catalog with the objects of another one (e.g. a daily list) added; objects in both take the position of the other
+        """
+        keep = ~np.isin(self.names, other.names)
+
+        return TNSCatalog(
+            names=np.concatenate([self.names[keep], other.names]),
+            ra=np.concatenate([self.ra[keep], other.ra]),
+            dec=np.concatenate([self.dec[keep], other.dec]),
+            updated=other.updated or self.updated,
+            zone_height=self.zone_height,
+        )
+
+    def match(
+        self, ra: np.ndarray, dec: np.ndarray, radius: float = MATCH_RADIUS
+    ) -> list[str | None]:
+        """
+        Name of the closest TNS object within `radius` (arcsec) of every position, None where there is none
+        """
+        ra = np.atleast_1d(np.asarray(ra, dtype=float)) % 360
+        dec = np.atleast_1d(np.asarray(dec, dtype=float))
+        n_positions = len(ra)
+        radius_deg = radius / 3600
+
+        best = np.full(n_positions, -1)
+        best_sep = np.full(n_positions, np.inf)
+
+        if len(self) == 0 or n_positions == 0:
+            return [None] * n_positions
+
+        cos_dec = np.cos(np.radians(np.minimum(np.abs(dec) + radius_deg, 89.9999)))
+        half_width = np.minimum(radius_deg / cos_dec, 180)
+
+        zone_lo = self.zone(dec - radius_deg)
+        zone_hi = self.zone(dec + radius_deg)
+
+        for zone_offset in range(int(np.max(zone_hi - zone_lo)) + 1):
+            zone = zone_lo + zone_offset
+            valid = zone <= zone_hi
+
+            # the RA range, and its wrapped parts around 0/360
+            for shift in (0, 360, -360):
+                lo = np.searchsorted(
+                    self.sort_key, zone * 360.0 + ra + shift - half_width, "left"
+                )
+                hi = np.searchsorted(
+                    self.sort_key, zone * 360.0 + ra + shift + half_width, "right"
+                )
+                if shift:
+                    # only the part of the range that falls into this zone
+                    lo = np.maximum(
+                        lo, np.searchsorted(self.sort_key, zone * 360.0, "left")
+                    )
+                    hi = np.minimum(
+                        hi, np.searchsorted(self.sort_key, (zone + 1) * 360.0, "left")
+                    )
+                counts = np.where(valid, np.maximum(hi - lo, 0), 0)
+                if not counts.any():
+                    continue
+
+                # all candidate pairs (position, catalog row)
+                positions = np.repeat(np.arange(n_positions), counts)
+                starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+                rows = starts + np.arange(counts.sum())
+
+                sep = angular_separation(
+                    ra[positions], dec[positions], self.ra[rows], self.dec[rows]
+                )
+                closer = (sep <= radius_deg) & (sep < best_sep[positions])
+                # the closest candidate per position wins (the last assignment of a position counts, so sort by decreasing separation)
+                order = np.argsort(-sep[closer], kind="stable")
+                best[positions[closer][order]] = rows[closer][order]
+                best_sep[positions[closer][order]] = sep[closer][order]
+
+        return [str(self.names[row]) if row >= 0 else None for row in best]
+
+
+def angular_separation(
+    ra_1: np.ndarray, dec_1: np.ndarray, ra_2: np.ndarray, dec_2: np.ndarray
+) -> np.ndarray:
+    """
+    Angular distance (deg), with the haversine formula that is accurate for small separations
+    """
+    ra_1, dec_1, ra_2, dec_2 = map(np.radians, (ra_1, dec_1, ra_2, dec_2))
+    hav = (
+        np.sin((dec_2 - dec_1) / 2) ** 2
+        + np.cos(dec_1) * np.cos(dec_2) * np.sin((ra_2 - ra_1) / 2) ** 2
+    )
+    return np.degrees(2 * np.arcsin(np.sqrt(np.clip(hav, 0, 1))))
+
+
+_catalog: TNSCatalog | None = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> TNSCatalog | None:
+    """
+    The local TNS catalog from the cache directory, None if there is none (see `update_catalog`)
+    """
+    global _catalog
+
+    with _catalog_lock:
+        if _catalog is None and CATALOG_PATH.is_file():
+            _catalog = TNSCatalog.load()
+            logger.debug(
+                f"Loaded {len(_catalog)} TNS objects (updated {_catalog.updated})"
+            )
+
+    return _catalog
+
+
+def download(day: datetime.date | None = None) -> TNSCatalog:
+    """
+    Download the public TNS object list, or the list of objects that were added or modified on one day
+    """
+    suffix = "" if day is None else f"_{day.strftime('%Y%m%d')}"
+    url = DUMP_URL.format(suffix=suffix)
+
+    response = requests.post(
+        url,
+        headers=tns_headers(),
+        data={"api_key": credentials.get_token("TNS")},
+    )
+    if response.status_code != 200:
+        raise requests.exceptions.RequestException(
+            f"Downloading {url} failed with status code {response.status_code}"
+        )
+
+    return TNSCatalog.from_csv(io.BytesIO(response.content))
+
+
+def update_catalog(csv_path: Path | str | None = None) -> TNSCatalog:
+    """
+    Build the local catalog from a TNS CSV dump (or download the full list if there is no local catalog yet), then add the daily lists of new and modified objects since the catalog was last updated
+    """
+    global _catalog
+
+    if csv_path is not None:
+        catalog = TNSCatalog.from_csv(csv_path)
+    elif (existing := get_catalog()) is not None:
+        catalog = existing
+    else:
+        catalog = download()
+
+    if catalog.updated:
+        last = datetime.date.fromisoformat(catalog.updated[:10])
+        today = datetime.datetime.utcnow().date()
+        day = last
+        while day < today:
+            try:
+                catalog = catalog.merge(download(day))
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"No daily TNS list for {day}: {e}")
+                break
+            day += datetime.timedelta(days=1)
+
+    catalog.save()
+    with _catalog_lock:
+        _catalog = catalog
+
+    logger.info(
+        f"Local TNS catalog: {len(catalog)} objects (updated {catalog.updated})"
+    )
+
+    return catalog
+
+
+def query_tns(ra: float, dec: float, radius: float = MATCH_RADIUS) -> str | None:
+    """
+    Cone search on TNS for the name of an object. Returns None if there is no object or the query failed
+    """
+    get_obj = {
+        "ra": ra,
+        "dec": dec,
+        "radius": radius,
+        "units": "arcsec",
+    }
+    json_string = json.dumps(get_obj)
+
+    # I have no idea why the token is not in the header
+    payload = {"api_key": credentials.get_token("TNS"), "data": json_string}
+
+    logger.debug(f"Querying TNS at {SEARCH_URL}: {json_string}")
+
+    response = requests.post(SEARCH_URL, headers=tns_headers(), data=payload)
+
+    if response.status_code != 200:
+        logger.warning(
+            f"You got status code {response.status_code}. Something went wrong"
+        )
+        return None
+
+    reply = response.json()["data"]["reply"]
+
+    if len(reply) > 0:
+        return reply[0]["objname"]
+
+    return None
+
+
+def resolve_names(
+    ra: ArrayLike, dec: ArrayLike, radius: float = MATCH_RADIUS, live: bool = True
+) -> list[str | None]:
+    """
+    TNS names of many positions: all are matched against the local catalog at once, and only the positions without a match are queried live on TNS (unless `live=False`)
+    """
+    ra_values = np.atleast_1d(np.asarray(ra, dtype=float))
+    dec_values = np.atleast_1d(np.asarray(dec, dtype=float))
+
+    catalog = get_catalog()
+    if catalog is not None:
+        names = catalog.match(ra=ra_values, dec=dec_values, radius=radius)
+    else:
+        names = [None] * len(ra_values)
+
+    if live:
+        for i, name in enumerate(names):
+            if name is None:
+                names[i] = query_tns(
+                    ra=float(ra_values[i]), dec=float(dec_values[i]), radius=radius
+                )
+
+    return names
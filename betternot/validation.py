@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# Author: Simeon Reusch (simeon.reusch@desy.de)
+# License: BSD-3-Clause
+
+import difflib
+import functools
+import json
+from pathlib import Path
+
+ALLOWED_VALUES_PATH = (
+    Path(__file__).parents[1] / "data" / "template_allowed_values.json"
+)
+
+# report fields that hold IDs, and the table of allowed values they are checked against
+OBJECT_FIELDS = {"groupid": "groups", "objtypeid": "object_types"}
+SPECTRUM_FIELDS = {
+    "groupid": "groups",
+    "instrumentid": "instruments",
+    "WL_unitid": "units",
+    "flux_unitid": "units",
+    "wl_medium_id": "wl_media",
+    "flux_calib_by_id": "flux_calibs",
+    "extinction_corr_id": "extinctions",
+    "spectypeid": "spectra_types",
+    "qualityid": "spectra_quality",
+}
+SPECTRUM_LIST_FIELDS = {"spec_proprietary_period_groups": "groups"}
+
+# fields that have to be filled in for every spectrum
+REQUIRED_SPECTRUM_FIELDS = ("ascii_file", "obsdate", "instrumentid")
+
+
+class AllowedValues:
+    """
+    The IDs and names WISeREP accepts (data/template_allowed_values.json), indexed for lookups in both directions. Names are matched case-insensitively, and instruments also by their parts, so "ALFOSC" finds "NOT - ALFOSC"
+    """
+
+    def __init__(self, path: Path | str = ALLOWED_VALUES_PATH):
+        with open(path, "r") as f:
+            self.tables: dict = json.load(f)
+
+        self.names: dict = {}
+        self.parts: dict = {}
+        for category, table in self.tables.items():
+            self.names[category] = {name.lower(): id for id, name in table.items()}
+            parts: dict = {}
+            for id, name in table.items():
+                for part in name.lower().split(" - "):
+                    parts.setdefault(part.strip(), set()).add(id)
+            self.parts[category] = parts
+
+    def name(self, category: str, id: str | int) -> str | None:
+        return self.tables[category].get(str(id))
+
+    def lookup(self, category: str, value: str | int) -> str:
+        """
+        The ID of a value given either as an ID or as a name. Raises a KeyError if the value is unknown or ambiguous
+        """
+        value = str(value).strip()
+        if value in self.tables[category]:
+            return value
+
+        key = value.lower()
+        if key in self.names[category]:
+            return self.names[category][key]
+
+        ids = self.parts[category].get(key, set())
+        if len(ids) == 1:
+            return next(iter(ids))
+
+        if len(ids) > 1:
+            candidates = sorted(self.tables[category][id] for id in ids)
+            raise KeyError(
+                f"'{value}' is ambiguous in {category}: {', '.join(candidates)}"
+            )
+
+        close = difflib.get_close_matches(
+            key, list(self.names[category]) + list(self.parts[category]), n=3
+        )
+        message = f"'{value}' is not a known ID or name in {category}"
+        if close:
+            message += f" (did you mean {', '.join(close)}?)"
+        raise KeyError(message)
+
+
+@functools.lru_cache(maxsize=1)
+def allowed_values() -> AllowedValues:
+    """
+    The allowed values, loaded once
+    """
+    return AllowedValues()
+
+
+def lookup_id(category: str, value: str | int) -> str:
+    """
+    ID of a name (or ID) in a category of the allowed values, e.g. lookup_id("instruments", "ALFOSC") -> "41"
+    """
+    return allowed_values().lookup(category, value)
+
+
+def validate_report(report: dict) -> list[str]:
+    """
+    Check all IDs of a spectrum report against the allowed values before it is sent. Names are replaced by their IDs in place. Returns a list of errors, empty if the report is valid
+    """
+    values = allowed_values()
+    errors = []
+
+    def check(container: dict | list, field, category: str, location: str):
+        value = (
+            container[field] if isinstance(container, list) else container.get(field)
+        )
+        if value in (None, ""):
+            return
+        try:
+            container[field] = values.lookup(category, value)
+        except KeyError as e:
+            name = f"[{field}]" if isinstance(field, int) else f".{field}"
+            errors.append(f"{location}{name}: {e.args[0]}")
+
+    for i, obj in enumerate(report.get("objects", [])):
+        location = f"objects[{i}]"
+        for field, category in OBJECT_FIELDS.items():
+            check(obj, field, category, location)
+
+        spectra = (obj.get("spectra") or {}).get("spectra_group", [])
+        for j, spectrum in enumerate(spectra):
+            spectrum_location = f"{location}.spectra_group[{j}]"
+
+            for field in REQUIRED_SPECTRUM_FIELDS:
+                if spectrum.get(field) in (None, ""):
+                    errors.append(f"{spectrum_location}.{field}: missing")
+
+            for field, category in SPECTRUM_FIELDS.items():
+                check(spectrum, field, category, spectrum_location)
+
+            for field, category in SPECTRUM_LIST_FIELDS.items():
+                entries = spectrum.get(field) or []
+                for k in range(len(entries)):
+                    check(entries, k, category, f"{spectrum_location}.{field}")
+
+    return errors
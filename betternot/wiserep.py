@@ -1,32 +1,216 @@
 #!/usr/bin/env python3
 
+import copy
 import datetime
+import functools
 import json
 import logging
 import os
+import re
 import sys
 import time
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import requests
 import yaml
-from astropy.io import ascii  # type: ignore
 
 from betternot import credentials
-from betternot.fritz import radec
+from betternot.multipart import MultipartStream
+from betternot.tns import resolve_names
+from betternot.validation import lookup_id, validate_report
 
-TNS_TOKEN = credentials.get_credentials(service="TNS", token=True)["token"]
-TNS_BOT_ID = "115364"
-TNS_BOT_NAME = "ZTF_DESY"
-WISEREP_TOKEN = credentials.get_credentials(service="WISEREP", token=True)["token"]
 WISEREP_BOT_ID = "1234"
 WISEREP_BOT_NAME = "OKC_ZTF"
 
+# maximum size (in bytes) of the files sent in one file-upload request
+MAX_UPLOAD_SIZE = 20 * 1024**2
+# number of parallel Fritz/TNS lookups
+TNS_WORKERS = 4
+# attempts per file-upload request
+UPLOAD_RETRIES = 3
 
-class Wiserep:
+# ASCII header values (lower case) of the wavelength system, and their WISeREP IDs
+WL_MEDIA = {"air": "1", "vacuum": "2"}
+
+
+@functools.lru_cache(maxsize=1)
+def _template() -> dict:
+    template_path = Path(__file__).parent.parent / "data" / "template.yaml"
+    with open(template_path, "r") as stream:
+        return yaml.safe_load(stream)
+
+
+def load_template() -> dict:
+    """
+    A fresh copy of the spectrum report template (the file is only read once)
+    """
+    return copy.deepcopy(_template())
+
+
+def scan_header(spec_path: Path | str) -> dict:
+    """
+    Read the `# KEY=VALUE` header of an ASCII spectrum (as written by PypeIt), stopping at the first data line
+    """
+    header = {}
+    with open(spec_path, "r") as f:
+        for line in f:
+            if not line.startswith("#"):
+                break
+            key, sep, val = line[1:].partition("=")
+            if sep:
+                header[key.strip()] = val.strip()
+
+    return header
+
+
+def header_metadata(header: dict) -> dict:
+    """
+    Map the header of an ASCII spectrum onto the fields of the spectrum report
+    """
+    metadict: dict = {}
+
+    observer = header.get("OBSERVER", header.get("HOME_OBSERVER"))
+    if observer is not None:
+        metadict.update({"observer": observer})
+    if "REDUCER" in header:
+        metadict.update({"reducer": header["REDUCER"]})
+    if "DATE-OBS" in header:
+        metadict.update({"obsdate": header["DATE-OBS"].replace("T", " ")})
+
+    exptime = int(float(header.get("EXPTIME", 0)))
+    ncombine = int(header.get("NCOMBINE", 1))
+    metadict.update({"exptime": ncombine * exptime})
+
+    if "SLIT" in header:
+        # e.g. Slit_1.0, the width in arcsec
+        width = re.search(r"\d+(\.\d+)?", header["SLIT"])
+        metadict.update({"slit": width.group() if width else header["SLIT"]})
+    if "DISERPER" in header:
+        metadict.update({"grism": header["DISERPER"].replace("_", " ")})
+    if header.get("WLENSYSTEM", "").lower() in WL_MEDIA:
+        metadict.update({"wl_medium_id": WL_MEDIA[header["WLENSYSTEM"].lower()]})
+    if "FLUX_FACTOR" in header:
+        metadict.update({"flux_unit_coeff": header["FLUX_FACTOR"]})
+    if "TELESCOPE" in header and "INSTRUMENT" in header:
+        try:
+            metadict.update(
+                {
+                    "instrumentid": lookup_id(
+                        "instruments", f"{header['TELESCOPE']} - {header['INSTRUMENT']}"
+                    )
+                }
+            )
+        except KeyError:
+            # not every telescope/instrument combination is known to WISeREP, then the template value is kept
+            pass
+
+    return metadict
+
+
+class WiserepClient:
+    """
+    The WISeREP endpoints shared by single and batch uploads: file upload and bulk report
+    """
+
+    def __init__(self, sandbox: bool = True):
+        self.logger = logging.getLogger()
+
+        if sandbox:
+            self.wiserep_endpoint = "https://sandbox.wiserep.org/api"
+        else:
+            self.wiserep_endpoint = "https://www.wiserep.org/api"
+
+    def upload_files(self, file_list: list[Path]) -> list:
+        """
+        Upload files to WISeREP and check the response. The request body is streamed from disk (see MultipartStream), and a failed request is tried again up to UPLOAD_RETRIES times. Returns the server filenames, or Nones if the upload failed
+        """
+        self.logger.info(
+            f"Uploading {' '.join(str(x) for x in file_list)} to the WISeREP"
+        )
+        url = self.wiserep_endpoint + "/file-upload"
+
+        files = {f"files[{i}]": Path(path) for i, path in enumerate(file_list)}
+
+        for attempt in range(1, UPLOAD_RETRIES + 1):
+            # api key data
+            with MultipartStream(
+                fields={"bot_api_key": credentials.get_token("WISEREP")}, files=files
+            ) as body:
+                headers = {
+                    "User-Agent": 'tns_marker{"tns_id":'
+                    + str(WISEREP_BOT_ID)
+                    + ', "type":"bot",'
+                    ' "name":"' + WISEREP_BOT_NAME + '"}',
+                    "Content-Type": body.content_type,
+                }
+                try:
+                    response = requests.post(url, headers=headers, data=body)
+                except requests.exceptions.RequestException as e:
+                    self.logger.warn(f"Upload attempt {attempt} failed: {e!r}")
+                    if attempt < UPLOAD_RETRIES:
+                        time.sleep(2**attempt)
+                    continue
+
+                if response.status_code == 200:
+                    server_filenames = response.json()["data"]
+                    self.logger.info(
+                        f"Received and saved as {server_filenames} on the WISeREP server ({len(body) / 1024**2:.1f} MB at {body.throughput:.1f} MB/s)"
+                    )
+                    return server_filenames
+
+            self.logger.warn(
+                f"Something went wrong. Reponse code: {response.status_code}"
+            )
+            if response.status_code < 500:
+                break
+            if attempt < UPLOAD_RETRIES:
+                time.sleep(2**attempt)
+
+        return [None] * len(file_list)
+
+    # function for sending json metadata
+    def send_json_report(self, json_report: str):
+        report_url = self.wiserep_endpoint + "/bulk-report"
+        # headers
+        headers = {
+            "User-Agent": 'tns_marker{"tns_id":'
+            + str(WISEREP_BOT_ID)
+            + ', "type":"bot",'
+            ' "name":"' + WISEREP_BOT_NAME + '"}'
+        }
+
+        payload = {"bot_api_key": credentials.get_token("WISEREP"), "data": json_report}
+
+        response = requests.post(report_url, headers=headers, data=payload)
+
+        if response.status_code == 200:
+            self.logger.info("Sent metadata to WISeREP")
+            return response.json()
+        else:
+            self.logger.warn(
+                f"Something went wrong. Reponse code: {response.status_code}"
+            )
+            return None
+
+    def send_metadata(self, report: dict):
+        """
+        Send a report with the metadata of one or more spectra to WISeREP
+        """
+        json_report = json.dumps(report)
+
+        res = self.send_json_report(json_report=json_report)
+
+        if res is not None:
+            self.logger.debug(res)
+
+        return res
+
+
+class Wiserep(WiserepClient):
     """
-    Upload a spectrum to WISeREP
+    Upload a spectrum to WISeREP. The report is generated from the spectrum header and validated locally first; the position is taken from the header, or from Fritz if the header has none. With `upload=False` nothing is sent and no lookups are made (see `resolve` and WiserepBatch)
     """
 
     def __init__(
@@ -36,120 +220,123 @@ class Wiserep:
         quality: str = "medium",
         sandbox: bool = True,
         tns_name: str | None = None,
+        upload: bool = True,
+        fits_path: Path | str | None = None,
     ):
-        self.logger = logging.getLogger()
+        super().__init__(sandbox=sandbox)
         self.ztf_id = ztf_id
+        self.sandbox = sandbox
         self.spec_path = Path(spec_path)
+        self.fits_path = Path(fits_path) if fits_path is not None else None
         self.quality = quality
 
-        if sandbox:
-            self.wiserep_endpoint = "https://sandbox.wiserep.org/api"
-        else:
-            self.wiserep_endpoint = "https://www.wiserep.org/api"
+        self.header = scan_header(self.spec_path)
 
-        self.ra, self.dec = radec(self.ztf_id)
+        if self.header.get("OBJECT", ztf_id) != ztf_id:
+            self.logger.warn(
+                f"{self.spec_path} is a spectrum of {self.header['OBJECT']}, not {ztf_id}"
+            )
 
-        if tns_name is None:
-            self.tns_name = self.query_tns()
-        else:
-            self.tns_name = tns_name
+        self.ra, self.dec = None, None
+        if "RA" in self.header and "DEC" in self.header:
+            self.ra, self.dec = float(self.header["RA"]), float(self.header["DEC"])
+        self.tns_name = tns_name
+
+        # check the report locally before anything is sent
+        self.read_spectrum()
+        self.generate_report()
+        self.errors = self.validate()
+        self.res: dict | None = None
+
+        if not upload:
+            return
+
+        if self.errors:
+            self.logger.error(
+                f"Not uploading {self.spec_path}, the report is invalid:\n"
+                + "\n".join(self.errors)
+            )
+            return
+
+        self.resolve()
 
         if self.tns_name is not None:
-            server_filename = self.upload_files([self.spec_path])[0]
-            if server_filename is not None:
-                self.read_spectrum(server_filename=server_filename)
+            server_filenames = self.upload_files(self.files)
+            if None not in server_filenames:
+                self.read_spectrum(*server_filenames)
                 self.generate_report()
-                res = self.send_metadata()
+                self.errors = self.validate()
+                if self.errors:
+                    self.logger.error(
+                        f"Not sending the report for {self.spec_path}, it is invalid:\n"
+                        + "\n".join(self.errors)
+                    )
+                    return
+                res = self.send_metadata(self.report)
                 self.res = res
 
-    def query_tns(self) -> str | None:
+    def resolve(self):
         """
-        Check if the object is known on TNS (so we can use the ID on WISeREP, I have not figured out how to do a WISeREP cone search.)
+        Get the position from Fritz if the spectrum header has none, and the TNS name if it was not given
         """
-        queryurl_tns = "https://www.wis-tns.org/api/get/search"
-
-        tns_marker = (
-            'tns_marker{"tns_id": "'
-            + str(TNS_BOT_ID)
-            + '", "type": "bot", "name": "'
-            + TNS_BOT_NAME
-            + '"}'
-        )
-        headers = {"User-Agent": tns_marker}
-
-        get_obj = {
-            "ra": self.ra,
-            "dec": self.dec,
-            "radius": 3,
-            "units": "arcsec",
-        }
-
-        json_string = json.dumps(get_obj)
+        if self.ra is None:
+            from betternot.fritz import radec
 
-        # I have no idea why the token is not in the header
-        payload = {"api_key": TNS_TOKEN, "data": json_string}
+            self.ra, self.dec = radec(self.ztf_id)
 
-        print(queryurl_tns)
-        print(headers)
-        print(payload)
+        if self.tns_name is None:
+            self.tns_name = self.query_tns()
 
-        response = requests.post(queryurl_tns, headers=headers, data=payload)
+    def validate(self) -> list[str]:
+        """
+        Check the report against the values WISeREP allows (see betternot.validation), without any network request. Returns the errors, prefixed with the spectrum path
+        """
+        return [f"{self.spec_path}: {error}" for error in validate_report(self.report)]
 
-        if response.status_code != 200:
-            self.logger.warn(
-                f"You got status code {response.status_code}. Something went wrong"
-            )
-            tns_name = None
+    def query_tns(self) -> str | None:
+        """
+        Check if the object is known on TNS (so we can use the ID on WISeREP, I have not figured out how to do a WISeREP cone search.) The local TNS catalog is checked first, TNS is only queried if it has no match
+        """
+        if self.ra is None or self.dec is None:
+            self.logger.warn(f"No position for {self.ztf_id}, cannot query TNS.")
+            return None
 
-        res_json = response.json()
-        reply = res_json["data"]["reply"]
+        tns_name = resolve_names(ra=self.ra, dec=self.dec)[0]
 
-        if len(reply) > 0:
-            tns_name = reply[0]["objname"]
+        if tns_name is not None:
             self.logger.info(f"Found match on TNS: {tns_name}")
         else:
-            tns_name = None
-
             self.logger.info("Found no match on TNS.")
 
         return tns_name
 
-    def read_spectrum(self, server_filename: str | None = None):
+    @property
+    def files(self) -> list[Path]:
+        """
+        The files to upload: the ASCII spectrum and, if given, the FITS file
+        """
+        if self.fits_path is None:
+            return [self.spec_path]
+        return [self.spec_path, self.fits_path]
+
+    def read_spectrum(
+        self,
+        server_filename: str | None = None,
+        fits_server_filename: str | None = None,
+    ):
         """
-        Open the spectrum ascii file and extract metadata
+        Extract the metadata of the spectrum from its header (see scan_header)
         """
-        data = ascii.read(self.spec_path, names=("WAVE", "FLUX", "FLUX_ERR"))
-        meta = data.meta["comments"]
-        metadict = {}
-
-        ncombine = 1
-        exptime = 0
-
-        for entry in meta:
-            keyval = entry.split("=")
-            if len(keyval) > 1:
-                key = keyval[0]
-                val = keyval[1]
-                if key == "HOME_OBSERVER" or key == "OBSERVER":
-                    observer = val
-                    metadict.update({"observer": val})
-                elif key == "REDUCER":
-                    metadict.update({"reducer": val})
-                elif key == "EXPTIME":
-                    exptime = int(float(val))
-                elif key == "DATE-OBS":
-                    metadict.update({"obsdate": val.replace("T", " ")})
-                elif key == "NCOMBINE":
-                    ncombine = int(val)
-
-        inttime = ncombine * exptime
-        metadict.update({"exptime": inttime})
+        metadict = header_metadata(self.header)
 
         if server_filename is not None:
             metadict.update({"ascii_file": server_filename})
         else:
             metadict.update({"ascii_file": str(self.spec_path)})
 
+        if fits_server_filename is not None:
+            metadict.update({"fits_file": fits_server_filename})
+
         # Let's assume the last modification time of the spectrum file is the reduction time
         timestamp = self.spec_path.stat().st_mtime
         reducedate = str(datetime.datetime.fromtimestamp(timestamp))
@@ -161,9 +348,7 @@ class Wiserep:
         """
         Open and fill the template spectrum report with the metadata of the spectrum
         """
-        template_path = Path(__file__).parent.parent / "data" / "template.yaml"
-        with open(template_path, "r") as stream:
-            report = yaml.safe_load(stream)
+        report = load_template()
 
         for key, val in self.metadata.items():
             report["objects"][0]["spectra"]["spectra_group"][0][key] = val
@@ -175,89 +360,225 @@ class Wiserep:
         report["objects"][0]["ra"] = self.ra
         report["objects"][0]["decl"] = self.dec
 
+        # unknown quality levels are left to the validation
         quality_levels = {"low": "1", "medium": "2", "high": "3"}
-        report["objects"][0]["spectra"]["spectra_group"][0][
-            "qualityid"
-        ] = quality_levels[self.quality]
+        report["objects"][0]["spectra"]["spectra_group"][0]["qualityid"] = (
+            quality_levels.get(self.quality, self.quality)
+        )
 
         self.report = report
 
-    def upload_files(self, file_list: list[Path]) -> list:
-        """
-        Upload a file to WISErEP and check the response
-        """
-        self.logger.info(
-            f"Uploading {' '.join(str(x) for x in file_list)} to the WISeREP"
-        )
-        url = self.wiserep_endpoint + "/file-upload"
 
-        headers = {
-            "User-Agent": 'tns_marker{"tns_id":'
-            + str(WISEREP_BOT_ID)
-            + ', "type":"bot",'
-            ' "name":"' + WISEREP_BOT_NAME + '"}'
+class WiserepBatch(WiserepClient):
+    """
+    Upload the spectra of a night to WISeREP at once: the TNS names are looked up in parallel, the files are sent in as few file-upload requests as MAX_UPLOAD_SIZE allows and all spectra go into a single bulk report
+
+    spectra: list of dicts with "ztf_id" and "spec_path", optionally "fits_path", "quality" and "tns_name"
+    """
+
+    def __init__(
+        self,
+        spectra: list[dict],
+        quality: str = "medium",
+        sandbox: bool = True,
+        max_upload_size: int = MAX_UPLOAD_SIZE,
+    ):
+        super().__init__(sandbox=sandbox)
+        self.sandbox = sandbox
+        self.quality = quality
+        self.max_upload_size = max_upload_size
+        self.res: dict | None = None
+
+        self.spectra = [
+            {"quality": quality, "tns_name": None, "fits_path": None, **spectrum}
+            for spectrum in spectra
+        ]
+        self.status: dict[str, str | None] = {
+            str(spectrum["spec_path"]): None for spectrum in self.spectra
         }
+        self.uploads: list[Wiserep] = []
+        self.uploaded: list[Wiserep] = []
 
-        # api key data
-        api_data = {"bot_api_key": WISEREP_TOKEN}
+        self.prepare()
+        self.resolve()
+        self.upload()
+        self.report_all()
 
-        # construct a dictionary of files and file handles
-        files_data = {}
-        for i, path in enumerate(file_list):
-            key = "files[" + str(i) + "]"
-            val = (str(path), open(path), "text/plain")
-            files_data[key] = val
+        for path, status in self.status.items():
+            self.logger.info(f"{path}: {status}")
 
-        response = requests.post(url, headers=headers, data=api_data, files=files_data)
+    def prepare(self):
+        """
+        Generate and validate the reports of all spectra locally. All problems are logged together, and the invalid spectra are left out before anything is sent
+        """
+        self.uploads = []
+        errors = []
+        for spectrum in self.spectra:
+            try:
+                upload = Wiserep(
+                    ztf_id=spectrum["ztf_id"],
+                    spec_path=spectrum["spec_path"],
+                    quality=spectrum["quality"],
+                    sandbox=self.sandbox,
+                    tns_name=spectrum["tns_name"],
+                    upload=False,
+                    fits_path=spectrum["fits_path"],
+                )
+            except Exception as e:
+                # an unreadable or malformed spectrum must not stop the others
+                errors.append(f"{spectrum['spec_path']}: {e!r}")
+                self.status[str(spectrum["spec_path"])] = f"unreadable spectrum: {e!r}"
+                continue
+
+            if upload.errors:
+                errors.extend(upload.errors)
+                self.status[str(upload.spec_path)] = "invalid report: " + "; ".join(
+                    error.split(": ", 1)[1] for error in upload.errors
+                )
+            else:
+                self.uploads.append(upload)
+
+        if errors:
+            self.logger.error(
+                f"{len(self.spectra) - len(self.uploads)} of {len(self.spectra)} reports are invalid and will not be uploaded:\n"
+                + "\n".join(errors)
+            )
 
-        if response.status_code == 200:
-            server_filenames = response.json()["data"]
-            self.logger.info(
-                f"Received and saved as {server_filenames} on the WISeREP server"
+    def resolve(self):
+        """
+        Get the missing positions from Fritz, then the TNS names: all positions are matched against the local TNS catalog at once, and only the spectra without a match are queried in parallel
+        """
+        with ThreadPoolExecutor(max_workers=TNS_WORKERS) as executor:
+            list(executor.map(self.locate, self.uploads))
+
+        unnamed = [
+            spectrum
+            for spectrum in self.uploads
+            if spectrum.tns_name is None and spectrum.ra is not None
+        ]
+        if unnamed:
+            names = resolve_names(
+                ra=[spectrum.ra for spectrum in unnamed],
+                dec=[spectrum.dec for spectrum in unnamed],
+                live=False,
             )
-            return server_filenames
-        else:
-            self.logger.warn(
-                f"Something went wrong. Reponse code: {response.status_code}"
+            for spectrum, name in zip(unnamed, names):
+                spectrum.tns_name = name
+            self.logger.info(
+                f"{len(unnamed) - names.count(None)} of {len(unnamed)} TNS names found in the local catalog"
             )
-            return [None]
 
-    # function for sending json metadata
-    def send_json_report(self, json_report: str):
-        report_url = self.wiserep_endpoint + "/bulk-report"
-        # headers
-        headers = {
-            "User-Agent": 'tns_marker{"tns_id":'
-            + str(WISEREP_BOT_ID)
-            + ', "type":"bot",'
-            ' "name":"' + WISEREP_BOT_NAME + '"}'
-        }
+        def lookup(spectrum: Wiserep) -> Wiserep | None:
+            if spectrum.ra is None:
+                return None
+            try:
+                spectrum.resolve()
+                return spectrum
+            except Exception as e:
+                self.status[str(spectrum.spec_path)] = f"lookup failed: {e!r}"
+                return None
 
-        payload = {"bot_api_key": WISEREP_TOKEN, "data": json_report}
+        with ThreadPoolExecutor(max_workers=TNS_WORKERS) as executor:
+            uploads = list(executor.map(lookup, self.uploads))
 
-        response = requests.post(report_url, headers=headers, data=payload)
+        self.uploads = [spectrum for spectrum in uploads if spectrum is not None]
 
-        if response.status_code == 200:
-            self.logger.info("Sent metadata to WISeREP")
-            return response.json()
-        else:
-            self.logger.warn(
-                f"Something went wrong. Reponse code: {response.status_code}"
-            )
-            return None
+        for spectrum in self.uploads:
+            if spectrum.tns_name is None:
+                self.status[str(spectrum.spec_path)] = "no TNS object found"
 
-    def send_metadata(self, report: str | None = None):
+    def locate(self, spectrum: Wiserep):
         """
-        Send the metadata for a spectrum to WISeREP
+        Get the position of a spectrum from Fritz if its header has none
         """
-        if report is None:
-            report = self.report
+        if spectrum.ra is None:
+            try:
+                from betternot.fritz import radec
 
-        json_report = json.dumps(report)
+                spectrum.ra, spectrum.dec = radec(spectrum.ztf_id)
+            except Exception as e:
+                self.status[str(spectrum.spec_path)] = f"lookup failed: {e!r}"
+                return
 
-        res = self.send_json_report(json_report=json_report)
+            if spectrum.ra is None:
+                self.status[str(spectrum.spec_path)] = "no position"
 
-        if res is not None:
-            self.logger.debug(res)
+    def chunks(self, uploads: list) -> list[list]:
+        """
+        Split the spectra into groups whose files add up to at most max_upload_size bytes. The files of a spectrum are always uploaded together
+        """
+        chunks: list = []
+        size = 0
+        for spectrum in uploads:
+            file_size = sum(path.stat().st_size for path in spectrum.files)
+            if not chunks or size + file_size > self.max_upload_size:
+                chunks.append([])
+                size = 0
+            chunks[-1].append(spectrum)
+            size += file_size
+
+        return chunks
+
+    def upload(self):
+        """
+        Upload the files, and read the metadata of every spectrum that arrived on the server. Every chunk is a separate request, so only the chunks that failed are tried again (see upload_files)
+        """
+        resolved = [spectrum for spectrum in self.uploads if spectrum.tns_name]
+        self.uploaded = []
+
+        for chunk in self.chunks(resolved):
+            file_list = [path for spectrum in chunk for path in spectrum.files]
+            server_filenames = self.upload_files(file_list)
+
+            if len(server_filenames) != len(file_list):
+                server_filenames = [None] * len(file_list)
+
+            # the server filenames are in the order of the uploaded files
+            offset = 0
+            for spectrum in chunk:
+                n_files = len(spectrum.files)
+                names = server_filenames[offset : offset + n_files]
+                offset += n_files
+
+                if None in names:
+                    self.status[str(spectrum.spec_path)] = "file upload failed"
+                    continue
+                spectrum.read_spectrum(*names)
+                spectrum.generate_report()
+                spectrum.errors = spectrum.validate()
+                if spectrum.errors:
+                    self.status[str(spectrum.spec_path)] = (
+                        "invalid report: " + "; ".join(spectrum.errors)
+                    )
+                    continue
+                self.uploaded.append(spectrum)
+
+    def report_all(self):
+        """
+        Send one bulk report for all uploaded spectra, with the spectra of the same object grouped into one entry
+        """
+        objects: dict = {}
+        for spectrum in self.uploaded:
+            obj = spectrum.report["objects"][0]
+            if spectrum.tns_name in objects:
+                objects[spectrum.tns_name]["spectra"]["spectra_group"].extend(
+                    obj["spectra"]["spectra_group"]
+                )
+            else:
+                objects[spectrum.tns_name] = obj
+
+        if not objects:
+            self.logger.warn("No spectrum to report to WISeREP")
+            return
+
+        self.res = self.send_metadata({"objects": list(objects.values())})
+
+        if self.res is not None and self.res.get("id_message") == "OK":
+            message = "ok"
+        elif self.res is not None:
+            message = f"report rejected: {self.res.get('id_message')}"
+        else:
+            message = "report failed"
 
-        return res
+        for spectrum in self.uploaded:
+            self.status[str(spectrum.spec_path)] = message
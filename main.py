@@ -5,10 +5,8 @@
 import argparse
 import datetime
 import logging
+import sys
 
-from betternot import fritz
-from betternot.findingchart import get_finding_chart
-from betternot.observability import Observability
 from betternot.utils import is_ztf_name
 
 transient = "ZTF19aatubsj"
@@ -23,13 +21,28 @@ def run():
     """
     This is invoked on the command line by `not`
     """
-    parser = argparse.ArgumentParser(description="Various NOT tools")
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="Various NOT tools",
+        epilog=f"Further commands: {', '.join(COMMANDS)} (see `not COMMAND -h`)",
+    )
     parser.add_argument(
         "names",
         type=str,
-        nargs="+",
+        nargs="*",
         help="Provide one or more ZTF names (e.g. ZTF19aaelulu)",
     )
+    parser.add_argument(
+        "-group",
+        "-g",
+        type=int,
+        nargs="+",
+        default=None,
+        help="Add all sources saved to these Fritz group IDs.",
+    )
     parser.add_argument(
         "-date",
         "-d",
@@ -44,6 +57,31 @@ def run():
         default="not",
         help="Here you can provide a desired observation site. Defaults to La Palma.",
     )
+    parser.add_argument(
+        "-workers",
+        "-w",
+        type=int,
+        default=8,
+        help="Maximum number of parallel requests to Fritz. Defaults to 8.",
+    )
+    parser.add_argument(
+        "-format",
+        "-f",
+        type=str,
+        default=None,
+        help="Output format of the observability plots: pdf, pdf-raster, png, svg or html. Defaults to the one in config.yaml.",
+    )
+    parser.add_argument(
+        "-refresh",
+        "--refresh",
+        action="store_true",
+        help="Ignore the local Fritz cache and query everything again.",
+    )
+    parser.add_argument(
+        "-local",
+        action="store_true",
+        help="Do not hand the request to a running planning server (`not serve`).",
+    )
 
     cli_args = parser.parse_args()
 
@@ -60,13 +98,226 @@ def run():
 
     if len(correct_ids) < len(cli_args.names):
         malformed = [i for i in cli_args.names if i not in correct_ids]
-        logger.warn(
+        logger.warning(
             f"Please check that each name is a correct ZTF name. These are malformed and will be skipped now: {', '.join(malformed)}"
         )
 
-    obs = Observability(ztf_ids=correct_ids, date=date, site=cli_args.site)
-    obs.plot_standards()
-    obs.plot_targets()
-    for ztf_id in correct_ids:
-        get_finding_chart(ztf_id=ztf_id, date=date)
-    obs.print_info()
+    if len(correct_ids) == 0 and not cli_args.group:
+        logger.error("No valid ZTF name or Fritz group given, nothing to do.")
+        return
+
+    if not cli_args.local:
+        from betternot.server import forward
+
+        res = forward(
+            {
+                "names": correct_ids,
+                "date": date,
+                "site": cli_args.site,
+                "refresh": cli_args.refresh,
+                "max_workers": cli_args.workers,
+                "group_ids": cli_args.group,
+                "plot_format": cli_args.format,
+            }
+        )
+        if res is not None:
+            print(res["info"])
+            logger.info(
+                f"Planned by the running server in {res['timings']['total']:.2f} s"
+            )
+            return
+
+    # imported only now, as these pull in astropy, matplotlib and the Fritz client
+    from betternot import fritz
+    from betternot.observability import Observability
+    from betternot.pipeline import prepare_night
+
+    fritz.cache.refresh = cli_args.refresh
+
+    obs = Observability(
+        ztf_ids=correct_ids,
+        date=date,
+        site=cli_args.site,
+        max_workers=cli_args.workers,
+        plot_format=cli_args.format,
+    )
+    if cli_args.group:
+        n_new = obs.add_sources(fritz.group_sources(cli_args.group))
+        logger.info(f"Added {n_new} sources from Fritz groups {cli_args.group}")
+
+    prepare_night(obs=obs, max_workers=cli_args.workers)
+
+    stats = fritz.cache.stats()
+    logger.info(
+        f"Fritz cache: {stats['hits']} hits, {stats['misses']} misses ({stats['entries']} entries, {stats['size'] / 1024**2:.1f} MB)"
+    )
+
+
+def run_warm_cache(args: list[str]):
+    """
+    `not warm-cache`: download IERS data and precompute ephemerides for offline use
+    """
+    parser = argparse.ArgumentParser(
+        prog="not warm-cache",
+        description="Download the IERS data and precompute the sun/moon ephemeris, so later runs need no network for astronomy data",
+    )
+    parser.add_argument(
+        "-date",
+        "-d",
+        type=str,
+        default=None,
+        help="First night in the form YYYY-MM-DD. Defaults to today.",
+    )
+    parser.add_argument(
+        "-nights",
+        "-n",
+        type=int,
+        default=7,
+        help="Number of nights to precompute. Defaults to 7.",
+    )
+    cli_args = parser.parse_args(args)
+
+    from betternot.astrodata import warm_cache
+
+    warm_cache(date=cli_args.date, n_nights=cli_args.nights)
+
+
+def run_sweep(args: list[str]):
+    """
+    `not sweep`: find the best nights and sites for a list of targets
+    """
+    parser = argparse.ArgumentParser(
+        prog="not sweep",
+        description="Compute the observability of the targets for a range of nights at several sites and summarize the best night and site per target",
+    )
+    parser.add_argument(
+        "names",
+        type=str,
+        nargs="+",
+        help="Provide one or more ZTF names (e.g. ZTF19aaelulu)",
+    )
+    parser.add_argument(
+        "-date",
+        "-d",
+        type=str,
+        default=None,
+        help="First night in the form YYYY-MM-DD. Defaults to today.",
+    )
+    parser.add_argument(
+        "-nights",
+        "-n",
+        type=int,
+        default=30,
+        help="Number of nights. Defaults to 30.",
+    )
+    parser.add_argument(
+        "-sites",
+        "-s",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Sites from config.yaml. Defaults to all configured sites.",
+    )
+    parser.add_argument(
+        "-workers",
+        "-w",
+        type=int,
+        default=8,
+        help="Maximum number of parallel requests to Fritz. Defaults to 8.",
+    )
+    cli_args = parser.parse_args(args)
+
+    correct_ids = [ztf_id for ztf_id in cli_args.names if is_ztf_name(ztf_id)]
+    if len(correct_ids) == 0:
+        logger.error("No valid ZTF name given, nothing to do.")
+        return
+
+    from betternot.fritz import get_source_info
+    from betternot.io import get_date_dir
+    from betternot.sweep import Sweep
+    from betternot.targets import TargetTable
+
+    found = [
+        (ztf_id, ra, dec)
+        for ztf_id, (ra, dec, *_) in zip(
+            correct_ids, get_source_info(correct_ids, max_workers=cli_args.workers)
+        )
+        if ra is not None
+    ]
+    targets = TargetTable()
+    if found:
+        names, ra, dec = zip(*found)
+        targets.add(names=names, ra=ra, dec=dec)
+
+    sweep = Sweep(
+        targets=targets,
+        start_date=cli_args.date,
+        n_nights=cli_args.nights,
+        sites=cli_args.sites,
+    )
+    summary = sweep.summary()
+    print(summary.to_string())
+
+    sweep.plot_heatmap()
+    summary.to_csv(get_date_dir(sweep.start_date) / "sweep.csv")
+
+
+def run_serve(args: list[str]):
+    """
+    `not serve`: keep a planning server running that later `not` calls are handed to
+    """
+    from betternot.server import DEFAULT_PORT, serve
+
+    parser = argparse.ArgumentParser(
+        prog="not serve",
+        description="Run a local planning server that keeps astropy, the ephemerides and the Fritz data warm. Later `not` calls are forwarded to it",
+    )
+    parser.add_argument(
+        "-port",
+        "-p",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"Port on localhost. Defaults to {DEFAULT_PORT}.",
+    )
+    parser.add_argument(
+        "-workers",
+        "-w",
+        type=int,
+        default=8,
+        help="Maximum number of parallel requests to Fritz. Defaults to 8.",
+    )
+    cli_args = parser.parse_args(args)
+
+    logging.getLogger("betternot.server").setLevel(logging.INFO)
+    serve(port=cli_args.port, max_workers=cli_args.workers)
+
+
+def run_tns_update(args: list[str]):
+    """
+    `not tns-update`: build or refresh the local TNS catalog used to find TNS names without querying TNS
+    """
+    parser = argparse.ArgumentParser(
+        prog="not tns-update",
+        description="Build the local TNS catalog from the public TNS object list (tns_public_objects.csv), and add the daily lists of new and modified objects since it was last updated",
+    )
+    parser.add_argument(
+        "-csv",
+        "-c",
+        type=str,
+        default=None,
+        help="Local copy of tns_public_objects.csv(.zip). By default the existing catalog is refreshed, or the full list is downloaded if there is none.",
+    )
+    cli_args = parser.parse_args(args)
+
+    from betternot.tns import update_catalog
+
+    logging.getLogger("betternot.tns").setLevel(logging.INFO)
+    update_catalog(csv_path=cli_args.csv)
+
+
+COMMANDS = {
+    "serve": run_serve,
+    "sweep": run_sweep,
+    "tns-update": run_tns_update,
+    "warm-cache": run_warm_cache,
+}
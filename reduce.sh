@@ -1,6 +1,11 @@
 #!/bin/bash
 DATE=$(date -v -1d +%Y-%m-%d)
-STANDARD="SP2209+178"
+# the standard can be set with STANDARD=..., otherwise it is read from the standard.txt that `not` writes to the DATE directory next to this script (or from STANDARD_FILE=...)
+STANDARD_FILE="${STANDARD_FILE:-$(cd "$(dirname "$0")" && pwd)/${DATE}/standard.txt}"
+if [ -z "${STANDARD}" ] && [ -f "${STANDARD_FILE}" ]; then
+ STANDARD=$(head -n 1 "${STANDARD_FILE}")
+fi
+STANDARD="${STANDARD:-SP2209+178}"
 declare -a OBJECTS=("ZTF23aaawbsc" "ZTF23aakmewi")
 # DATE="2023-08-28"
 
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import time
+import unittest
+
+import numpy as np
+from astropy import units as u  # type: ignore
+from astropy.coordinates import AltAz, EarthLocation, SkyCoord  # type: ignore
+from astropy.time import Time  # type: ignore
+from betternot.altaz import analytic_altitude
+from betternot.astrodata import use_local_data
+from betternot.observability import Observability
+from betternot.targets import TargetTable
+
+# required agreement with astropy (deg)
+ACCURACY = 0.1
+
+SITES = {
+    "La Palma": (28.7573, -17.8851, 2382),
+    "Mt. Graham": (32.7013, -109.8891, 3221),
+    "Paranal": (-24.6272, -70.4042, 2635),
+    "Maunakea": (19.8261, -155.4700, 4205),
+}
+
+# solstices and equinoxes within the IERS-B range bundled with astropy
+DATES = ["2020-03-20", "2021-06-21", "2022-09-23", "2022-12-21"]
+
+
+class TestAltAz(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        use_local_data()
+
+    def test_accuracy(self):
+        self.logger.info("\n\n Validating the analytic alt-az backend \n\n")
+
+        ra, dec = [
+            x.ravel()
+            for x in np.meshgrid(
+                np.linspace(0, 350, 36), [-75, -45, -15, 0, 15, 45, 75, 89]
+            )
+        ]
+        coords = SkyCoord(ra, dec, unit="deg")
+
+        for date in DATES:
+            times = Time(date) + np.linspace(0, 24, 97) * u.hour
+
+            for site, (lat, lon, height) in SITES.items():
+                location = EarthLocation.from_geodetic(
+                    lon * u.deg, lat * u.deg, height * u.m
+                )
+                frame = AltAz(obstime=times, location=location)
+                alt_astropy = coords[:, np.newaxis].transform_to(frame).alt.deg
+
+                alt_analytic = analytic_altitude(
+                    ra=ra, dec=dec, jd=times.utc.jd, lat=lat, lon=lon
+                )
+
+                max_diff = np.abs(alt_analytic - alt_astropy).max()
+                self.logger.debug(f"{date} {site}: max. deviation {max_diff:.4f} deg")
+                self.assertLess(max_diff, ACCURACY, f"{site} on {date}")
+
+    def test_backend(self):
+        self.logger.info("\n\n Testing the Observability backend switch \n\n")
+
+        target_dict = {
+            "SP2209+178": {"ra": "22:11:31.3756", "dec": "+18:05:34.177"},
+            "ZTF23aalftvv": {"ra": 258.5355720, "dec": 81.0748332},
+        }
+
+        obs = Observability(ztf_ids=[], date="2022-08-26", site="not")
+        obs_fast = Observability(
+            ztf_ids=[], date="2022-08-26", site="not", backend="analytic"
+        )
+        coords = TargetTable.from_dict(target_dict).coords
+
+        alt, _ = obs.altaz_grid(coords=coords)
+        alt_fast, airmass_fast = obs_fast.altaz_grid(coords=coords)
+
+        self.assertEqual(alt_fast.shape, alt.shape)
+        self.assertLess(np.abs(alt_fast - alt).max(), ACCURACY)
+        self.assertTrue(np.all(np.isnan(airmass_fast[alt_fast <= 0])))
+
+        with self.assertRaises(ValueError):
+            Observability(ztf_ids=[], date="2022-08-26", backend="slalib")
+
+    def test_speed(self):
+        self.logger.info("\n\n Timing the analytic backend for 10k targets \n\n")
+
+        rng = np.random.default_rng(42)
+        ra = rng.uniform(0, 360, 10000)
+        dec = rng.uniform(-30, 90, 10000)
+        jd = 2460183.5 + np.linspace(-0.5, 0.5, 1000)
+
+        t_start = time.perf_counter()
+        alt = analytic_altitude(ra=ra, dec=dec, jd=jd, lat=28.76, lon=-17.89)
+        duration = time.perf_counter() - t_start
+
+        self.logger.debug(f"10000 targets x 1000 times: {duration * 1000:.0f} ms")
+        self.assertEqual(alt.shape, (10000, 1000))
+        self.assertLess(duration, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
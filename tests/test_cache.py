@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from betternot.cache import ResponseCache
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        logging.getLogger("betternot.cache").setLevel(logging.DEBUG)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / "cache.sqlite"
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_ttl(self):
+        self.logger.info("\n\n Testing cache expiry and refresh \n\n")
+
+        cache = ResponseCache(self.path)
+        cache.set("a", status=200, content=b"position")
+
+        self.assertEqual(cache.get("a", ttl=None), (200, b"position"))
+        self.assertEqual(cache.get("a", ttl=3600), (200, b"position"))
+        time.sleep(0.05)
+        self.assertIsNone(cache.get("a", ttl=0.01))
+        self.assertIsNone(cache.get("b"))
+
+        cache.refresh = True
+        self.assertIsNone(cache.get("a"))
+
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 3)
+
+        # the content persists across instances
+        self.assertEqual(ResponseCache(self.path).get("a"), (200, b"position"))
+
+    def test_lru_eviction(self):
+        self.logger.info("\n\n Testing LRU eviction \n\n")
+
+        cache = ResponseCache(self.path, max_size=30)
+        cache.set("a", status=200, content=b"x" * 10)
+        time.sleep(0.01)
+        cache.set("b", status=200, content=b"x" * 10)
+        time.sleep(0.01)
+        cache.get("a")
+        time.sleep(0.01)
+        cache.set("c", status=200, content=b"x" * 15)
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertLessEqual(cache.stats()["size"], 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
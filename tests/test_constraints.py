@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import time
+import unittest
+
+import numpy as np
+from astropy import units as u  # type: ignore
+from astropy.coordinates import SkyCoord  # type: ignore
+from betternot.constraints import Constraints
+from betternot.observability import Observability
+
+
+class TestConstraints(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.obs = Observability(
+            ztf_ids=[], date="2022-08-26", site="not", backend="analytic"
+        )
+
+    def test_windows(self):
+        self.logger.info("\n\n Testing the observability windows \n\n")
+
+        coords = SkyCoord(
+            [258.54, 0.0, 300.0, 100.0], [81.07, -80.0, 20.0, 20.0], unit="deg"
+        )
+        constraints = Constraints(max_airmass=2.0, min_moon_separation=0)
+        res = constraints.evaluate(obs=self.obs, coords=coords)
+
+        circumpolar, southern, summer, winter = res["observable"]
+        self.assertTrue(circumpolar)
+        self.assertFalse(southern)
+        self.assertTrue(summer)
+        self.assertFalse(winter)
+
+        # usable samples fulfil every constraint
+        alt, airmass = self.obs.altaz_grid(coords=coords)
+        self.assertTrue(np.all(airmass[res["mask"]] <= 2.0))
+        sun_alt = np.broadcast_to(self.obs.ephemeris.sun_alt, alt.shape)
+        self.assertTrue(np.all(sun_alt[res["mask"]] < -18))
+
+        # the windows add up to the total usable time
+        for intervals, hours in zip(res["intervals"], res["hours"]):
+            self.assertAlmostEqual(np.sum(intervals[:, 1] - intervals[:, 0]), hours)
+            self.assertTrue(np.all(intervals[:, 1] - intervals[:, 0] >= 0.5))
+
+        # a window limit longer than the night rejects everything
+        res_long = Constraints(min_window=24).evaluate(obs=self.obs, coords=coords)
+        self.assertFalse(np.any(res_long["observable"]))
+        self.assertFalse(np.any(res_long["mask"]))
+
+    def test_moon(self):
+        self.logger.info("\n\n Testing the moon distance constraint \n\n")
+
+        eph = self.obs.ephemeris
+        moon_up = np.argmax(eph.moon_alt)
+        coords = SkyCoord([eph.moon_ra[moon_up]], [eph.moon_dec[moon_up]], unit="deg")
+
+        mask = Constraints(min_moon_separation=10, sun_altitude=90).mask(
+            obs=self.obs, coords=coords
+        )
+        self.assertFalse(mask[0, moon_up])
+
+    def test_speed(self):
+        self.logger.info("\n\n Timing the constraints for 5000 targets \n\n")
+
+        rng = np.random.default_rng(42)
+        coords = SkyCoord(
+            rng.uniform(0, 360, 5000) * u.deg, rng.uniform(-30, 90, 5000) * u.deg
+        )
+        self.obs.ephemeris
+
+        t_start = time.perf_counter()
+        res = Constraints().evaluate(obs=self.obs, coords=coords)
+        duration = time.perf_counter() - t_start
+
+        self.logger.debug(f"5000 targets: {duration:.2f} s")
+        self.assertEqual(len(res["intervals"]), 5000)
+        self.assertLess(duration, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import unittest
+
+import numpy as np
+from astropy import units as u  # type: ignore
+from astropy.coordinates import SkyCoord  # type: ignore
+from betternot.events import find_roots, target_events, twilight_times
+from betternot.observability import Observability
+
+
+class TestEvents(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.obs = Observability(ztf_ids=[], date="2022-08-26", site="not")
+
+    def test_find_roots(self):
+        self.logger.info("\n\n Testing the vectorized root finder \n\n")
+
+        roots = find_roots(
+            lambda x: np.cos(x) - np.array([0.5, 0.0, -0.5]),
+            np.zeros(3),
+            np.full(3, np.pi),
+        )
+        np.testing.assert_allclose(roots, np.arccos([0.5, 0.0, -0.5]), atol=1e-5)
+
+    def test_twilight(self):
+        self.logger.info("\n\n Testing the twilight times \n\n")
+
+        twilight = twilight_times(obs=self.obs)
+        grid = (self.obs.midnight_utc + self.obs.delta_midnight).mjd
+        step = grid[1] - grid[0]
+
+        for level, (evening, morning) in twilight.items():
+            dark = grid[self.obs.ephemeris.sun_alt < level]
+            self.assertLess(abs(evening - dark[0]), step)
+            self.assertLess(abs(morning - dark[-1]), step)
+
+        # deeper twilight starts later and ends earlier
+        self.assertTrue(twilight[0][0] < twilight[-12][0] < twilight[-18][0])
+        self.assertTrue(twilight[-18][1] < twilight[-12][1] < twilight[0][1])
+
+    def test_targets(self):
+        self.logger.info("\n\n Testing transit, rise and set times \n\n")
+
+        coords = SkyCoord(
+            [258.54, 300.0, 0.0, 30.0], [81.07, 20.0, -80.0, 89.0], unit="deg"
+        )
+        events = target_events(obs=self.obs, coords=coords, max_airmass=2.0)
+        ra, dec = coords.ra.deg, coords.dec.deg
+
+        self.assertEqual(
+            list(events["status"]), ["crossing", "crossing", "never", "never"]
+        )
+
+        # the targets cross the airmass limit at the rise and set times
+        crossing = events["status"] == "crossing"
+        for key in ["rise", "set"]:
+            alt = self.obs.altitude_at(
+                ra=ra[crossing], dec=dec[crossing], mjd=events[key][crossing]
+            )
+            np.testing.assert_allclose(alt, 30, atol=0.01)
+
+        # the transit is the highest point
+        for offset in [-5, 5]:
+            alt = self.obs.altitude_at(
+                ra=ra, dec=dec, mjd=events["transit"] + offset / 1440
+            )
+            self.assertTrue(np.all(alt < events["transit_alt"]))
+
+        # the analytic backend agrees to within a minute
+        obs_fast = Observability(
+            ztf_ids=[], date="2022-08-26", site="not", backend="analytic"
+        )
+        events_fast = target_events(obs=obs_fast, coords=coords, max_airmass=2.0)
+        for key in ["transit", "rise", "set"]:
+            np.testing.assert_allclose(
+                events_fast[key], events[key], atol=1 / 1440, equal_nan=True
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
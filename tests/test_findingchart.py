@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import requests
+from betternot import findingchart, fritz
+from betternot.findingchart import PNG_END, PNG_SIGNATURE
+
+
+class TestFindingChart(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_parallel_download(self):
+        self.logger.info("\n\n Testing parallel finding chart downloads \n\n")
+
+        png = PNG_SIGNATURE + b"\x00" * 1000 + PNG_END
+        requested = []
+        refreshed = []
+
+        def chart_path(ztf_id, date):
+            return Path(self.tmpdir.name) / f"{ztf_id}_{date}.png"
+
+        def api(method, url, stream=False, refresh=False):
+            ztf_id = url.split("/")[2]
+            requested.append(ztf_id)
+            refreshed.append(refresh)
+            time.sleep(0.01)
+            if ztf_id == "ZTF23failed":
+                raise requests.exceptions.RequestException
+            return fritz.cached_response(url, 200, png)
+
+        # a complete chart from an earlier run, and a truncated one
+        chart_path("ZTF23present", "2023-09-11").write_bytes(png)
+        chart_path("ZTF23truncated", "2023-09-11").write_bytes(png[:500])
+
+        ztf_ids = ["ZTF23present", "ZTF23truncated", "ZTF23failed"] + [
+            f"ZTF23new{i}" for i in range(5)
+        ]
+        with mock.patch.object(
+            findingchart, "chart_path", chart_path
+        ), mock.patch.object(fritz, "api", api):
+            latencies = findingchart.get_finding_charts(
+                ztf_ids, date="2023-09-11", max_workers=4
+            )
+
+        self.assertEqual(list(latencies), ztf_ids)
+        self.assertEqual(latencies["ZTF23present"], 0.0)
+        self.assertIsNone(latencies["ZTF23failed"])
+        self.assertNotIn("ZTF23present", requested)
+        self.assertEqual(len(requested), len(ztf_ids) - 1)
+
+        for ztf_id in ztf_ids:
+            if ztf_id != "ZTF23failed":
+                self.assertTrue(
+                    findingchart.is_valid_png(chart_path(ztf_id, "2023-09-11"))
+                )
+        self.assertEqual(list(Path(self.tmpdir.name).glob("*.part")), [])
+        self.assertNotIn(True, refreshed)
+
+        # overwriting downloads every chart again, past the response cache
+        requested.clear()
+        with mock.patch.object(
+            findingchart, "chart_path", chart_path
+        ), mock.patch.object(fritz, "api", api):
+            latencies = findingchart.get_finding_charts(
+                ["ZTF23present"], date="2023-09-11", overwrite=True
+            )
+        self.assertEqual(requested, ["ZTF23present"])
+        self.assertEqual(refreshed[-1], True)
+        self.assertGreater(latencies["ZTF23present"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import json
+import logging
+import random
+import re
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from betternot import fritz
+from betternot.lightcurve import LightcurveStore
+
+
+class TestFritz(unittest.TestCase):
+    def setUp(self):
+        logging.getLogger("betternot.fritz").setLevel(logging.DEBUG)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+    def test_source_info_order(self):
+        self.logger.info("\n\n Testing the order of parallel source queries \n\n")
+
+        ztf_ids = [f"ZTF23aaaaa{i:03d}" for i in range(24)]
+        rng = random.Random(1)
+        latencies = {ztf_id: rng.uniform(0, 0.05) for ztf_id in ztf_ids}
+        # the first sources answer last
+        latencies[ztf_ids[0]] = 0.1
+        latencies[ztf_ids[1]] = 0.08
+
+        def radec(ztf_id):
+            time.sleep(latencies[ztf_id])
+            return (float(ztf_id[-3:]), -float(ztf_id[-3:]))
+
+        def latest_photometry(ztf_id):
+            time.sleep(latencies[ztf_id] / 2)
+            return (18.0, 60000.0 + int(ztf_id[-3:]), "ztfr")
+
+        with mock.patch.object(fritz, "radec", radec), mock.patch.object(
+            fritz, "latest_photometry", latest_photometry
+        ):
+            results = fritz.get_source_info(ztf_ids, max_workers=8)
+
+        self.assertEqual(
+            results,
+            [
+                (float(i), -float(i), 18.0, 60000.0 + i, "ztfr")
+                for i in range(len(ztf_ids))
+            ],
+        )
+
+    def test_group_sources(self):
+        self.logger.info("\n\n Testing the paginated group listing \n\n")
+
+        def listing(n_sources: int, total: int | None):
+            sources = [
+                {
+                    "id": f"ZTF23group{i:03d}",
+                    "ra": None if i == 5 else float(i),
+                    "dec": 10.0,
+                    "last_detected_mag": 19.0,
+                    "last_detected_at": "2023-09-10T12:00:00Z",
+                }
+                for i in range(n_sources)
+            ]
+            requests_made: list = []
+
+            def api(method, url):
+                page_size = int(re.search(r"numPerPage=(\d+)", url).group(1))
+                page = int(re.search(r"pageNumber=(\d+)", url).group(1))
+                requests_made.append(page)
+                data = {"sources": sources[(page - 1) * page_size : page * page_size]}
+                if total is not None:
+                    data["totalMatches"] = total
+                return fritz.cached_response(
+                    url, 200, json.dumps({"data": data}).encode()
+                )
+
+            return api, requests_made
+
+        cases = [
+            # (sources, totalMatches, max_sources, expected page sizes, expected requests), the source without a position on page 1 is skipped
+            (250, 250, None, [99, 100, 50], [1, 2, 3]),
+            (200, 200, None, [99, 100], [1, 2]),
+            # without a total, the empty page after the last full one ends the listing
+            (200, None, None, [99, 100], [1, 2, 3]),
+            (250, 250, 150, [99, 50], [1, 2]),
+            (0, 0, None, [], [1]),
+        ]
+        for n_sources, total, max_sources, page_sizes, pages_requested in cases:
+            api, requests_made = listing(n_sources, total)
+            with mock.patch.object(fritz, "api", api):
+                pages = list(
+                    fritz.group_sources([1, 2], page_size=100, max_sources=max_sources)
+                )
+
+            self.assertEqual([len(page) for page in pages], page_sizes)
+            self.assertEqual(requests_made, pages_requested)
+
+            rows = [row for page in pages for row in page]
+            self.assertNotIn("ZTF23group005", [row[0] for row in rows])
+            self.assertEqual(len({row[0] for row in rows}), len(rows))
+            if rows:
+                self.assertAlmostEqual(rows[0][4], 60197.5)
+                self.assertIsNone(rows[0][5])
+
+    def test_missing_photometry(self):
+        self.logger.info("\n\n Testing photometry responses without data \n\n")
+
+        point = {"id": 1, "mjd": 60000.1, "mag": 19.0, "magerr": 0.1, "filter": "ztfg"}
+        error = {"status": "error", "message": "Source not accessible"}
+        payloads = [error, {"status": "success", "data": [point]}, error]
+        payloads.append({"status": "success", "data": []})
+
+        def api(method, url):
+            return fritz.cached_response(url, 200, json.dumps(payloads.pop(0)).encode())
+
+        with tempfile.TemporaryDirectory() as tmpdir, mock.patch.object(
+            fritz, "api", api
+        ), mock.patch.object(fritz, "lightcurves", LightcurveStore(tmpdir)):
+            lc = fritz.lightcurve("ZTF23unknown", refresh=True)
+            self.assertEqual(len(lc.data), 0)
+
+            lc = fritz.lightcurve("ZTF23aaawbsc", refresh=True)
+            self.assertEqual(lc.latest, (19.0, 60000.1, "ztfg"))
+
+            # an error payload or an empty one keeps the stored light curve
+            for _ in range(2):
+                lc = fritz.lightcurve("ZTF23aaawbsc", refresh=True)
+                self.assertEqual(lc.latest, (19.0, 60000.1, "ztfg"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import tempfile
+import unittest
+
+from betternot.lightcurve import LightcurveStore
+
+
+class TestLightcurve(unittest.TestCase):
+    def setUp(self):
+        logging.getLogger("betternot.lightcurve").setLevel(logging.DEBUG)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_incremental_store(self):
+        self.logger.info("\n\n Testing the incremental light curve store \n\n")
+
+        phot = [
+            {"mjd": 60000.1, "mag": 19.0, "magerr": 0.1, "filter": "ztfg"},
+            {"mjd": 60000.2, "mag": 18.6, "magerr": 0.1, "filter": "ztfr"},
+            {"mjd": 60001.0, "mag": None, "limiting_mag": 20.5, "filter": "ztfg"},
+        ]
+
+        store = LightcurveStore(self.tmpdir.name)
+        lc = store.update("ZTF23aaawbsc", phot)
+
+        self.assertEqual(len(lc.data), 3)
+        self.assertEqual(lc.latest, (18.6, 60000.2, "ztfr"))
+        self.assertAlmostEqual(lc.colour(), 0.4, places=5)
+
+        phot.append({"mjd": 60005.0, "mag": 18.2, "magerr": 0.1, "filter": "ztfg"})
+        lc = store.update("ZTF23aaawbsc", phot)
+
+        self.assertEqual(len(lc.data), 4)
+        self.assertEqual(lc.latest, (18.2, 60005.0, "ztfg"))
+        self.assertIsNone(lc.colour())
+        self.assertEqual(lc.latest_per_band["ztfr"], (18.6, 60000.2, "ztfr"))
+
+        # a new store reads the light curve back from disk
+        reloaded = LightcurveStore(self.tmpdir.name).get("ZTF23aaawbsc")
+        self.assertEqual(reloaded.latest, lc.latest)
+        self.assertTrue(store.is_fresh("ZTF23aaawbsc", ttl=60))
+
+    def test_late_points(self):
+        self.logger.info("\n\n Testing late and corrected photometry points \n\n")
+
+        phot = [
+            {"id": 1, "mjd": 60000.1, "mag": 19.0, "magerr": 0.1, "filter": "ztfg"},
+            {"id": 2, "mjd": 60003.0, "mag": 18.6, "magerr": 0.1, "filter": "ztfr"},
+        ]
+
+        store = LightcurveStore(self.tmpdir.name)
+        store.update("ZTF23aaawbsc", phot)
+
+        # a point that arrives late with an older MJD, a second point at the same MJD, and a corrected magnitude
+        phot.append(
+            {"id": 3, "mjd": 60001.0, "mag": 18.9, "magerr": 0.1, "filter": "ztfg"}
+        )
+        phot.append(
+            {"id": 4, "mjd": 60003.0, "mag": 18.5, "magerr": 0.1, "filter": "ztfi"}
+        )
+        phot[1] = dict(phot[1], mag=18.7)
+        lc = store.update("ZTF23aaawbsc", phot)
+
+        self.assertEqual(len(lc.data), 4)
+        self.assertEqual(list(lc.data["id"]), [1, 3, 2, 4])
+        self.assertEqual(lc.latest_per_band["ztfg"], (18.9, 60001.0, "ztfg"))
+        self.assertEqual(lc.latest_per_band["ztfr"], (18.7, 60003.0, "ztfr"))
+
+        # the same payload again changes nothing
+        self.assertEqual(lc.merge(phot), 0)
+
+        # points without an ID are matched by MJD, filter and instrument
+        no_id = {"mjd": 60004.0, "mag": None, "limiting_mag": 20.0, "filter": "ztfg"}
+        self.assertEqual(lc.merge([no_id, dict(no_id, instrument_name="SEDM")]), 2)
+        self.assertEqual(lc.merge([no_id]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import requests
+from betternot.multipart import MultipartStream
+
+
+class TestMultipart(unittest.TestCase):
+    def setUp(self):
+        logging.getLogger("betternot.multipart").setLevel(logging.DEBUG)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_stream(self):
+        self.logger.info("\n\n Testing the streaming multipart encoder \n\n")
+
+        spectrum = (
+            Path(__file__).parent.parent / "data" / "ZTF23aaawbsc_combined_3850.ascii"
+        )
+        fits = Path(self.tmpdir.name) / "spectrum.fits"
+        fits.write_bytes(os.urandom(200_000))
+
+        stream = MultipartStream(
+            fields={"bot_api_key": "token"},
+            files={"files[0]": spectrum, "files[1]": fits},
+            block_size=4096,
+        )
+
+        body = b""
+        with stream:
+            while chunk := stream.read(10_000):
+                self.assertLessEqual(len(chunk), 10_000)
+                body += chunk
+                if stream.handle is not None:
+                    self.assertFalse(stream.handle.closed)
+
+        self.assertEqual(len(body), len(stream))
+        self.assertIsNone(stream.handle)
+
+        # the same body as the one requests builds in memory
+        reference = requests.Request(
+            "POST",
+            "https://sandbox.wiserep.org/api/file-upload",
+            data={"bot_api_key": "token"},
+            files={
+                "files[0]": (spectrum.name, spectrum.read_bytes(), "text/plain"),
+                "files[1]": (fits.name, fits.read_bytes(), "application/fits"),
+            },
+        ).prepare()
+        boundary = reference.headers["Content-Type"].split("boundary=")[1]
+        self.assertEqual(
+            reference.body.replace(boundary.encode(), stream.boundary.encode()), body
+        )
+
+        prepared = requests.Request(
+            "POST",
+            "https://sandbox.wiserep.org/api/file-upload",
+            data=MultipartStream(fields={}, files={"files[0]": spectrum}),
+        ).prepare()
+        self.assertIsNotNone(prepared.headers.get("Content-Length"))
+
+
+if __name__ == "__main__":
+    unittest.main()
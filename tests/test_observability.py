@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import unittest
+
+import numpy as np
+from astropy import units as u  # type: ignore
+from astropy.coordinates import SkyCoord, get_body  # type: ignore
+from betternot.ephemeris import Ephemeris
+from betternot.io import load_config
+from betternot.observability import Observability
+from betternot.targets import FLAG_NO_PHOTOMETRY, TargetTable
+
+
+class TestObservability(unittest.TestCase):
+    def setUp(self):
+        logging.getLogger("betternot.observability").setLevel(logging.DEBUG)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+    def test_altaz_grid(self):
+        self.logger.info("\n\n Testing the batched alt-az transform \n\n")
+
+        obs = Observability(ztf_ids=[], date="2023-08-26", site="not")
+
+        target_dict = {
+            "SP2209+178": {"ra": "22:11:31.3756", "dec": "+18:05:34.177"},
+            "ZTF23aalftvv": {"ra": 258.5355720, "dec": 81.0748332},
+            "south": {"ra": 30.0, "dec": -40.0},
+        }
+        coords = TargetTable.from_dict(target_dict).coords
+        alt, airmass = obs.altaz_grid(coords=coords)
+
+        self.assertEqual(alt.shape, (3, len(obs.delta_midnight)))
+        self.assertEqual(airmass.shape, alt.shape)
+
+        for i, info in enumerate(target_dict.values()):
+            unit = (u.hour, u.deg) if isinstance(info["ra"], str) else (u.deg, u.deg)
+            single = SkyCoord(info["ra"], info["dec"], unit=unit)
+            alt_single = single.transform_to(obs.frame_time).alt.deg
+            np.testing.assert_allclose(alt[i], alt_single, atol=1e-8)
+
+        above = alt > 0
+        np.testing.assert_allclose(
+            airmass[above], 1 / np.cos(np.radians(90 - alt[above]))
+        )
+        self.assertTrue(np.all(np.isnan(airmass[~above])))
+
+    def test_site(self):
+        self.logger.info("\n\n Testing the site registry from the config \n\n")
+
+        for site, site_config in load_config()["sites"].items():
+            obs = Observability(ztf_ids=[], date="2023-08-26", site=site)
+            self.assertAlmostEqual(obs.site.lat.deg, site_config["lat"])
+            self.assertAlmostEqual(obs.site.lon.deg, site_config["lon"])
+
+    def test_ephemeris(self):
+        self.logger.info("\n\n Testing the cached sun/moon ephemeris \n\n")
+
+        obs = Observability(ztf_ids=[], date="2023-08-26", site="not")
+        eph = obs.ephemeris
+
+        self.assertIs(obs.ephemeris, eph)
+        self.assertTrue(eph.path.is_file())
+        self.assertEqual(eph.sun_alt.shape, (len(obs.delta_midnight),))
+
+        reloaded = Ephemeris(
+            site=obs.site,
+            midnight_utc=obs.midnight_utc,
+            delta_midnight=obs.delta_midnight,
+        )
+        for field in Ephemeris.fields:
+            np.testing.assert_array_equal(getattr(reloaded, field), getattr(eph, field))
+
+        coords = SkyCoord([10.0, 250.0, 300.0], [20.0, -10.0, 60.0], unit="deg")
+        moon = get_body("moon", obs.midnight_utc, obs.site)
+        sep_expected = moon.separation(coords).deg
+        np.testing.assert_allclose(eph.moon_separation(coords), sep_expected, atol=0.01)
+
+        sep_track = eph.moon_separation(coords, track=True)
+        self.assertEqual(sep_track.shape, (3, len(obs.delta_midnight)))
+
+    def test_add_sources(self):
+        self.logger.info("\n\n Testing the ingestion of streamed source pages \n\n")
+
+        obs = Observability(ztf_ids=["ZTF23aalftvv"], date="2023-08-26", site="not")
+
+        pages = iter(
+            [
+                [
+                    ("ZTF23aalftvv", 258.5355720, 81.0748332, 18.9, 60180.2, None),
+                    ("ZTF23aaawbsc", 192.1230, 16.9720, None, None, None),
+                ],
+                [("ZTF23aaaaaaa", 30.0, -10.0, 19.5, 60181.3, None)],
+            ]
+        )
+        n_new = obs.add_sources(pages)
+
+        self.assertEqual(n_new, 3)
+        self.assertEqual(obs.ztf_ids, ["ZTF23aalftvv", "ZTF23aaawbsc", "ZTF23aaaaaaa"])
+        self.assertEqual(len(obs.current_targets), 3)
+        self.assertAlmostEqual(obs.targets["ZTF23aaaaaaa"]["mag"], 19.5)
+        self.assertEqual(obs.targets["ZTF23aaawbsc"]["flags"], FLAG_NO_PHOTOMETRY)
+
+        # already known sources are not added twice
+        self.assertEqual(
+            obs.add_sources([[("ZTF23aaawbsc", 192.1, 16.9, None, None, None)]]), 0
+        )
+        self.assertEqual(len(obs.targets), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
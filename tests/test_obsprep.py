@@ -33,14 +33,15 @@ class TestWiserep(unittest.TestCase):
         get_finding_chart(ztf_id=ztf_ids[0], date=date)
         obs.print_info()
 
-        obs_dict = obs.target_dict[ztf_ids[0]]
+        obs_dict = obs.targets[ztf_ids[0]]
         obs_mjd = obs_dict["mjd"]
         now = Time.now().mjd
         days_ago = now - obs_mjd
         mag = obs_dict["mag"]
         band = obs_dict["band"]
 
-        info_expected = f"-------------------------------------------\nZTF23aalftvv\nztf23aalftvv\nRA: 17:14:08.53728\nDec: +81:04:29.39952\n{mag:.2f} mag {days_ago:.0f} days ago in the {band} filter\n-------------------------------------------\n"
+        night_expected = "-------------------------------------------\nSun at 0°: 19:37 - 06:50 UT\nSun at -12°: 20:34 - 05:53 UT\nSun at -18°: 21:03 - 05:23 UT\n"
+        info_expected = f"{night_expected}-------------------------------------------\nZTF23aalftvv\nztf23aalftvv\nRA: 17:14:08.53728\nDec: +81:04:29.39952\n{mag:.2f} mag {days_ago:.0f} days ago in the {band} filter\nTransit: 20:08 UT at 38° altitude\nAirmass < 2.0: 14:51 - 01:25 UT\n-------------------------------------------\n"
 
         self.assertEqual(obs.info, info_expected)
 
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from betternot import fritz, observability, pipeline, scheduler, standards
+from betternot.observability import Observability
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        logging.getLogger("betternot.pipeline").setLevel(logging.DEBUG)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_prepare_night(self):
+        self.logger.info("\n\n Testing the observation preparation pipeline \n\n")
+
+        outdir = Path(self.tmpdir.name)
+
+        def get_date_dir(date):
+            return outdir
+
+        # Fritz and the finding chart downloads are stubbed, everything else runs
+        sources = {
+            "ZTF23aaaaaaa": (300.0, 20.0, 18.5, 60180.0, "ztfr"),
+            # from a group listing, which has no band
+            "ZTF23aaaaaab": (330.0, 40.0, 19.2, 60179.5, None),
+            "ZTF23aaaaaac": (10.0, 10.0, None, None, None),
+        }
+
+        def get_source_info(ztf_ids, max_workers=8):
+            return [sources.get(ztf_id, (None,) * 5) for ztf_id in ztf_ids]
+
+        def get_finding_charts(ztf_ids, date, max_workers=4):
+            return {ztf_id: 0.0 for ztf_id in ztf_ids}
+
+        with mock.patch.object(
+            observability, "get_date_dir", get_date_dir
+        ), mock.patch.object(
+            scheduler, "get_date_dir", get_date_dir
+        ), mock.patch.object(
+            standards, "get_date_dir", get_date_dir
+        ), mock.patch.object(
+            fritz, "get_source_info", get_source_info
+        ), mock.patch.object(
+            pipeline, "get_finding_charts", get_finding_charts
+        ):
+            obs = Observability(
+                ztf_ids=list(sources) + ["ZTF23unknown"],
+                date="2023-08-26",
+                site="not",
+                max_workers=12,
+            )
+            timings = pipeline.prepare_night(obs)
+
+        # room for the source queries and the finding charts at once
+        self.assertGreaterEqual(fritz.pool_size, 20)
+
+        self.assertEqual(len(obs.targets), 3)
+        self.assertIn("in the ztfr filter", obs.info)
+        self.assertNotIn("None filter", obs.info)
+        for step in ("fritz", "targets", "standards", "finding charts", "total"):
+            self.assertIn(step, timings)
+
+        for name in ("targets", "standards", "schedule"):
+            plots = list(outdir.glob(f"{name}*.pdf"))
+            self.assertTrue(plots, msg=name)
+            for plot in plots:
+                self.assertTrue(plot.read_bytes().startswith(b"%PDF"))
+
+
+if __name__ == "__main__":
+    unittest.main()
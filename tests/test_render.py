@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import json
+import logging
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from betternot import observability, scheduler
+from betternot.observability import Observability
+from betternot.render import (
+    FORMATS,
+    RenderCache,
+    TrackCache,
+    fingerprint,
+    output_suffix,
+    render_altitude_plot,
+)
+from betternot.targets import TargetTable
+
+
+class TestRender(unittest.TestCase):
+    def setUp(self):
+        logging.getLogger("betternot.render").setLevel(logging.DEBUG)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_track_cache(self):
+        self.logger.info("\n\n Testing the per-target track cache \n\n")
+
+        computed = []
+
+        def compute(ra, dec):
+            computed.append(len(ra))
+            return np.outer(ra + dec, np.ones(5))
+
+        path = Path(self.tmpdir.name) / "tracks.npz"
+        cache = TrackCache(path)
+
+        alt = cache.get(
+            np.array([10.0, 20.0, 10.0]), np.array([1.0, 2.0, 1.0]), compute
+        )
+        np.testing.assert_array_equal(alt[:, 0], [11.0, 22.0, 11.0])
+        self.assertEqual(computed, [2])
+
+        # only the new target is computed, also after reloading from disk
+        cache = TrackCache(path)
+        alt = cache.get(np.array([30.0, 20.0]), np.array([3.0, 2.0]), compute)
+        np.testing.assert_array_equal(alt[:, 0], [33.0, 22.0])
+        self.assertEqual(computed, [2, 1])
+        self.assertEqual(len(cache), 3)
+
+    def test_render_cache(self):
+        self.logger.info("\n\n Testing the render cache \n\n")
+
+        cache = RenderCache(Path(self.tmpdir.name))
+        outpath = Path(self.tmpdir.name) / "targets.pdf"
+        key = fingerprint("2023-08-26", ["ZTF23aalftvv"], np.array([258.5355720]))
+
+        self.assertFalse(cache.is_current(outpath, key))
+        outpath.write_bytes(b"%PDF")
+        cache.update(outpath, key)
+        self.assertTrue(cache.is_current(outpath, key))
+
+        other = fingerprint("2023-08-26", ["ZTF23aalftvv"], np.array([258.5355721]))
+        self.assertFalse(cache.is_current(outpath, other))
+
+        outpath.unlink()
+        self.assertFalse(cache.is_current(outpath, key))
+
+        # a new cache is created for every plot, concurrent updates must not lose entries
+        outpaths = [Path(self.tmpdir.name) / f"targets_{i}.pdf" for i in range(32)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(
+                executor.map(
+                    lambda path: RenderCache(Path(self.tmpdir.name)).update(path, key),
+                    outpaths,
+                )
+            )
+        fingerprints = json.loads(cache.path.read_text())
+        self.assertTrue(all(fingerprints[path.name] == key for path in outpaths))
+        self.assertEqual(list(Path(self.tmpdir.name).glob("*.part")), [])
+
+    def test_formats(self):
+        self.logger.info("\n\n Testing the output formats of the altitude plot \n\n")
+
+        hours = np.linspace(-12, 12, 200)
+        alt = np.array([60 * np.cos(np.radians(hours * 15)), 40 + 0 * hours])
+        sun_alt = -40 * np.cos(np.radians(hours * 15))
+
+        for fmt in FORMATS:
+            outpath = Path(self.tmpdir.name) / f"targets_{fmt}.{output_suffix(fmt)}"
+            render_altitude_plot(
+                outpath=outpath,
+                fmt=fmt,
+                hours=hours,
+                alt=alt,
+                labels=["a", "b"],
+                sun_alt=sun_alt,
+                moon_alt=alt[1],
+                title="test",
+            )
+            self.assertTrue(outpath.is_file())
+
+        html = (Path(self.tmpdir.name) / "targets_html.html").read_text()
+        self.assertTrue(html.startswith("<!DOCTYPE html>"))
+        self.assertIn("<svg", html)
+
+        with self.assertRaises(ValueError):
+            output_suffix("jpeg")
+
+    def test_pages(self):
+        self.logger.info("\n\n Testing paged plots and stale pages \n\n")
+
+        outdir = Path(self.tmpdir.name)
+        rng = np.random.default_rng(1)
+        target_dict = {
+            f"ZTF23aaaa{i:03d}": {
+                "ra": float(rng.uniform(250, 350)),
+                "dec": float(rng.uniform(0, 60)),
+            }
+            for i in range(30)
+        }
+
+        with mock.patch.object(
+            observability, "get_date_dir", lambda date: outdir
+        ), mock.patch.object(scheduler, "get_date_dir", lambda date: outdir):
+            obs = Observability(
+                ztf_ids=list(target_dict),
+                date="2023-08-26",
+                site="not",
+                plot_format="png",
+            )
+            obs.targets = TargetTable.from_dict(target_dict)
+
+            for per_page, expected in [
+                (12, ["targets_1.png", "targets_2.png", "targets_3.png"]),
+                (20, ["targets_1.png", "targets_2.png"]),
+                (None, ["targets.png"]),
+                (10, ["targets_1.png", "targets_2.png", "targets_3.png"]),
+            ]:
+                obs.targets_per_page = per_page
+                obs.create_plot(targets=obs.current_targets, savename="targets")
+                self.assertEqual(
+                    sorted(path.name for path in outdir.glob("targets*")), expected
+                )
+
+            # a page that keeps its targets is redrawn when the page count in its title changes
+            obs.targets_per_page = 12
+            obs.create_plot(targets=obs.current_targets, savename="targets")
+            first_page = (outdir / "targets_1.png").read_bytes()
+            obs.targets = TargetTable.from_dict(dict(list(target_dict.items())[:24]))
+            obs.create_plot(targets=obs.current_targets, savename="targets")
+            self.assertEqual(
+                sorted(path.name for path in outdir.glob("targets*")),
+                ["targets_1.png", "targets_2.png"],
+            )
+            self.assertNotEqual((outdir / "targets_1.png").read_bytes(), first_page)
+
+            # the schedule is saved in the same format
+            scheduler.schedule_night(obs)
+            self.assertTrue((outdir / "schedule.png").is_file())
+            self.assertFalse((outdir / "schedule.pdf").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
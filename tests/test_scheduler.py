@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import time
+import unittest
+
+import numpy as np
+from astropy import units as u  # type: ignore
+from astropy.coordinates import SkyCoord  # type: ignore
+from betternot.constraints import Constraints
+from betternot.observability import Observability
+from betternot.scheduler import Scheduler
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.obs = Observability(
+            ztf_ids=[], date="2022-08-26", site="not", backend="analytic"
+        )
+
+        rng = np.random.default_rng(42)
+        self.coords = SkyCoord(
+            rng.uniform(0, 360, 500) * u.deg, rng.uniform(-20, 80, 500) * u.deg
+        )
+        self.names = [f"target{i}" for i in range(500)]
+
+    def check_schedule(self, scheduler: Scheduler, schedule: dict):
+        """
+        Exposures do not overlap, leave room for the overhead and fulfil the constraints
+        """
+        start, end = schedule["start"], schedule["end"]
+        gaps = start[1:] - end[:-1]
+        self.assertTrue(np.all(gaps >= scheduler.overhead / 3600))
+
+        index = [self.names.index(name) for name in schedule["name"]]
+        mask = scheduler.constraints.mask(obs=self.obs, coords=self.coords[index])
+        for row, (t_start, t_end) in enumerate(zip(start, end)):
+            exposing = (scheduler.grid >= t_start - 1e-9) & (
+                scheduler.grid < t_end - 1e-9
+            )
+            self.assertTrue(np.all(mask[row, exposing]))
+
+        self.assertTrue(np.all(schedule["airmass"] <= 2.0))
+        self.assertEqual(
+            len(schedule["name"]) + len(schedule["unscheduled"]), len(self.names)
+        )
+
+    def test_modes(self):
+        self.logger.info("\n\n Testing the greedy and optimising scheduler \n\n")
+
+        names, coords = self.names[:20], self.coords[:20]
+        scheduler = Scheduler(
+            obs=self.obs, exposure_time=900, constraints=Constraints(max_airmass=2.0)
+        )
+        greedy = scheduler.schedule(names=names, coords=coords, mode="greedy")
+        optimised = scheduler.schedule(
+            names=names, coords=coords, mode="optimise", time_budget=0.5
+        )
+
+        self.names = names
+        self.coords = coords
+        self.check_schedule(scheduler, greedy)
+        self.check_schedule(scheduler, optimised)
+        self.assertLessEqual(optimised["cost"], greedy["cost"])
+
+        with self.assertRaises(ValueError):
+            scheduler.schedule(names=names, coords=coords, mode="random")
+
+    def test_speed(self):
+        self.logger.info("\n\n Scheduling 500 targets \n\n")
+
+        scheduler = Scheduler(obs=self.obs, exposure_time=120, overhead=120)
+        self.obs.ephemeris
+
+        for mode in ["greedy", "optimise"]:
+            t_start = time.perf_counter()
+            schedule = scheduler.schedule(
+                names=self.names, coords=self.coords, mode=mode, time_budget=1.0
+            )
+            duration = time.perf_counter() - t_start
+
+            self.logger.debug(
+                f"{mode}: {len(schedule['name'])} targets scheduled in {duration:.2f} s"
+            )
+            self.check_schedule(scheduler, schedule)
+            self.assertLess(duration, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
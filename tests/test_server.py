@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import json
+import logging
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+from betternot.server import HOST, PlanningServer, forward, make_handler
+
+
+class Night:
+    """
+    Stands in for Observability, so no astropy or Fritz work is done
+    """
+
+    def __init__(self, ztf_ids, date, site, max_workers):
+        self.ztf_ids = ztf_ids
+        self.targets: dict = {}
+        self.info: dict = {}
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        logging.getLogger("betternot.server").setLevel(logging.DEBUG)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.refresh_flags: list = []
+
+        def prepare_night(obs, max_workers):
+            self.refresh_flags.append(self.server.fritz.cache.refresh)
+            if "ZTF23failing" in obs.ztf_ids:
+                raise RuntimeError("planning failed")
+            obs.info = {name: {"ra": 1.0} for name in obs.ztf_ids}
+            return {"total": 0.0}
+
+        self.server = PlanningServer()
+        self.server.Observability = Night
+        self.server.prepare_night = prepare_night
+
+        self.httpd = ThreadingHTTPServer((HOST, 0), make_handler(self.server))
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.server.fritz.cache.refresh = False
+
+    def post(self, body: bytes) -> tuple[int, dict]:
+        req = urllib.request.Request(f"http://{HOST}:{self.port}/plan", data=body)
+        try:
+            with urllib.request.urlopen(req, timeout=5) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_forward(self):
+        self.logger.info("\n\n Testing the planning server \n\n")
+
+        reply = forward(
+            {"names": ["ZTF23aaawbsc"], "date": "2023-08-26", "refresh": True},
+            port=self.port,
+        )
+        self.assertEqual(reply["info"], {"ZTF23aaawbsc": {"ra": 1.0}})
+
+        # the night is reused, and the refresh of the first request does not stick
+        reply = forward(
+            {"names": ["ZTF23aaawbsc", "ZTF23aakmewi"], "date": "2023-08-26"},
+            port=self.port,
+        )
+        self.assertEqual(len(reply["info"]), 2)
+        self.assertEqual(len(self.server.observabilities), 1)
+        self.assertEqual(self.refresh_flags, [True, False])
+
+        with self.assertRaises(RuntimeError):
+            forward(
+                {"names": ["ZTF23failing"], "date": "2023-08-27", "refresh": True},
+                port=self.port,
+            )
+        self.assertFalse(self.server.fritz.cache.refresh)
+
+        # no server on this port
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.assertIsNone(forward({"names": [], "date": "2023-08-26"}, port=self.port))
+
+    def test_malformed_request(self):
+        self.logger.info("\n\n Testing malformed planning requests \n\n")
+
+        for body in (
+            b"{not json",
+            b"[1, 2]",
+            b"\xff\xfe",
+            b'{"names": [], "date": "2023-08-26", "unknown": 1}',
+            b'{"names": []}',
+            b'{"names": "ZTF23aaawbsc", "date": "2023-08-26"}',
+            b'{"names": [], "date": "2023-08-26", "max_workers": true}',
+        ):
+            status, reply = self.post(body)
+            self.assertEqual(status, 400)
+            self.assertIn("Malformed request", reply["error"])
+
+        # the server keeps answering
+        status, reply = self.post(
+            json.dumps({"names": [], "date": "2023-08-26"}).encode()
+        )
+        self.assertEqual(status, 200)
+        status, reply = self.post(
+            json.dumps(
+                {"names": [], "date": "2023-08-26", "site": "not", "group_ids": None}
+            ).encode()
+        )
+        self.assertEqual(status, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from astropy import units as u  # type: ignore
+from astropy.table import Table  # type: ignore
+from betternot import standards as standards_module
+from betternot.constraints import unit_vectors
+from betternot.io import load_config
+from betternot.observability import Observability
+from betternot.standards import (
+    StandardCatalog,
+    load_catalog,
+    recommend_standards,
+    select_standards,
+)
+from betternot.targets import TargetTable
+
+
+class TestStandards(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        rng = np.random.default_rng(42)
+        self.ra = rng.uniform(0, 360, 5000)
+        self.dec = np.degrees(np.arcsin(rng.uniform(-1, 1, 5000)))
+        self.names = np.array([f"std{i}" for i in range(5000)])
+        self.catalog = StandardCatalog(names=self.names, ra=self.ra, dec=self.dec)
+
+    def test_cone(self):
+        self.logger.info("\n\n Testing the catalog cone search \n\n")
+
+        vectors = unit_vectors(self.ra, self.dec)
+        for ra, dec, radius in [
+            (0.5, 10, 20),
+            (359, -30, 15),
+            (180, 85, 10),
+            (20, 60, 40),
+        ]:
+            found = set(self.catalog.names[self.catalog.cone(ra, dec, radius)])
+            cos_sep = vectors @ unit_vectors(ra, dec)
+            expected = set(self.names[cos_sep >= np.cos(np.radians(radius))])
+            self.assertEqual(found, expected)
+
+    def test_files(self):
+        self.logger.info("\n\n Testing the catalog formats \n\n")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_path = Path(tmpdir) / "standards.csv"
+            csv_path.write_text(
+                "name,ra,dec\nSP2209+178,22:11:31.3756,+18:05:34.177\nSP1550+330,15:51:59.8854,+32:56:54.329\n"
+            )
+            csv_catalog = StandardCatalog.from_file(csv_path)
+
+            ecsv_path = Path(tmpdir) / "standards.ecsv"
+            Table(
+                {
+                    "name": ["SP2209+178", "SP1550+330"],
+                    "ra": [332.8807317, 237.9995225] * u.deg,
+                    "dec": [18.0928269, 32.9484247] * u.deg,
+                }
+            ).write(ecsv_path)
+            ecsv_catalog = StandardCatalog.from_file(ecsv_path)
+
+        for catalog in [csv_catalog, ecsv_catalog]:
+            self.assertEqual(len(catalog), 2)
+            index = list(catalog.names).index("SP2209+178")
+            self.assertAlmostEqual(catalog.ra[index], 332.8807317, places=5)
+            self.assertAlmostEqual(catalog.dec[index], 18.0928269, places=5)
+
+        config_catalog = load_catalog(load_config())
+        self.assertEqual(set(config_catalog.names), set(load_config()["standards"]))
+
+    def test_selection(self):
+        self.logger.info("\n\n Testing the standard selection \n\n")
+
+        obs = Observability(
+            ztf_ids=["ZTF23aalftvv", "ZTF23summer"], date="2022-08-26", site="not"
+        )
+        obs.targets = TargetTable.from_dict(
+            {
+                "ZTF23aalftvv": {"ra": 258.5355720, "dec": 81.0748332},
+                "ZTF23summer": {"ra": 300.0, "dec": 20.0},
+            }
+        )
+        obs.ephemeris
+
+        t_start = time.perf_counter()
+        standards = select_standards(obs=obs, catalog=self.catalog, n_standards=3)
+        duration = time.perf_counter() - t_start
+
+        self.logger.debug(f"Selection from 5000 standards: {duration * 1000:.0f} ms")
+        self.assertEqual(len(standards), 3)
+        self.assertLess(duration, 0.5)
+
+        scores = [info["score"] for info in standards.values()]
+        self.assertEqual(scores, sorted(scores))
+
+        # among the config standards, only the late-night one matches
+        standards = select_standards(obs=obs, catalog=load_catalog(load_config()))
+        self.assertEqual(list(standards)[0], "SP2209+178")
+
+        # only the best one is written for reduce.sh
+        with tempfile.TemporaryDirectory() as tmpdir, mock.patch.object(
+            standards_module, "get_date_dir", lambda date: Path(tmpdir)
+        ):
+            recommended = recommend_standards(obs=obs)
+            self.assertEqual(
+                (Path(tmpdir) / "standard.txt").read_text(),
+                list(recommended)[0] + "\n",
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+# these must only be imported once they are actually needed
+HEAVY_MODULES = ["astropy", "astroplan", "matplotlib", "keyring", "ztfquery"]
+
+# generous upper limit for importing the CLI (cumulative, in seconds)
+MAX_IMPORT_TIME = 1.0
+
+
+def importtime(code: str) -> dict:
+    """
+    Run python code with `-X importtime` and return the cumulative import time (s) of each module
+    """
+    env = dict(os.environ)
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=Path(__file__).parents[1],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+
+    modules = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split(":", 1)[1].split("|")
+        modules[name.strip()] = int(cumulative) / 1e6
+
+    return modules
+
+
+class TestStartup(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+    def assert_light(self, modules: dict):
+        for heavy in HEAVY_MODULES:
+            self.assertNotIn(heavy, modules, f"{heavy} is imported at startup")
+
+    def test_import_main(self):
+        self.logger.info("\n\n Testing the import time of the CLI \n\n")
+
+        modules = importtime("import main")
+
+        self.assertIn("main", modules)
+        self.assert_light(modules)
+        self.assertLess(modules["main"], MAX_IMPORT_TIME)
+
+    def test_help(self):
+        self.logger.info("\n\n Testing that `not --help` stays light \n\n")
+
+        modules = importtime(
+            "import sys; sys.argv = ['not', '--help']\n"
+            "import main\n"
+            "try:\n    main.run()\nexcept SystemExit:\n    pass"
+        )
+        self.assert_light(modules)
+
+    def test_import_clients(self):
+        self.logger.info("\n\n Testing that the API clients need no credentials \n\n")
+
+        modules = importtime("import betternot.fritz, betternot.wiserep")
+        self.assert_light(modules)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import time
+import unittest
+
+import numpy as np
+import pandas as pd  # type: ignore
+from betternot.constraints import Constraints
+from betternot.observability import Observability
+from betternot.sweep import Sweep
+from betternot.targets import TargetTable
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.target_dict = {
+            "SP2209+178": {"ra": "22:11:31.3756", "dec": "+18:05:34.177"},
+            "ZTF23aalftvv": {"ra": 258.5355720, "dec": 81.0748332},
+            "southern": {"ra": 0.0, "dec": -80.0},
+        }
+
+    def test_consistency(self):
+        self.logger.info("\n\n Comparing the sweep with single nights \n\n")
+
+        constraints = Constraints(min_moon_separation=0)
+        sweep = Sweep(
+            targets=self.target_dict,
+            start_date="2022-08-26",
+            n_nights=3,
+            sites=["not", "lbt"],
+            constraints=constraints,
+        )
+        sweep.compute()
+        self.assertEqual(sweep.hours.shape, (3, 2, 3))
+
+        for s, site in enumerate(sweep.sites):
+            for n, date in enumerate(sweep.dates):
+                obs = Observability(
+                    ztf_ids=[], date=date, site=site, backend="analytic"
+                )
+                res = constraints.evaluate(
+                    obs=obs, coords=TargetTable.from_dict(self.target_dict).coords
+                )
+                # the sweep samples every 15 minutes
+                np.testing.assert_allclose(sweep.hours[:, s, n], res["hours"], atol=0.5)
+
+    def test_summary(self):
+        self.logger.info("\n\n Testing the sweep summary \n\n")
+
+        sweep = Sweep(targets=self.target_dict, start_date="2022-08-26", n_nights=5)
+        summary = sweep.summary()
+
+        self.assertEqual(list(summary.index), list(self.target_dict))
+        self.assertIn(summary.loc["SP2209+178", "best_site"], sweep.sites)
+        self.assertIn(summary.loc["SP2209+178", "best_night"], sweep.dates)
+        self.assertTrue(summary.loc["SP2209+178", "hours"] > 0)
+        self.assertTrue(pd.isna(summary.loc["southern", "best_site"]))
+        self.assertEqual(summary.loc["southern", "nights_not"], 0)
+
+    def test_speed(self):
+        self.logger.info("\n\n Sweeping 100 targets x 2 sites x 90 nights \n\n")
+
+        rng = np.random.default_rng(42)
+        target_dict = {
+            f"target{i}": {"ra": ra, "dec": dec}
+            for i, (ra, dec) in enumerate(
+                zip(rng.uniform(0, 360, 100), rng.uniform(-20, 80, 100))
+            )
+        }
+        sweep = Sweep(
+            targets=target_dict,
+            start_date="2022-09-01",
+            n_nights=90,
+            sites=["not", "lbt"],
+        )
+
+        t_start = time.perf_counter()
+        sweep.compute()
+        duration = time.perf_counter() - t_start
+
+        self.logger.debug(f"Sweep: {duration:.2f} s")
+        self.assertEqual(sweep.hours.shape, (100, 2, 90))
+        self.assertLess(duration, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
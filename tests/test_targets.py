@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import unittest
+
+import numpy as np
+from betternot.io import load_config
+from betternot.targets import FLAG_NO_PHOTOMETRY, FLAG_STANDARD, TargetTable
+
+
+class TestTargets(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+    def test_from_dict(self):
+        self.logger.info("\n\n Testing the target table ingestion \n\n")
+
+        table = TargetTable.from_dict(
+            {
+                "SP2209+178": {"ra": "22:11:31.3756", "dec": "+18:05:34.177"},
+                "ZTF23aalftvv": {
+                    "ra": 258.5355720,
+                    "dec": 81.0748332,
+                    "mag": 18.5,
+                    "mjd": 60180.0,
+                    "band": "ztfr",
+                },
+            }
+        )
+
+        self.assertEqual(len(table), 2)
+        self.assertAlmostEqual(table["SP2209+178"]["ra"], 332.8807317, places=6)
+        self.assertAlmostEqual(table["SP2209+178"]["dec"], 18.0928269, places=6)
+        self.assertEqual(table["ZTF23aalftvv"]["ra"], 258.5355720)
+        self.assertEqual(table["ZTF23aalftvv"]["band"], "ztfr")
+        self.assertTrue(table["SP2209+178"]["flags"] & FLAG_NO_PHOTOMETRY)
+        self.assertFalse(table["ZTF23aalftvv"]["flags"] & FLAG_NO_PHOTOMETRY)
+
+        standards = TargetTable.from_dict(
+            load_config()["standards"], flags=FLAG_STANDARD
+        )
+        self.assertTrue(np.all(standards.flags & FLAG_STANDARD))
+
+    def test_select(self):
+        self.logger.info(
+            "\n\n Testing target selection and the cached coordinates \n\n"
+        )
+
+        rng = np.random.default_rng(42)
+        table = TargetTable()
+        names = [f"ZTF23aa{i:05d}" for i in range(5000)]
+        table.add(
+            names=names,
+            ra=rng.uniform(0, 360, 5000),
+            dec=rng.uniform(-30, 90, 5000),
+            mag=rng.uniform(17, 20, 5000),
+            mjd=np.full(5000, 60180.0),
+            band=["ztfg"] * 5000,
+        )
+
+        coords = table.coords
+        self.assertIs(table.coords, coords)
+
+        subset = table.select([names[10], "ZTF23missing", names[3]])
+        self.assertEqual(list(subset.names), [names[10], names[3]])
+        self.assertEqual(subset.coords[0].ra.deg, table.ra[10])
+        self.assertEqual(subset["ZTF23aa00003"]["mag"], table.mag[3])
+
+        table.add(names=["ZTF23new"], ra=[1.0], dec=[2.0])
+        self.assertIn("ZTF23new", table)
+        self.assertEqual(len(table.coords), 5001)
+
+        table.clear()
+        self.assertEqual(len(table), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+from betternot.tns import TNSCatalog, angular_separation
+
+
+class TestTNS(unittest.TestCase):
+    def setUp(self):
+        logging.getLogger("betternot.tns").setLevel(logging.DEBUG)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_catalog(self):
+        self.logger.info("\n\n Testing the local TNS catalog \n\n")
+
+        rng = np.random.default_rng(42)
+        n_objects = 20_000
+        ra = rng.uniform(0, 360, n_objects)
+        dec = np.degrees(np.arcsin(rng.uniform(-1, 1, n_objects)))
+        # objects close to the RA wrap, a zone border and the pole
+        ra[:3] = [359.9999, 10.0, 120.0]
+        dec[:3] = [20.0, 0.025, 89.9995]
+        names = [f"2023{i:05d}" for i in range(n_objects)]
+
+        csv = Path(self.tmpdir.name) / "tns_public_objects.csv"
+        with open(csv, "w") as f:
+            f.write('"2023-09-10 00:00:00"\n')
+            f.write('"objid","name_prefix","name","ra","declination","lastmodified"\n')
+            for i, name in enumerate(names):
+                f.write(f'"{i}","SN","{name}","{ra[i]}","{dec[i]}",""\n')
+
+        catalog = TNSCatalog.from_csv(csv)
+        self.assertEqual(len(catalog), n_objects)
+        self.assertEqual(catalog.updated, "2023-09-10 00:00:00")
+
+        catalog.save(Path(self.tmpdir.name) / "tns_catalog.npz")
+        catalog = TNSCatalog.load(Path(self.tmpdir.name) / "tns_catalog.npz")
+
+        # positions within 1.5 arcsec of the first 1000 objects, and 1000 random ones
+        offset = 1.5 / 3600
+        angle = rng.uniform(0, 2 * np.pi, 1000)
+        query_dec = np.clip(dec[:1000] + offset * np.sin(angle), -90, 90)
+        query_ra = ra[:1000] + offset * np.cos(angle) / np.cos(np.radians(dec[:1000]))
+        query_ra[0] = 0.0002
+        query_ra = np.concatenate([query_ra, rng.uniform(0, 360, 1000)])
+        query_dec = np.concatenate(
+            [query_dec, np.degrees(np.arcsin(rng.uniform(-1, 1, 1000)))]
+        )
+
+        t_start = time.perf_counter()
+        matches = catalog.match(ra=query_ra, dec=query_dec, radius=3)
+        elapsed = time.perf_counter() - t_start
+        self.logger.info(f"Matched {len(query_ra)} positions in {elapsed*1000:.1f} ms")
+        self.assertLess(elapsed, 1)
+
+        # the same as comparing every position with every object
+        for i in range(len(query_ra)):
+            sep = angular_separation(query_ra[i], query_dec[i], ra, dec) * 3600
+            expected = names[np.argmin(sep)] if sep.min() <= 3 else None
+            self.assertEqual(matches[i], expected)
+
+        self.assertEqual(matches[:3], names[:3])
+
+        # daily lists replace the positions of modified objects and add new ones
+        daily = TNSCatalog(
+            names=[names[0], "2023zzz"],
+            ra=[50.0, 60.0],
+            dec=[10.0, 10.0],
+            updated="2023-09-11 00:00:00",
+        )
+        merged = catalog.merge(daily)
+        self.assertEqual(len(merged), n_objects + 1)
+        self.assertEqual(merged.updated, "2023-09-11 00:00:00")
+        self.assertEqual(
+            merged.match(ra=[50.0, 60.0, query_ra[0]], dec=[10.0, 10.0, query_dec[0]]),
+            [names[0], "2023zzz", None],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import unittest
+from pathlib import Path
+
+from betternot.validation import lookup_id, validate_report
+from betternot.wiserep import Wiserep, load_template
+
+
+class TestValidation(unittest.TestCase):
+    def setUp(self):
+        logging.getLogger("betternot.validation").setLevel(logging.DEBUG)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+    def test_lookup(self):
+        self.logger.info("\n\n Testing the lookup of WISeREP IDs \n\n")
+
+        self.assertEqual(lookup_id("instruments", "ALFOSC"), "41")
+        self.assertEqual(lookup_id("instruments", "not - alfosc"), "41")
+        self.assertEqual(lookup_id("instruments", 41), "41")
+        self.assertEqual(lookup_id("object_types", "SN Ia"), "3")
+
+        with self.assertRaises(KeyError):
+            # NOT has several instruments
+            lookup_id("instruments", "NOT")
+        with self.assertRaises(KeyError):
+            lookup_id("instruments", "9999")
+
+    def test_report(self):
+        self.logger.info("\n\n Testing the validation of spectrum reports \n\n")
+
+        report = load_template()
+        self.assertEqual(validate_report(report), [])
+
+        spectrum = report["objects"][0]["spectra"]["spectra_group"][0]
+        spectrum["instrumentid"] = "ALFOSC"
+        spectrum["qualityid"] = "High"
+        self.assertEqual(validate_report(report), [])
+        self.assertEqual(spectrum["instrumentid"], "41")
+        self.assertEqual(spectrum["qualityid"], "3")
+
+        spectrum["flux_unitid"] = "999"
+        spectrum["obsdate"] = ""
+        report["objects"][0]["groupid"] = "12345"
+        errors = validate_report(report)
+        self.assertEqual(len(errors), 3)
+        self.assertTrue(any("flux_unitid" in error for error in errors))
+
+        # an invalid quality is caught before any request is made
+        testspec_path = (
+            Path(__file__).parent.parent / "data" / "ZTF23aaawbsc_combined_3850.ascii"
+        )
+        wrep = Wiserep(
+            ztf_id="ZTF23aaawbsc",
+            spec_path=testspec_path,
+            quality="excellent",
+        )
+        self.assertEqual(len(wrep.errors), 1)
+        self.assertIsNone(wrep.res)
+
+
+if __name__ == "__main__":
+    unittest.main()
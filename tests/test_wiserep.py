@@ -1,12 +1,22 @@
 #!/usr/bin/env python
 # coding: utf-8
 
+import json
 import logging
 import os
+import shutil
+import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
-from betternot.wiserep import Wiserep
+from betternot.wiserep import (
+    Wiserep,
+    WiserepBatch,
+    WiserepClient,
+    header_metadata,
+    scan_header,
+)
 
 
 class TestWiserep(unittest.TestCase):
@@ -40,6 +50,195 @@ class TestWiserep(unittest.TestCase):
         # self.assertEqual(res_object, res_object_expected)
         self.assertEqual(res_success, res_success_expected)
 
+    def test_header(self):
+        self.logger.info("\n\n Testing the spectrum header scanner \n\n")
+
+        testspec_path = (
+            Path(__file__).parent.parent / "data" / "ZTF23aaawbsc_combined_3850.ascii"
+        )
+
+        header = scan_header(testspec_path)
+
+        self.assertEqual(header["OBJECT"], "ZTF23aaawbsc")
+        self.assertAlmostEqual(float(header["RA"]), 265.214184390181)
+        self.assertAlmostEqual(float(header["DEC"]), 66.2042929252271)
+
+        metadata = header_metadata(header)
+        metadata_expected = {
+            "observer": "Jesper Sollerman, Simeon Reusch",
+            "reducer": "Simeon Reusch",
+            "obsdate": "2023-08-05 01:13:31.030",
+            "exptime": 2400,
+            "slit": "1.0",
+            "grism": "Grism 4",
+            "wl_medium_id": "2",
+            "flux_unit_coeff": "1e-17",
+            "instrumentid": "41",
+        }
+        self.assertEqual(metadata, metadata_expected)
+
+        # the position comes from the header, no TNS or Fritz request is made
+        wrep = Wiserep(
+            ztf_id="ZTF23aaawbsc",
+            spec_path=testspec_path,
+            tns_name="2023aew",
+            upload=False,
+        )
+        self.assertAlmostEqual(wrep.ra, 265.214184390181)
+        wrep.read_spectrum(server_filename="ZTF23aaawbsc_combined_3850.ascii")
+        wrep.generate_report()
+        spectrum = wrep.report["objects"][0]["spectra"]["spectra_group"][0]
+        self.assertEqual(spectrum["grism"], "Grism 4")
+        self.assertEqual(wrep.report["objects"][0]["iau_name"], "2023aew")
+
+    def test_batch(self):
+        self.logger.info("\n\n Testing the batch upload offline \n\n")
+
+        testspec_path = (
+            Path(__file__).parent.parent / "data" / "ZTF23aaawbsc_combined_3850.ascii"
+        )
+        spec_size = testspec_path.stat().st_size
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            spectra = []
+            for i in range(5):
+                spec_path = Path(tmpdir) / f"spectrum_{i}.ascii"
+                shutil.copy(testspec_path, spec_path)
+                spectrum = {
+                    "ztf_id": "ZTF23aaawbsc",
+                    "spec_path": spec_path,
+                    "tns_name": "2023aew" if i < 3 else "2023abc",
+                }
+                if i == 1:
+                    fits_path = Path(tmpdir) / f"spectrum_{i}.fits"
+                    fits_path.write_bytes(os.urandom(spec_size))
+                    spectrum["fits_path"] = fits_path
+                spectra.append(spectrum)
+
+            # a spectrum that cannot be read does not stop the others
+            spectra.append(
+                {
+                    "ztf_id": "ZTF23aaawbsc",
+                    "spec_path": Path(tmpdir) / "missing.ascii",
+                    "tns_name": "2023aew",
+                }
+            )
+
+            uploads: list = []
+            reports: list = []
+
+            def upload_files(batch, file_list):
+                uploads.append([Path(path).name for path in file_list])
+                # the second request fails
+                if len(uploads) == 2:
+                    return [None] * len(file_list)
+                return [f"server_{Path(path).name}" for path in file_list]
+
+            def send_json_report(batch, json_report):
+                reports.append(json.loads(json_report))
+                return {"id_message": "OK"}
+
+            with mock.patch.object(
+                WiserepBatch, "upload_files", upload_files
+            ), mock.patch.object(WiserepBatch, "send_json_report", send_json_report):
+                batch = WiserepBatch(
+                    spectra=spectra, max_upload_size=int(2.5 * spec_size)
+                )
+
+            # files of one spectrum stay together, at most 2.5 spectra per request
+            self.assertEqual(
+                uploads,
+                [
+                    ["spectrum_0.ascii"],
+                    ["spectrum_1.ascii", "spectrum_1.fits"],
+                    ["spectrum_2.ascii", "spectrum_3.ascii"],
+                    ["spectrum_4.ascii"],
+                ],
+            )
+            self.assertEqual(
+                [len(chunk) for chunk in batch.chunks(batch.uploads)], [1, 1, 2, 1]
+            )
+
+            status = {
+                Path(path).name: message for path, message in batch.status.items()
+            }
+            self.assertEqual(status["spectrum_1.ascii"], "file upload failed")
+            self.assertTrue(status["missing.ascii"].startswith("unreadable spectrum"))
+            for i in (0, 2, 3, 4):
+                self.assertEqual(status[f"spectrum_{i}.ascii"], "ok")
+
+            # one report, the spectra grouped by object and mapped to their server filenames
+            self.assertEqual(len(reports), 1)
+            objects = {obj["iau_name"]: obj for obj in reports[0]["objects"]}
+            self.assertEqual(set(objects), {"2023aew", "2023abc"})
+            files = {
+                name: [
+                    spectrum["ascii_file"]
+                    for spectrum in obj["spectra"]["spectra_group"]
+                ]
+                for name, obj in objects.items()
+            }
+            self.assertEqual(
+                files,
+                {
+                    "2023aew": ["server_spectrum_0.ascii", "server_spectrum_2.ascii"],
+                    "2023abc": ["server_spectrum_3.ascii", "server_spectrum_4.ascii"],
+                },
+            )
+
+    def test_invalid_after_upload(self):
+        self.logger.info("\n\n Testing reports that turn invalid after the upload \n\n")
+
+        testspec_path = (
+            Path(__file__).parent.parent / "data" / "ZTF23aaawbsc_combined_3850.ascii"
+        )
+        validate = Wiserep.validate
+
+        def validate_server_names(spectrum):
+            errors = validate(spectrum)
+            group = spectrum.report["objects"][0]["spectra"]["spectra_group"]
+            if group[0]["ascii_file"] == "server_spectrum_1.ascii":
+                errors.append("ascii_file: rejected server filename")
+            return errors
+
+        def upload_files(client, file_list):
+            return [f"server_{Path(path).name}" for path in file_list]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            spectra = []
+            for i in range(2):
+                spec_path = Path(tmpdir) / f"spectrum_{i}.ascii"
+                shutil.copy(testspec_path, spec_path)
+                spectra.append(
+                    {
+                        "ztf_id": "ZTF23aaawbsc",
+                        "spec_path": spec_path,
+                        "tns_name": "2023aew",
+                    }
+                )
+
+            send_metadata = mock.Mock(return_value={"id_message": "OK"})
+            with mock.patch.object(
+                Wiserep, "validate", validate_server_names
+            ), mock.patch.object(
+                WiserepClient, "upload_files", upload_files
+            ), mock.patch.object(
+                WiserepClient, "send_metadata", send_metadata
+            ):
+                wrep = Wiserep(**spectra[1])
+                self.assertEqual(wrep.errors, ["ascii_file: rejected server filename"])
+                self.assertIsNone(wrep.res)
+                send_metadata.assert_not_called()
+
+                batch = WiserepBatch(spectra=spectra)
+
+            send_metadata.assert_called_once()
+            self.assertEqual(batch.status[str(spectra[0]["spec_path"])], "ok")
+            self.assertTrue(
+                batch.status[str(spectra[1]["spec_path"])].startswith("invalid report")
+            )
+            self.assertEqual(batch.uploaded, [batch.uploads[0]])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,6 @@
 import logging
 
-from betternot.wiserep import Wiserep
+from betternot.wiserep import WiserepBatch
 
 logging.basicConfig()
 logger = logging.getLogger()
@@ -8,16 +8,22 @@ logger.setLevel(logging.INFO)
 
 sandbox = False
 
-Wiserep(
-    ztf_id="ZTF23aaawbsc",
-    spec_path="ZTF23aaawbsc_2023-09-11_3850.ascii",
+# all spectra of a night go into one upload and one report
+batch = WiserepBatch(
+    spectra=[
+        {
+            "ztf_id": "ZTF23aaawbsc",
+            "spec_path": "ZTF23aaawbsc_2023-09-11_3850.ascii",
+        },
+        {
+            "ztf_id": "ZTF23aakmewi",
+            "spec_path": "ZTF23aakmewi_2023-09-11_3850.ascii",
+            "quality": "high",  # per-spectrum quality, overrides the default below
+        },
+    ],
     sandbox=sandbox,  # set False for actual upload
     quality="medium",  # "low", "medium" or "high". Default: "medium"
 )
 
-Wiserep(
-    ztf_id="ZTF23aakmewi",
-    spec_path="ZTF23aakmewi_2023-09-11_3850.ascii",
-    sandbox=sandbox,  # set False for actual upload
-    quality="high",  # "low", "medium" or "high". Default: "medium"
-)
+for spec_path, status in batch.status.items():
+    print(f"{spec_path}: {status}")